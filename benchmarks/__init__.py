@@ -0,0 +1,7 @@
+"""
+Microbenchmarks for the hot paths of EvlDaemon.
+
+Run all benchmarks with ``uv run python -m benchmarks`` from the repository
+root. See ``python -m benchmarks --help`` for output and baseline comparison
+options.
+"""
@@ -0,0 +1,89 @@
+import argparse
+import fnmatch
+import json
+import sys
+
+import benchmarks.runner as runner
+import benchmarks.suite as suite
+
+
+def format_ns(ns: float) -> str:
+    for unit, scale in (("s", 1e9), ("ms", 1e6), ("us", 1e3)):
+        if ns >= scale:
+            return "{value:.2f} {unit}".format(value=ns / scale, unit=unit)
+    return "{value:.0f} ns".format(value=ns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run EvlDaemon microbenchmarks.")
+    parser.add_argument(
+        "-k", "--filter", default="*", help="Only run benchmarks matching this glob"
+    )
+    parser.add_argument("-o", "--output", help="Write JSON results to this file")
+    parser.add_argument("-b", "--baseline", help="Compare against this JSON file")
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Relative slowdown reported as a regression (default: 0.1)",
+    )
+    parser.add_argument(
+        "--capture", help="Also benchmark replaying this TPI capture file"
+    )
+    parser.add_argument("--list", action="store_true", help="List benchmarks")
+    options = parser.parse_args()
+
+    if options.capture:
+        suite.register_capture(options.capture)
+
+    names = fnmatch.filter(runner.BENCHMARKS, options.filter)
+    if options.list:
+        print("\n".join(names))
+        return
+
+    results = []
+    for name in names:
+        result = runner.run(runner.BENCHMARKS[name], options.repeat, options.min_time)
+        summary = result.as_dict()
+        print(
+            "{name:<55} {median:>12} per op (+/- {stdev})".format(
+                name=name,
+                median=format_ns(summary["median_ns"]),
+                stdev=format_ns(summary["stdev_ns"]),
+            ),
+            file=sys.stderr,
+        )
+        results.append(result)
+
+    report = runner.report(results)
+    exit_code = 0
+    if options.baseline:
+        report["comparison"] = runner.compare(
+            report, runner.load(options.baseline), options.threshold
+        )
+        for name, details in report["comparison"].items():
+            print(
+                "{name:<55} {ratio:>7.2f}x{flag}".format(
+                    name=name,
+                    ratio=details["ratio"],
+                    flag="  REGRESSION" if details["regression"] else "",
+                ),
+                file=sys.stderr,
+            )
+            if details["regression"]:
+                exit_code = 1
+
+    if options.output:
+        with open(options.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Reports the cumulative import time of the modules loaded when EvlDaemon reads
+a configuration file, as measured by ``python -X importtime``.
+
+Usage: ``uv run python -m benchmarks.importtime [config file] [--top N]``
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+
+def importtime(config: str) -> list:
+    """
+    Runs a fresh interpreter that reads the given config file and returns the
+    parsed -X importtime output.
+    :param config: Configuration file path
+    :return: List of dicts with module name, self and cumulative time in us
+    """
+    code = "import evl.config as conf; conf.read({config!r})".format(config=config)
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    modules = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        modules.append(
+            {
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+            }
+        )
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("config", nargs="?", default="config.json")
+    parser.add_argument("--top", type=int, default=15)
+    options = parser.parse_args()
+
+    modules = importtime(options.config)
+    top_level = [module for module in modules if module["depth"] == 0]
+    top_level.sort(key=lambda module: module["cumulative_us"], reverse=True)
+
+    report = {
+        "total_us": sum(module["cumulative_us"] for module in top_level),
+        "top": top_level[: options.top],
+    }
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import json
+import platform
+import statistics
+import sys
+import time
+
+from dataclasses import dataclass, field
+from typing import Callable
+
+BENCHMARKS = {}
+
+
+@dataclass
+class Benchmark:
+    name: str
+    setup: Callable
+    ops: int = 1
+    timer: bool = False
+
+
+@dataclass
+class Result:
+    name: str
+    ops: int
+    samples: list = field(default_factory=list)
+
+    @property
+    def per_op_ns(self) -> list:
+        return [sample / self.ops for sample in self.samples]
+
+    def as_dict(self) -> dict:
+        per_op = self.per_op_ns
+        return {
+            "ops": self.ops,
+            "repeat": len(per_op),
+            "min_ns": min(per_op),
+            "median_ns": statistics.median(per_op),
+            "mean_ns": statistics.fmean(per_op),
+            "stdev_ns": statistics.stdev(per_op) if len(per_op) > 1 else 0.0,
+        }
+
+
+def benchmark(name: str, ops: int = 1, timer: bool = False):
+    """
+    Registers the decorated function as a benchmark. The decorated function
+    performs any setup and returns a zero-argument callable that executes
+    `ops` operations each time it is called, or a (callable, teardown) tuple
+    whose teardown is called once the benchmark has run.
+    :param name: Unique name of the benchmark
+    :param ops: Number of operations performed per call of the returned callable
+    :param timer: True if the callable times itself and returns elapsed ns
+    """
+
+    def register(setup: Callable) -> Callable:
+        BENCHMARKS[name] = Benchmark(name, setup, ops, timer)
+        return setup
+
+    return register
+
+
+def run(bench: Benchmark, repeat: int = 5, min_time: float = 0.2) -> Result:
+    """
+    Runs the given benchmark, calibrating the number of loops so that each
+    sample takes at least `min_time` seconds.
+    :param bench: Benchmark to run
+    :param repeat: Number of samples to take
+    :param min_time: Minimum duration of each sample in seconds
+    :return: Benchmark result with per-sample timings
+    """
+    fn = bench.setup()
+    teardown = None
+    if isinstance(fn, tuple):
+        fn, teardown = fn
+
+    timer = _self_timed if bench.timer else _time
+
+    try:
+        loops = 1
+        while True:
+            start = time.perf_counter_ns()
+            timer(fn, loops)
+            if time.perf_counter_ns() - start >= min_time * 1e9 or loops >= 1 << 20:
+                break
+            loops *= 2
+
+        result = Result(bench.name, bench.ops * loops)
+        for _ in range(repeat):
+            result.samples.append(timer(fn, loops))
+    finally:
+        if teardown is not None:
+            teardown()
+
+    return result
+
+
+def _time(fn: Callable, loops: int) -> int:
+    start = time.perf_counter_ns()
+    for _ in range(loops):
+        fn()
+    return time.perf_counter_ns() - start
+
+
+def _self_timed(fn: Callable, loops: int) -> int:
+    return sum(fn() for _ in range(loops))
+
+
+def report(results: list) -> dict:
+    """
+    Returns a machine-readable report of the given results.
+    :param results: List of benchmark results
+    :return: Dict suitable for serializing to JSON
+    """
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "timestamp": int(time.time()),
+        "results": {result.name: result.as_dict() for result in results},
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.1) -> dict:
+    """
+    Compares the median timings of the given report with a baseline report.
+    :param current: Report of the current run
+    :param baseline: Report to compare against
+    :param threshold: Relative slowdown above which a result is a regression
+    :return: Dict of benchmark name to comparison details
+    """
+    comparison = {}
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+
+        ratio = result["median_ns"] / base["median_ns"]
+        comparison[name] = {
+            "baseline_ns": base["median_ns"],
+            "current_ns": result["median_ns"],
+            "ratio": ratio,
+            "regression": ratio > 1 + threshold,
+        }
+    return comparison
+
+
+def load(file: str) -> dict:
+    with open(file) as report_file:
+        return json.load(report_file)
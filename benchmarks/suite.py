@@ -0,0 +1,712 @@
+import asyncio
+import contextlib
+import json
+import time
+
+import evl.command as cmd
+import evl.data as dt
+import evl.event as ev
+import evl.queues as queues
+import evl.storage.memory as memory
+import evl.suppress as suppress
+import evl.tpi as tpi
+
+from benchmarks.runner import benchmark
+
+# A representative mix of (command, data) pairs as sent by a DSC panel.
+SAMPLE_COMMANDS = [
+    ("510", "81"),
+    ("511", "00"),
+    ("609", "001"),
+    ("610", "001"),
+    ("650", "1"),
+    ("651", "1"),
+    ("652", "10"),
+    ("655", "1"),
+    ("601", "1003"),
+    ("505", "1"),
+]
+
+SAMPLE_PACKETS = [
+    "{command}{data}{checksum}".format(
+        command=command, data=data, checksum=tpi.calculate_checksum(command + data)
+    )
+    for command, data in SAMPLE_COMMANDS
+]
+
+EVENTS_PER_DISPATCH = 1000
+
+
+def sample_events(count: int) -> list:
+    events = []
+    for index in range(count):
+        command, data = SAMPLE_COMMANDS[index % len(SAMPLE_COMMANDS)]
+        command = cmd.Command(command)
+        events.append(ev.Event(command, dt.parse(command, data), 1700000000 + index))
+    return events
+
+
+@benchmark("tpi.calculate_checksum", ops=len(SAMPLE_PACKETS))
+def bench_calculate_checksum():
+    packets = [packet[:-2] for packet in SAMPLE_PACKETS]
+
+    def run():
+        for packet in packets:
+            tpi.calculate_checksum(packet)
+
+    return run
+
+
+@benchmark("tpi.validate_checksum", ops=len(SAMPLE_PACKETS))
+def bench_validate_checksum():
+    def run():
+        for packet in SAMPLE_PACKETS:
+            tpi.validate_checksum(packet)
+
+    return run
+
+
+@benchmark("data.parse", ops=len(SAMPLE_COMMANDS))
+def bench_parse():
+    commands = [(cmd.Command(command), data) for command, data in SAMPLE_COMMANDS]
+
+    def run():
+        for command, data in commands:
+            dt.parse(command, data)
+
+    return run
+
+
+@benchmark("data.describe_led_state", ops=256)
+def bench_describe_led_state():
+    states = ["{0:02X}".format(state) for state in range(256)]
+
+    def run():
+        for state in states:
+            dt.describe_led_state(state)
+
+    return run
+
+
+@benchmark("event.Event", ops=len(SAMPLE_COMMANDS))
+def bench_event_construction():
+    commands = [
+        (cmd.Command(command), dt.parse(cmd.Command(command), data))
+        for command, data in SAMPLE_COMMANDS
+    ]
+
+    def run():
+        for command, parsed in commands:
+            ev.Event(command, parsed, 1700000000)
+
+    return run
+
+
+@benchmark("event.Event.describe", ops=len(SAMPLE_COMMANDS))
+def bench_event_describe():
+    events = sample_events(len(SAMPLE_COMMANDS))
+
+    def run():
+        for event in events:
+            event.describe()
+
+    return run
+
+
+@benchmark("event.Status.update", ops=len(SAMPLE_COMMANDS))
+def bench_status_update():
+    status = ev.Status()
+    events = sample_events(len(SAMPLE_COMMANDS))
+
+    def run():
+        for event in events:
+            status.update(event)
+
+    return run
+
+
+@benchmark("event.Status.report")
+def bench_status_report():
+    status = ev.Status()
+    for event in sample_events(len(SAMPLE_COMMANDS)):
+        status.update(event)
+
+    return status.report
+
+
+def http_state_manager() -> ev.EventManager:
+    manager = ev.EventManager(asyncio.Queue())
+    storage = memory.MemoryStorage(size=100)
+    for event in sample_events(100):
+        manager.status.update(event)
+        storage.store(event)
+    manager.add_storages({"memory": storage})
+    return manager
+
+
+@benchmark("http.status_report[core]")
+def bench_http_status_report():
+    """Serializes the status report on the core loop, as done per request."""
+    from evl.listeners.asynchttp import AsyncHttpListener
+
+    listener = AsyncHttpListener("http", 0, "", http_state_manager())
+    return listener._status_report
+
+
+def http_worker_pool():
+    import os
+    import tempfile
+
+    import evl.sharedstate as sharedstate
+
+    from evl.listeners.httpworker import HttpWorkerPool
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.state")
+    pool = HttpWorkerPool(http_state_manager(), "http", 0, "", "memory", 0, path=path)
+    pool._writer = sharedstate.SharedStateWriter(path)
+    pool.publish()
+    return pool, sharedstate.SharedStateReader(path)
+
+
+@benchmark("http.status_report[worker]")
+def bench_http_worker_read():
+    """Reads the status report in a worker, just after a publish."""
+    from evl.listeners.httpworker import STATUS_REPORT
+
+    _, reader = http_worker_pool()
+
+    def run():
+        reader.sequence = None
+        reader.read()[STATUS_REPORT]
+
+    return run
+
+
+@benchmark("http.publish_state[events=100]")
+def bench_http_publish_state():
+    """Serializes and publishes the state, once per publish interval."""
+    pool, _ = http_worker_pool()
+    return pool.publish
+
+
+class NullNotifier:
+    def __init__(self, priority: cmd.Priority = cmd.Priority.LOW):
+        self.priority = priority
+
+    async def notify(self, event: ev.Event) -> None:
+        pass
+
+
+class CountingNotifier(NullNotifier):
+    """Resolves a future once the expected number of events have arrived."""
+
+    def __init__(self):
+        super().__init__()
+        self.expected = 0
+        self.done = None
+
+    async def notify(self, event: ev.Event) -> None:
+        self.expected -= 1
+        if self.expected == 0:
+            self.done.set_result(None)
+
+
+def dispatch_benchmark(notifiers: int, storages: int):
+    def setup():
+        loop = asyncio.new_event_loop()
+        queue = asyncio.Queue()
+        manager = ev.EventManager(queue)
+
+        counter = CountingNotifier()
+        extra = {"null-{n}".format(n=n): NullNotifier() for n in range(notifiers - 1)}
+        manager.add_notifiers({**extra, "counter": counter})
+        manager.add_storages(
+            {
+                "memory-{n}".format(n=n): memory.MemoryStorage(size=100)
+                for n in range(storages)
+            }
+        )
+
+        commands = [
+            (cmd.Command(command), data)
+            for command, data in SAMPLE_COMMANDS * (EVENTS_PER_DISPATCH // 10)
+        ]
+
+        async def dispatch():
+            counter.expected = len(commands)
+            counter.done = loop.create_future()
+            for command, data in commands:
+                queue.put_nowait((command, data))
+
+            task = loop.create_task(manager.wait())
+            await counter.done
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+        return lambda: loop.run_until_complete(dispatch())
+
+    return setup
+
+
+for _notifiers, _storages in ((1, 1), (4, 2), (16, 4)):
+    benchmark(
+        "event.EventManager.wait[notifiers={n},storages={s}]".format(
+            n=_notifiers, s=_storages
+        ),
+        ops=EVENTS_PER_DISPATCH,
+    )(dispatch_benchmark(_notifiers, _storages))
+
+
+def routing_benchmark(notifiers: int):
+    """Dispatches LOW priority LED updates to notifiers that only want HIGH."""
+
+    def setup():
+        loop = asyncio.new_event_loop()
+        manager = ev.EventManager(asyncio.Queue())
+        manager.add_notifiers(
+            {
+                "high-{n}".format(n=n): NullNotifier(cmd.Priority.HIGH)
+                for n in range(notifiers)
+            }
+        )
+        led = cmd.Command("510")
+
+        async def dispatch():
+            for _ in range(EVENTS_PER_DISPATCH):
+                await manager.dispatch(led, "81")
+
+        return lambda: loop.run_until_complete(dispatch())
+
+    return setup
+
+
+benchmark("dispatch.routing[notifiers=16,priority=high]", ops=EVENTS_PER_DISPATCH)(
+    routing_benchmark(16)
+)
+
+
+class AlarmNotifier(NullNotifier):
+    """Resolves a future when the first HIGH or CRITICAL event arrives."""
+
+    def __init__(self):
+        super().__init__()
+        self.done = None
+
+    async def notify(self, event: ev.Event) -> None:
+        if event.priority.value >= cmd.Priority.HIGH.value and not self.done.done():
+            self.done.set_result(time.perf_counter_ns())
+
+
+def critical_latency_benchmark(queue_type, flood: int):
+    """
+    Measures the time taken for a ZONE_ALARM queued behind a flood of LOW
+    priority keypad LED events to reach a notifier.
+    """
+
+    def setup():
+        loop = asyncio.new_event_loop()
+        led = (cmd.Command("510"), "81")
+        alarm = (cmd.Command("601"), "1003")
+
+        async def dispatch():
+            queue = queue_type()
+            manager = ev.EventManager(queue)
+            notifier = AlarmNotifier()
+            notifier.done = loop.create_future()
+            manager.add_notifiers({"alarm": notifier})
+            manager.add_storages({"memory": memory.MemoryStorage(size=100)})
+
+            for _ in range(flood):
+                queue.put_nowait(led)
+            queued_at = time.perf_counter_ns()
+            queue.put_nowait(alarm)
+
+            task = loop.create_task(manager.wait())
+            notified_at = await notifier.done
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+            return notified_at - queued_at
+
+        return lambda: loop.run_until_complete(dispatch())
+
+    return setup
+
+
+for _name, _queue_type in (("fifo", asyncio.Queue), ("priority", queues.EventQueue)):
+    benchmark(
+        "dispatch.critical_latency[{name},flood=500]".format(name=_name), timer=True
+    )(critical_latency_benchmark(_queue_type, 500))
+
+
+def led_storm_benchmark(suppressor):
+    """Dispatches repeated, unchanged keypad LED updates."""
+
+    def setup():
+        loop = asyncio.new_event_loop()
+        manager = ev.EventManager(asyncio.Queue(), suppressor=suppressor)
+        manager.add_notifiers({"null": NullNotifier()})
+        manager.add_storages({"memory": memory.MemoryStorage(size=100)})
+        led = cmd.Command("510")
+
+        async def dispatch():
+            for _ in range(EVENTS_PER_DISPATCH):
+                await manager.dispatch(led, "81")
+
+        return lambda: loop.run_until_complete(dispatch())
+
+    return setup
+
+
+benchmark("dispatch.led_storm[suppression=off]", ops=EVENTS_PER_DISPATCH)(
+    led_storm_benchmark(None)
+)
+benchmark("dispatch.led_storm[suppression=on]", ops=EVENTS_PER_DISPATCH)(
+    led_storm_benchmark(suppress.Suppressor())
+)
+
+
+class SlowStorage(memory.MemoryStorage):
+    """Memory storage that blocks as if each write went to a slow disk."""
+
+    def store(self, event: ev.Event) -> None:
+        time.sleep(0.0002)
+        super().store(event)
+
+
+def slow_storage_benchmark(write_behind: bool):
+    """Dispatches events to a storage engine that blocks on every write."""
+
+    def setup():
+        import evl.storage.writebehind as writebehind
+
+        loop = asyncio.new_event_loop()
+        storage = SlowStorage(size=100)
+        if write_behind:
+            storage = writebehind.WriteBehindStorage(storage)
+
+        manager = ev.EventManager(asyncio.Queue())
+        manager.add_storages({"slow": storage})
+        commands = [(cmd.Command(command), data) for command, data in SAMPLE_COMMANDS]
+
+        async def dispatch():
+            for command, data in commands:
+                await manager.dispatch(command, data)
+
+        def teardown():
+            # Stops the write-behind flusher task before its loop is closed.
+            loop.run_until_complete(ev.close_storage(storage))
+            loop.close()
+
+        return lambda: loop.run_until_complete(dispatch()), teardown
+
+    return setup
+
+
+for _write_behind in (False, True):
+    benchmark(
+        "dispatch.slow_storage[write_behind={state}]".format(
+            state="on" if _write_behind else "off"
+        ),
+        ops=len(SAMPLE_COMMANDS),
+    )(slow_storage_benchmark(_write_behind))
+
+
+def rules_benchmark(count: int):
+    """Matches sample events against `count` zone rules."""
+
+    def setup():
+        import evl.rules as rules
+
+        engine = rules.RuleEngine(None)
+        for index in range(count):
+            engine.add(
+                rules.Rule(
+                    "rule-{index}".format(index=index),
+                    [],
+                    commands=[cmd.CommandType.ZONE_OPEN],
+                    zones=["{zone:03d}".format(zone=index + 1)],
+                    partitions=[str(index % 8 + 1)],
+                )
+            )
+        events = sample_events(len(SAMPLE_COMMANDS))
+
+        def run():
+            for event in events:
+                engine.match(event)
+
+        return run
+
+    return setup
+
+
+for _count in (10, 10000):
+    benchmark(
+        "rules.match[rules={count}]".format(count=_count), ops=len(SAMPLE_COMMANDS)
+    )(rules_benchmark(_count))
+
+
+TIMERS_PER_RUN = 1000
+
+
+def scheduler_benchmark(count: int):
+    """Adds and cancels timers with `count` periodic timers already scheduled."""
+
+    def setup():
+        import evl.scheduler as sched
+
+        scheduler = sched.Scheduler()
+        for index in range(count):
+            scheduler.call_every(60, lambda: None, jitter=60)
+
+        def run():
+            timers = [
+                scheduler.call_later(index % 3600, lambda: None)
+                for index in range(TIMERS_PER_RUN)
+            ]
+            for timer in timers:
+                timer.cancel()
+
+        return run
+
+    return setup
+
+
+for _count in (10, 10000):
+    benchmark(
+        "scheduler.call_later[timers={count}]".format(count=_count),
+        ops=TIMERS_PER_RUN,
+    )(scheduler_benchmark(_count))
+
+
+def bus_publish_benchmark(subscribers: int):
+    """Publishes events to subscribers of one zone each."""
+
+    def setup():
+        import evl.bus as bus
+
+        event_bus = bus.EventBus()
+        subscriptions = [
+            event_bus.subscribe(bus.Filter(zones=[index % 8 + 1]))
+            for index in range(subscribers)
+        ]
+        events = sample_events(EVENTS_PER_DISPATCH)
+
+        def run():
+            for event in events:
+                event_bus.publish(event)
+            for subscription in subscriptions:
+                subscription._buffer.clear()
+
+        return run
+
+    return setup
+
+
+benchmark("bus.publish[subscribers=16]", ops=EVENTS_PER_DISPATCH)(
+    bus_publish_benchmark(16)
+)
+
+
+@benchmark("bus.delivery_latency[unix]", timer=True)
+def bench_bus_delivery_latency():
+    """Measures the time from dispatching an event to a subscriber reading it."""
+    import os
+    import tempfile
+
+    import evl.bus as bus
+
+    from evl.listeners.unixsocket import UnixSocketListener
+
+    loop = asyncio.new_event_loop()
+    directory = tempfile.mkdtemp()
+    manager = ev.EventManager(asyncio.Queue())
+    listener = UnixSocketListener("bus", os.path.join(directory, "evl.sock"), manager)
+
+    async def connect():
+        await listener.listen()
+        reader, writer = await asyncio.open_unix_connection(listener.path)
+        writer.write(bus.encode({}))
+        await writer.drain()
+        while not manager.bus.subscriptions:
+            await asyncio.sleep(0)
+        return reader, writer
+
+    reader, writer = loop.run_until_complete(connect())
+    command = cmd.Command("609")
+
+    async def deliver():
+        dispatched_at = time.perf_counter_ns()
+        await manager.dispatch(command, "001")
+        await bus.read_frame(reader)
+        return time.perf_counter_ns() - dispatched_at
+
+    return lambda: loop.run_until_complete(deliver())
+
+
+class EchoEvl:
+    """Stream writer acknowledging each packet and reporting the partition armed."""
+
+    def __init__(self, reader: asyncio.StreamReader):
+        self.reader = reader
+
+    def write(self, data: bytes) -> None:
+        packet = data.decode()
+        for command, data in (("500", packet[:3]), ("652", packet[3] + "0")):
+            self.reader.feed_data(
+                "{command}{data}{checksum}\r\n".format(
+                    command=command,
+                    data=data,
+                    checksum=tpi.calculate_checksum(command + data),
+                ).encode()
+            )
+
+    async def drain(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+@benchmark("control.round_trip[arm_away]", timer=True)
+def bench_command_round_trip():
+    """Measures arming a partition, from queueing the command to the armed event."""
+    import evl.connection as conn
+
+    loop = asyncio.new_event_loop()
+
+    async def execute():
+        reader = asyncio.StreamReader()
+        connection = conn.Connection(ev.EventManager(asyncio.Queue()), "evl")
+        task = asyncio.create_task(
+            connection.start(reader=reader, writer=EchoEvl(reader))
+        )
+        result = await connection.commander.execute(
+            cmd.CommandType.PARTITION_ARM_AWAY, "1"
+        )
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+        return result.latency
+
+    return lambda: loop.run_until_complete(execute())
+
+
+def logging_benchmark(level: str):
+    def setup():
+        import logging
+        import os
+
+        import evl.config as conf
+        import evl.logs as logs
+
+        config = conf.LoggingConfig(
+            name="file", type="file", level="INFO", path=os.devnull, format=None
+        )
+        logs.configure(conf.load_logging([config]))
+        log = getattr(logging.getLogger("evl.benchmark"), level)
+        event = sample_events(1)[0]
+
+        def run():
+            for _ in range(LOG_CALLS_PER_RUN):
+                log("Dispatched %s", event)
+
+        return run
+
+    return setup
+
+
+LOG_CALLS_PER_RUN = 1000
+
+# Debug calls are below the configured level, info calls go through the queue.
+for _level in ("debug", "info"):
+    benchmark(
+        "logging.{level}[sink=file,level=INFO]".format(level=_level),
+        ops=LOG_CALLS_PER_RUN,
+    )(logging_benchmark(_level))
+
+
+def events_benchmark(size: int):
+    def setup():
+        # Imported here so the remaining benchmarks can run without aiohttp.
+        import evl.listeners.asynchttp as http
+
+        storage = memory.MemoryStorage(size=size)
+        for event in sample_events(size):
+            storage.store(event)
+
+        return lambda: json.dumps(storage.all(), cls=http.EvlJsonSerializer)
+
+    return setup
+
+
+for _size in (100, 10000):
+    benchmark("http.events[size={size}]".format(size=_size), ops=_size)(
+        events_benchmark(_size)
+    )
+
+
+def register_capture(path: str) -> None:
+    """
+    Registers pipeline benchmarks that replay the given capture file at
+    maximum speed, so the event mix matches real panel traffic.
+    :param path: Capture file written by evldaemon --capture
+    """
+    import evl.capture as capture
+    import evl.replay as replay
+
+    _, frames = capture.read(path)
+
+    def replay_benchmark(mode: str):
+        def setup():
+            loop = asyncio.new_event_loop()
+            manager = ev.EventManager(asyncio.Queue())
+            manager.add_storages({"memory": memory.MemoryStorage(size=100)})
+            manager.add_notifiers({"null": NullNotifier()})
+
+            async def run():
+                waiter = loop.create_task(manager.wait())
+                await replay.replay(frames, manager, speed=0, mode=mode)
+                waiter.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await waiter
+
+            return lambda: loop.run_until_complete(run())
+
+        return setup
+
+    for mode in replay.MODES:
+        benchmark("replay.{mode}".format(mode=mode), ops=max(len(frames), 1))(
+            replay_benchmark(mode)
+        )
+
+
+STARTUP_CONFIG = {
+    "ip": "127.0.0.1",
+    "zones": {"001": "Front Door"},
+    "partitions": {"1": "Main"},
+    "notifiers": [{"name": "console", "type": "console", "priority": "Low"}],
+    "storage": [{"name": "memory", "type": "memory", "settings": {"maxSize": "100"}}],
+}
+
+
+@benchmark("startup.read_config[console]")
+def bench_startup():
+    """Cold start of a fresh interpreter that reads a console-only config."""
+    import os
+    import subprocess
+    import sys
+    import tempfile
+
+    handle, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(handle, "w") as config_file:
+        json.dump(STARTUP_CONFIG, config_file)
+
+    command = [
+        sys.executable,
+        "-c",
+        "import evl.config as conf; conf.read({path!r})".format(path=path),
+    ]
+    return lambda: subprocess.run(command, check=True)
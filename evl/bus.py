@@ -0,0 +1,290 @@
+"""
+Publish/subscribe bus for dispatched events.
+
+Subscribers, such as clients of the Unix socket listener, receive the events
+matching their topics as frames: a 4-byte big-endian payload length followed
+by a UTF-8 JSON message. Each event is encoded once, however many subscribers
+receive it:
+
+    {"type": "event", "sequence": 42, "event": {"command": "609", ...}}
+
+Every subscriber has a bounded buffer of frames it hasn't received yet. When
+a subscriber falls behind and its buffer is full, its oldest frames are
+dropped and it receives a lag message with the number of dropped events ahead
+of the frames that remain:
+
+    {"type": "lag", "dropped": 7}
+"""
+
+import asyncio
+import json
+import struct
+
+from collections import deque
+
+import evl.command as cmd
+
+# Default number of frames buffered for each subscriber.
+DEFAULT_BUFFER = 1000
+# Largest frame accepted from a subscriber.
+MAX_FRAME_SIZE = 64 * 1024
+
+EVENT = "event"
+LAG = "lag"
+
+_LENGTH = struct.Struct(">I")
+
+
+class BusError(Exception):
+    pass
+
+
+def encode(message: dict) -> bytes:
+    """
+    Encodes a message into a length-prefixed frame.
+    :param message: JSON serializable message
+    :return: Frame
+    """
+    payload = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    return _LENGTH.pack(len(payload)) + payload
+
+
+async def read_frame(reader: asyncio.StreamReader, max_size: int = MAX_FRAME_SIZE):
+    """
+    Reads and decodes a length-prefixed frame.
+    :param reader: Stream to read from
+    :param max_size: Largest payload accepted, in bytes
+    :return: Decoded message, or None if the stream ended between frames
+    """
+    try:
+        header = await reader.readexactly(_LENGTH.size)
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise BusError("Truncated frame!")
+
+    (length,) = _LENGTH.unpack(header)
+    if length > max_size:
+        raise BusError(
+            "Frame of {length} bytes exceeds limit of {max_size}!".format(
+                length=length, max_size=max_size
+            )
+        )
+
+    try:
+        payload = await reader.readexactly(length)
+        return json.loads(payload)
+    except asyncio.IncompleteReadError:
+        raise BusError("Truncated frame!")
+    except ValueError:
+        raise BusError("Invalid frame!")
+
+
+class Filter:
+    """
+    Topics selecting the events a subscriber receives. Without any partition,
+    zone or panel topics every event is selected, otherwise an event is
+    selected if it is for one of the given partitions or zones or, with panel
+    set, if it is a panel-wide event for no partition or zone, such as a
+    keypad LED change. Events below the given priority are never selected.
+    """
+
+    def __init__(
+        self,
+        priority: cmd.Priority = cmd.Priority.LOW,
+        partitions: list = None,
+        zones: list = None,
+        panel: bool = None,
+    ):
+        self.priority = priority
+        self.partitions = _numbers(partitions)
+        self.zones = _numbers(zones)
+        self.panel = panel
+        self._priority = priority.value
+        self._all = partitions is None and zones is None and panel is None
+
+    @classmethod
+    def from_dict(cls, topics: dict) -> "Filter":
+        """
+        Creates a filter from a subscribe message, e.g.
+        {"priority": "HIGH", "partitions": ["1"], "zones": ["001"], "panel": true}
+        :param topics: Subscribe message
+        :return: Filter
+        """
+        if not isinstance(topics, dict):
+            raise BusError("Invalid subscription!")
+
+        try:
+            return cls(
+                priority=cmd.Priority[topics.get("priority", "LOW").upper()],
+                partitions=topics.get("partitions"),
+                zones=topics.get("zones"),
+                panel=topics.get("panel"),
+            )
+        except (AttributeError, KeyError, TypeError, ValueError):
+            raise BusError("Invalid subscription!")
+
+    def matches(self, event) -> bool:
+        """
+        Returns whether the given event is selected by this filter.
+        :param event: Dispatched event
+        :return: True if the event is selected
+        """
+        return self._select(*_topics(event))
+
+    def _select(self, priority: int, partition: int, zone: int) -> bool:
+        if priority < self._priority:
+            return False
+        if self._all:
+            return True
+
+        if zone is None and partition is None:
+            return bool(self.panel)
+        return zone in self.zones or partition in self.partitions
+
+
+def _topics(event) -> tuple:
+    # Priority and numbers of an event, as matched by filters.
+    return (
+        event.priority.value,
+        int(event.partition) if event.partition is not None else None,
+        int(event.zone) if event.zone is not None else None,
+    )
+
+
+def _numbers(values: list) -> frozenset:
+    if values is None:
+        return frozenset()
+    if isinstance(values, (str, int)):
+        raise TypeError("Expected a list of numbers")
+    return frozenset(int(value) for value in values)
+
+
+class Subscription:
+    """Bounded buffer of the frames to be sent to one subscriber."""
+
+    def __init__(self, bus: "EventBus", event_filter: Filter, maxsize: int):
+        self.bus = bus
+        self.filter = event_filter
+        self.maxsize = maxsize
+
+        self.delivered = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.closed = False
+
+        self._buffer = deque()
+        self._lagged = 0
+        self._ready = asyncio.Event()
+
+    def put(self, frame: bytes) -> None:
+        """
+        Buffers a frame, dropping the oldest one if the buffer is full.
+        :param frame: Encoded event
+        """
+        if len(self._buffer) >= self.maxsize:
+            self._buffer.popleft()
+            self.dropped += 1
+            self._lagged += 1
+        self._buffer.append(frame)
+        if len(self._buffer) > self.max_depth:
+            self.max_depth = len(self._buffer)
+        self._ready.set()
+
+    async def get(self) -> list:
+        """
+        Waits for and returns all buffered frames, preceded by a lag message
+        if any were dropped since the last call.
+        :return: List of frames, or an empty list once the subscription is closed
+        """
+        while not self._buffer:
+            if self.closed:
+                return []
+            self._ready.clear()
+            await self._ready.wait()
+
+        frames = list(self._buffer)
+        self._buffer.clear()
+        self.delivered += len(frames)
+        if self._lagged:
+            frames.insert(0, encode({"type": LAG, "dropped": self._lagged}))
+            self._lagged = 0
+        return frames
+
+    def close(self) -> None:
+        """Stops the subscription, waking up any pending get()."""
+        self.closed = True
+        self.bus.unsubscribe(self)
+        self._ready.set()
+
+    def buffered_bytes(self) -> int:
+        """Returns the total size of the buffered frames."""
+        return sum(len(frame) for frame in self._buffer)
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._buffer),
+            "maxsize": self.maxsize,
+            "max_depth": self.max_depth,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+class EventBus:
+    """Passes dispatched events on to the subscriptions whose topics match."""
+
+    def __init__(self):
+        self.subscriptions = []
+        self.sequence = 0
+        self.published = 0
+
+    def subscribe(
+        self, event_filter: Filter = None, maxsize: int = DEFAULT_BUFFER
+    ) -> Subscription:
+        """
+        Adds a subscription.
+        :param event_filter: Topics to subscribe to, or None for all events
+        :param maxsize: Number of frames buffered for the subscriber
+        :return: Subscription
+        """
+        subscription = Subscription(self, event_filter or Filter(), maxsize)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        if subscription in self.subscriptions:
+            self.subscriptions.remove(subscription)
+
+    def publish(self, event) -> None:
+        """
+        Buffers the given event for every matching subscription.
+        :param event: Dispatched event
+        """
+        if not self.subscriptions:
+            return
+
+        self.sequence += 1
+        topics = _topics(event)
+        frame = None
+        for subscription in self.subscriptions:
+            if subscription.filter._select(*topics):
+                if frame is None:
+                    frame = encode(
+                        {
+                            "type": EVENT,
+                            "sequence": self.sequence,
+                            "event": event.as_dict(),
+                        }
+                    )
+                subscription.put(frame)
+        if frame is not None:
+            self.published += 1
+
+    def stats(self) -> dict:
+        return {
+            "published": self.published,
+            "subscribers": [
+                subscription.stats() for subscription in self.subscriptions
+            ],
+        }
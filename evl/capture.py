@@ -0,0 +1,159 @@
+"""
+Capture and replay of raw TPI frames.
+
+A capture file starts with a fixed header containing a magic number, the
+format version and the wall clock time at which the capture was started. The
+header is followed by one record per frame, each holding the receive time in
+nanoseconds relative to the start of the capture, the frame length and the
+ASCII frame itself (without the trailing CRLF).
+"""
+
+import asyncio
+import struct
+import time
+
+from typing import AsyncIterator, Iterator, NamedTuple
+
+MAGIC = b"EVLC"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sBd")
+_RECORD = struct.Struct("<QH")
+
+
+class CaptureError(Exception):
+    pass
+
+
+class Frame(NamedTuple):
+    offset_ns: int
+    frame: str
+
+
+class CaptureWriter:
+    """Writes raw TPI frames with their receive time to a capture file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.frames = 0
+        self._start_ns = time.perf_counter_ns()
+        self._file = open(path, "wb")
+        self._file.write(_HEADER.pack(MAGIC, VERSION, time.time()))
+
+    def __str__(self):
+        return "Capture ({path})".format(path=self.path)
+
+    def write(self, frame: str, received_ns: int = None) -> None:
+        """
+        Appends the given frame to the capture file.
+        :param frame: Raw frame without trailing CRLF
+        :param received_ns: perf_counter_ns() value at which the frame was received
+        """
+        if received_ns is None:
+            received_ns = time.perf_counter_ns()
+
+        encoded = frame.encode("ascii")
+        self._file.write(_RECORD.pack(received_ns - self._start_ns, len(encoded)))
+        self._file.write(encoded)
+        self.frames += 1
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+
+def read(path: str) -> tuple[float, list[Frame]]:
+    """
+    Reads all frames from the given capture file.
+    :param path: Capture file path
+    :return: Tuple of capture start time (epoch seconds) and list of frames
+    """
+    with open(path, "rb") as capture:
+        started_at = _read_header(capture)
+        return started_at, list(_read_records(capture))
+
+
+def _read_header(capture) -> float:
+    header = capture.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        raise CaptureError("Truncated capture header!")
+
+    magic, version, started_at = _HEADER.unpack(header)
+    if magic != MAGIC:
+        raise CaptureError("Not a capture file!")
+    if version != VERSION:
+        raise CaptureError(
+            "Unsupported capture version {version}!".format(version=version)
+        )
+    return started_at
+
+
+def _read_records(capture) -> Iterator[Frame]:
+    while True:
+        record = capture.read(_RECORD.size)
+        if len(record) < _RECORD.size:
+            # A partial record means the capture was cut off mid-write.
+            return
+
+        offset_ns, length = _RECORD.unpack(record)
+        frame = capture.read(length)
+        if len(frame) < length:
+            return
+        yield Frame(offset_ns, frame.decode("ascii"))
+
+
+async def replay(frames: list[Frame], speed: float = 1.0) -> AsyncIterator[str]:
+    """
+    Yields the given frames, sleeping between them to reproduce the original
+    timing scaled by the given speed.
+    :param frames: Frames read from a capture file
+    :param speed: Replay speed multiplier, 0 to replay at maximum speed
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    first_ns = frames[0].offset_ns if frames else 0
+
+    for frame in frames:
+        if speed > 0:
+            # Delays are computed from the start of the replay so that they
+            # don't accumulate drift.
+            due = start + (frame.offset_ns - first_ns) / 1e9 / speed
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        yield frame.frame
+
+
+class ReplayReader:
+    """
+    Stand-in for asyncio.StreamReader that returns captured frames at their
+    original (scaled) timing.
+    """
+
+    def __init__(self, frames: list[Frame], speed: float = 1.0):
+        self._frames = replay(frames, speed)
+        self.finished = asyncio.Event()
+
+    async def read(self, n: int = -1) -> bytes:
+        try:
+            frame = await anext(self._frames)
+        except StopAsyncIteration:
+            self.finished.set()
+            return b""
+        return (frame + "\r\n").encode("ascii")
+
+
+class NullWriter:
+    """Stand-in for asyncio.StreamWriter that discards outgoing data."""
+
+    def __init__(self):
+        self.written = []
+
+    def write(self, data: bytes) -> None:
+        self.written.append(data)
+
+    async def drain(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
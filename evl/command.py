@@ -28,6 +28,12 @@ class CommandType(Enum):
     POLL = "000"
     STATUS_REPORT = "001"
     NETWORK_LOGIN = "005"
+    DUMP_ZONE_TIMERS = "008"
+    PARTITION_ARM_AWAY = "030"
+    PARTITION_ARM_STAY = "031"
+    PARTITION_ARM_ZERO_ENTRY_DELAY = "032"
+    PARTITION_ARM_WITH_CODE = "033"
+    PARTITION_DISARM_WITH_CODE = "040"
     COMMAND_ACKNOWLEDGE = "500"
     COMMAND_ERROR = "501"
     SYSTEM_ERROR = "502"
@@ -115,6 +121,12 @@ NAMES = {
     CommandType.POLL: "Poll",
     CommandType.STATUS_REPORT: "Status Report",
     CommandType.NETWORK_LOGIN: "Network Login",
+    CommandType.DUMP_ZONE_TIMERS: "Dump Zone Timers",
+    CommandType.PARTITION_ARM_AWAY: "Partition Arm Away",
+    CommandType.PARTITION_ARM_STAY: "Partition Arm Stay",
+    CommandType.PARTITION_ARM_ZERO_ENTRY_DELAY: "Partition Arm Zero Entry Delay",
+    CommandType.PARTITION_ARM_WITH_CODE: "Partition Arm With Code",
+    CommandType.PARTITION_DISARM_WITH_CODE: "Partition Disarm With Code",
     CommandType.COMMAND_ACKNOWLEDGE: "Command Acknowledge",
     CommandType.COMMAND_ERROR: "Command Error",
     CommandType.SYSTEM_ERROR: "System Error",
@@ -185,7 +197,7 @@ NAMES = {
     CommandType.MASTER_CODE_REQUIRED: "Master Code Required",
     CommandType.INSTALLERS_CODE_REQUIRED: "Installers Code Required",
     CommandType.SOFTWARE_ZONE_ALARM: "Software Zone Alarm",
-    CommandType.UNKNOWN: "Unknown"
+    CommandType.UNKNOWN: "Unknown",
 }
 
 # Priorities are Priority.LOW by default. Only commands that are higher priority
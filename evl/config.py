@@ -1,44 +1,162 @@
 import json
 import logging
+import logging.handlers
 import os
 import sys
 
-from marshmallow import Schema, fields, post_load
+from marshmallow import (
+    INCLUDE,
+    Schema,
+    ValidationError,
+    fields,
+    post_load,
+    validate,
+    validates_schema,
+)
 
 import evl.command as cmd
-import evl.listeners.asynchttp as http
-import evl.notifiers.consolenotifier as console
-import evl.notifiers.smsnotifier as sms
-import evl.notifiers.emailnotifier as email
-import evl.notifiers.mimirnotifier as mimir
-import evl.storage.memory as memory
-import evl.tasks.heartbeat as heartbeat
+import evl.httpclient as httpclient
+import evl.plugins as plugins
+import evl.queues as queues
+import evl.rules as rules
+import evl.suppress as suppress
 
 
 DEFAULT_HEARTBEAT_INTERVAL = 60
 DEFAULT_LOGGING_LEVEL = "DEBUG"
+DEFAULT_LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+DEFAULT_SYSLOG_FORMAT = "evl: %(levelname)s %(name)s: %(message)s"
+DEFAULT_SYSLOG_ADDRESS = "/dev/log"
+DEFAULT_LOG_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_LOG_BACKUP_COUNT = 5
+
+LOGGING_LEVELS = ["CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"]
+LOGGING_TYPES = ["console", "file", "rotating", "syslog"]
 DEFAULT_NOTIFIER_PRIORITY = "LOW"
-DEFAULT_STORAGE_MAX_LENGTH = 100
 
 logger = logging.getLogger(__name__)
 
 
 class Config:
-    def __init__(self, **kwargs):
+    def __init__(self, backends: bool = True, **kwargs):
+
+        # The parsed configuration sections are kept so that a reloaded
+        # configuration can be compared with the running one.
+        self.sections = {
+            section: kwargs.get(section, [])
+            for section in (
+                "heartbeats",
+                "listeners",
+                "logging",
+                "notifiers",
+                "rules",
+                "storage",
+            )
+        }
+
+        heartbeats = kwargs.pop("heartbeats", [])
+        notifiers = kwargs.pop("notifiers", [])
+        storage = kwargs.pop("storage", [])
+        if backends:
+            self.heartbeats = load_heartbeats(heartbeats)
+            self.notifiers = load_notifiers(notifiers)
+            self.storage = load_storage(storage)
+        else:
+            # Left to the caller, e.g. a reload only loads the backends that
+            # were added or changed.
+            self.heartbeats = []
+            self.notifiers = {}
+            self.storage = {}
 
-        self.heartbeats = load_heartbeats(kwargs.pop("heartbeats", []))
+        self.http = load_http(kwargs.pop("http", None))
         self.logging = load_logging(kwargs.pop("logging", []))
-        self.notifiers = load_notifiers(kwargs.pop("notifiers", []))
-        self.storage = load_storage(kwargs.pop("storage", []))
+        self.queues = load_queues(kwargs.pop("queues", {}))
+        self.rules = load_rules(kwargs.pop("rules", []))
+        self.suppression = load_suppression(kwargs.pop("suppression", None))
 
         self.__dict__.update(kwargs)
 
 
+class SectionDiff:
+    """Names of the entries added, removed and changed in a config section."""
+
+    def __init__(self, added: list, removed: list, changed: list):
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def as_dict(self) -> dict:
+        return {"added": self.added, "removed": self.removed, "changed": self.changed}
+
+    def updated(self, entries: list) -> list:
+        """Returns the given configuration entries that were added or changed."""
+        names = self.added + self.changed
+        return [entry for entry in entries if entry.name in names]
+
+
+class ConfigDiff:
+    """Differences between a running configuration and a reloaded one."""
+
+    RESTART_SETTINGS = ("ip", "port", "password")
+
+    def __init__(self, old: Config, new: Config):
+        self.sections = {
+            section: diff_section(old.sections[section], new.sections[section])
+            for section in ("heartbeats", "listeners", "notifiers", "rules", "storage")
+        }
+        self.logging = _describe_all(old.sections["logging"]) != _describe_all(
+            new.sections["logging"]
+        )
+        self.suppression = vars(old.suppression) != vars(new.suppression)
+        self.zones = old.zones != new.zones
+        self.zone_dump_interval = old.zone_dump_interval != new.zone_dump_interval
+        self.partitions = old.partitions != new.partitions
+        self.restart_required = [
+            setting
+            for setting in self.RESTART_SETTINGS
+            if getattr(old, setting) != getattr(new, setting)
+        ]
+        if _describe_all(old.queues.values()) != _describe_all(new.queues.values()):
+            self.restart_required.append("queues")
+        if vars(old.http) != vars(new.http):
+            self.restart_required.append("http")
+
+    def __bool__(self):
+        return (
+            any(self.sections.values())
+            or self.logging
+            or self.suppression
+            or self.zones
+            or self.zone_dump_interval
+            or self.partitions
+            or bool(self.restart_required)
+        )
+
+    def as_dict(self) -> dict:
+        return {
+            **{name: section.as_dict() for name, section in self.sections.items()},
+            "logging": self.logging,
+            "suppression": self.suppression,
+            "zones": self.zones,
+            "zone_dump_interval": self.zone_dump_interval,
+            "partitions": self.partitions,
+            "restart_required": self.restart_required,
+        }
+
+
 class HeartbeatConfig:
     def __init__(self, **kwargs):
         self.__dict__.update(kwargs)
 
 
+class HttpConfig:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
 class ListenerConfig:
     def __init__(self, **kwargs):
         self.kind = kwargs.pop("type")
@@ -56,17 +174,35 @@ class NotifierConfig:
         self.__dict__.update(kwargs)
 
 
+class QueueConfig:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class RuleConfig:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
 class StorageConfig:
     def __init__(self, **kwargs):
         self.__dict__.update(kwargs)
 
 
+class SuppressionConfig:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
 class HeartbeatSchema(Schema):
     auth_token = fields.String(required=True)
+    batch = fields.Boolean(required=False, missing=False)
     device_id = fields.Integer(required=True)
     device_uuid = fields.String(required=True)
     interval = fields.Integer(required=False, missing=DEFAULT_HEARTBEAT_INTERVAL)
+    jitter = fields.Float(required=False, missing=None, validate=validate.Range(min=0))
     name = fields.String(required=True)
+    piggyback = fields.Boolean(required=False, missing=False)
     url = fields.Url(required=True)
 
     @post_load
@@ -74,6 +210,20 @@ class HeartbeatSchema(Schema):
         return HeartbeatConfig(**data)
 
 
+class HttpSchema(Schema):
+    connect_timeout = fields.Float(required=False, validate=validate.Range(min=0))
+    dns_cache_ttl = fields.Integer(required=False, validate=validate.Range(min=0))
+    keepalive_timeout = fields.Float(required=False, validate=validate.Range(min=0))
+    limit = fields.Integer(required=False, validate=validate.Range(min=0))
+    limit_per_host = fields.Integer(required=False, validate=validate.Range(min=0))
+    prewarm = fields.Boolean(required=False)
+    timeout = fields.Float(required=False, validate=validate.Range(min=0))
+
+    @post_load
+    def make_http_config(self, data, **kwargs):
+        return HttpConfig(**data)
+
+
 class ListenerSchema(Schema):
     name = fields.String(required=True)
     settings = fields.Dict(
@@ -87,9 +237,35 @@ class ListenerSchema(Schema):
 
 
 class LoggingSchema(Schema):
-    level = fields.String(required=False, missing=DEFAULT_LOGGING_LEVEL)
+    address = fields.String(required=False, missing=None)
+    backup_count = fields.Integer(
+        required=False, missing=DEFAULT_LOG_BACKUP_COUNT, validate=validate.Range(min=0)
+    )
+    facility = fields.String(
+        required=False,
+        missing="user",
+        validate=validate.OneOf(logging.handlers.SysLogHandler.facility_names),
+    )
+    format = fields.String(required=False, missing=None)
+    level = fields.String(
+        required=False,
+        missing=DEFAULT_LOGGING_LEVEL,
+        validate=validate.OneOf(LOGGING_LEVELS),
+    )
+    max_bytes = fields.Integer(
+        required=False, missing=DEFAULT_LOG_MAX_BYTES, validate=validate.Range(min=0)
+    )
     name = fields.String(required=True)
-    type = fields.String(required=True)
+    path = fields.String(required=False, missing=None)
+    type = fields.String(required=True, validate=validate.OneOf(LOGGING_TYPES))
+
+    @validates_schema
+    def validate_path(self, data, **kwargs):
+        if data.get("type") in ("file", "rotating") and not data.get("path"):
+            raise ValidationError(
+                "A path is required for {kind} logging.".format(kind=data["type"]),
+                "path",
+            )
 
     @post_load
     def make_logging_config(self, data, **kwargs):
@@ -97,6 +273,11 @@ class LoggingSchema(Schema):
 
 
 class NotifierSchema(Schema):
+    commands = fields.List(
+        fields.String(validate=validate.OneOf([c.value for c in cmd.CommandType])),
+        required=False,
+        missing=None,
+    )
     layout = fields.String(required=False, missing=None)
     name = fields.String(required=True)
     priority = fields.String(required=False, missing=DEFAULT_NOTIFIER_PRIORITY)
@@ -112,6 +293,53 @@ class NotifierSchema(Schema):
         return NotifierConfig(**data)
 
 
+class QueueSchema(Schema):
+    maxsize = fields.Integer(required=False, validate=validate.Range(min=0))
+    policy = fields.String(required=False, validate=validate.OneOf(queues.POLICIES))
+
+    @post_load
+    def make_queue_config(self, data, **kwargs):
+        return QueueConfig(**data)
+
+
+class ActionSchema(Schema):
+    class Meta:
+        # Settings of the action depend on its type, see evl.rules.Action.
+        unknown = INCLUDE
+
+    type = fields.String(required=True, validate=validate.OneOf(rules.ACTIONS))
+
+    @validates_schema
+    def validate_command(self, data, **kwargs):
+        if data["type"] == rules.SEND:
+            try:
+                cmd.CommandType(data.get("command"))
+            except ValueError:
+                raise ValidationError("Invalid command.", "command")
+
+
+class RuleSchema(Schema):
+    actions = fields.List(fields.Nested(ActionSchema), required=True)
+    commands = fields.List(
+        fields.String(validate=validate.OneOf([c.value for c in cmd.CommandType])),
+        required=False,
+        missing=None,
+    )
+    group = fields.String(required=False, missing=None)
+    name = fields.String(required=True)
+    partitions = fields.List(fields.String(), required=False, missing=None)
+    priority = fields.String(
+        required=False,
+        missing=None,
+        validate=validate.OneOf([p.name for p in cmd.Priority]),
+    )
+    zones = fields.List(fields.String(), required=False, missing=None)
+
+    @post_load
+    def make_rule_config(self, data, **kwargs):
+        return RuleConfig(**data)
+
+
 class StorageSchema(Schema):
     name = fields.String(required=True)
     settings = fields.Dict(
@@ -124,8 +352,28 @@ class StorageSchema(Schema):
         return StorageConfig(**data)
 
 
+class SuppressionSchema(Schema):
+    enabled = fields.Boolean(required=False, missing=False)
+    mode = fields.String(
+        required=False, missing=suppress.DROP, validate=validate.OneOf(suppress.MODES)
+    )
+    windows = fields.Dict(
+        keys=fields.String(
+            validate=validate.OneOf([command.value for command in cmd.CommandType])
+        ),
+        values=fields.Float(allow_none=True, validate=validate.Range(min=0)),
+        required=False,
+        missing=None,
+    )
+
+    @post_load
+    def make_suppression_config(self, data, **kwargs):
+        return SuppressionConfig(**data)
+
+
 class ConfigSchema(Schema):
     heartbeats = fields.List(fields.Nested(HeartbeatSchema), required=False, missing=[])
+    http = fields.Nested(HttpSchema, required=False, missing=None)
     ip = fields.IPv4(required=True)
     listeners = fields.List(fields.Nested(ListenerSchema), required=False, missing=[])
     logging = fields.List(fields.Nested(LoggingSchema), required=False, missing=[])
@@ -137,56 +385,100 @@ class ConfigSchema(Schema):
     )
     password = fields.String(missing="")
     port = fields.Integer(required=False, missing=4025)
+    queues = fields.Dict(
+        keys=fields.String(validate=validate.OneOf(queues.DEFAULTS)),
+        values=fields.Nested(QueueSchema),
+        required=False,
+        missing={},
+    )
+    rules = fields.List(fields.Nested(RuleSchema), required=False, missing=[])
     storage = fields.List(fields.Nested(StorageSchema), required=False, missing=[])
+    suppression = fields.Nested(SuppressionSchema, required=False, missing=None)
+    zone_dump_interval = fields.Integer(
+        required=False, missing=0, validate=validate.Range(min=0)
+    )
     zones = fields.Mapping(
         keys=fields.String(required=True),
         values=fields.String(required=True),
         required=True,
     )
 
+    def __init__(self, *args, backends: bool = True, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Whether the loaded Config creates its heartbeats, notifiers and
+        # storage engines.
+        self.backends = backends
+
     @post_load
     def make_config(self, data, **kwargs):
-        return Config(**data)
+        return Config(backends=self.backends, **data)
 
 
 HeartbeatConfigs = list[HeartbeatConfig]
 ListenerConfigs = list[ListenerConfig]
 LoggingConfigs = list[LoggingConfig]
 NotifierConfigs = list[NotifierConfig]
+RuleConfigs = list[RuleConfig]
 StorageConfigs = list[StorageConfig]
 
 
-def load_heartbeats(config: HeartbeatConfigs) -> list[heartbeat.HeartbeatTask]:
+def load_heartbeats(config: HeartbeatConfigs) -> list:
+    if not config:
+        return []
+
+    # Imported here so that aiohttp is only loaded when heartbeats are used.
+    import evl.tasks.heartbeat as heartbeat
+
     heartbeats = []
     for hb in config:
         new_heartbeat = heartbeat.HeartbeatTask(
-            hb.name, hb.device_id, hb.device_uuid, hb.interval, hb.url, hb.auth_token
+            hb.name,
+            hb.device_id,
+            hb.device_uuid,
+            hb.interval,
+            hb.url,
+            hb.auth_token,
+            jitter=hb.jitter,
+            batch=hb.batch,
+            piggyback=hb.piggyback,
         )
         heartbeats.append(new_heartbeat)
 
-    return heartbeats
+    return heartbeat.batch(heartbeats)
+
+
+def load_http(config: HttpConfig) -> HttpConfig:
+    """
+    Returns the configuration of the shared HTTP client, using defaults for
+    any setting that isn't configured.
+    :param config: HTTP configuration object, if configured
+    :return: HTTP configuration object
+    """
+    return HttpConfig(
+        connect_timeout=getattr(
+            config, "connect_timeout", httpclient.DEFAULT_CONNECT_TIMEOUT
+        ),
+        dns_cache_ttl=getattr(
+            config, "dns_cache_ttl", httpclient.DEFAULT_DNS_CACHE_TTL
+        ),
+        keepalive_timeout=getattr(
+            config, "keepalive_timeout", httpclient.DEFAULT_KEEPALIVE_TIMEOUT
+        ),
+        limit=getattr(config, "limit", httpclient.DEFAULT_LIMIT),
+        limit_per_host=getattr(
+            config, "limit_per_host", httpclient.DEFAULT_LIMIT_PER_HOST
+        ),
+        prewarm=getattr(config, "prewarm", True),
+        timeout=getattr(config, "timeout", httpclient.DEFAULT_TIMEOUT),
+    )
 
 
 def load_listeners(config: ListenerConfigs, event_manager) -> list:
     listeners = []
     for listener in config:
-        if listener.kind == "http":
-            settings = listener.settings
-            port = int(settings.get("port", 5204))
-            auth_token = settings.get("auth_token", "")
-            new_listener = http.AsyncHttpListener(
-                listener.name,
-                port,
-                auth_token,
-                event_manager,
-                "memory",
-            )
-
-        else:
-            new_listener = None
-
-        if new_listener:
-            listeners.append(new_listener)
+        factory = _load_plugin(plugins.LISTENERS, listener.kind)
+        if factory:
+            listeners.append(factory(listener, event_manager))
 
     return listeners
 
@@ -201,6 +493,7 @@ def load_logging(config: LoggingConfigs) -> dict:
 
     log_config = {
         "version": 1,
+        "formatters": {},
         "handlers": {},
         "loggers": {},
         "root": {"level": logging.NOTSET},
@@ -213,19 +506,72 @@ def load_logging(config: LoggingConfigs) -> dict:
         kind = new_logger.type
 
         if kind == "console":
-            log_config["handlers"][name] = {
-                "class": "logging.StreamHandler",
-                "level": priority,
-                "stream": sys.stderr,
+            handler = {"class": "logging.StreamHandler", "stream": sys.stderr}
+        elif kind == "file":
+            handler = {
+                "class": "logging.FileHandler",
+                "filename": os.path.expanduser(new_logger.path),
+                "encoding": "utf-8",
+            }
+        elif kind == "rotating":
+            handler = {
+                "class": "logging.handlers.RotatingFileHandler",
+                "filename": os.path.expanduser(new_logger.path),
+                "maxBytes": new_logger.max_bytes,
+                "backupCount": new_logger.backup_count,
+                "encoding": "utf-8",
             }
-            handlers.append(name)
+        elif kind == "syslog":
+            handler = {
+                "class": "logging.handlers.SysLogHandler",
+                "address": _syslog_address(new_logger.address),
+                "facility": new_logger.facility,
+            }
+        else:
+            continue
+
+        log_format = new_logger.format
+        if log_format is None and kind != "console":
+            log_format = (
+                DEFAULT_SYSLOG_FORMAT if kind == "syslog" else DEFAULT_LOG_FORMAT
+            )
+        if log_format is not None:
+            log_config["formatters"][name] = {"format": log_format}
+            handler["formatter"] = name
+
+        handler["level"] = priority
+        log_config["handlers"][name] = handler
+        handlers.append(name)
 
     if handlers:
-        log_config["loggers"]["evl"] = {"handlers": handlers}
+        # The logger level is that of the most verbose handler, so that
+        # logging calls below it return without creating a record.
+        level = min(
+            logging.getLevelName(log_config["handlers"][name]["level"])
+            for name in handlers
+        )
+        log_config["loggers"]["evl"] = {
+            "handlers": handlers,
+            "level": logging.getLevelName(level),
+        }
 
     return log_config
 
 
+def _syslog_address(address: str):
+    """
+    Returns the address of a syslog server as expected by SysLogHandler.
+    :param address: Path of a Unix socket or host:port, defaults to /dev/log
+    :return: Socket path or (host, port) tuple
+    """
+    if not address:
+        return DEFAULT_SYSLOG_ADDRESS
+    host, separator, port = address.rpartition(":")
+    if separator and port.isdigit() and not address.startswith("/"):
+        return host, int(port)
+    return address
+
+
 def load_notifiers(config: NotifierConfigs) -> dict:
     """
     Load notifiers from given list of notifier configurations
@@ -233,44 +579,43 @@ def load_notifiers(config: NotifierConfigs) -> dict:
     """
     notifiers = {}
     for notifier in config:
-        name = notifier.name
-        priority = cmd.Priority[notifier.priority]
-        kind = notifier.type
-        layout = notifier.layout
-        settings = notifier.settings
+        factory = _load_plugin(plugins.NOTIFIERS, notifier.type)
+        if factory:
+            instance = factory(notifier)
+            if notifier.commands is not None:
+                # Only events of these commands are routed to the notifier.
+                instance.commands = frozenset(
+                    cmd.CommandType(command) for command in notifier.commands
+                )
+            notifiers[notifier.name] = instance
 
-        if kind == "console":
-            new_notifier = console.ConsoleNotifier(priority=priority, name=name)
-        elif kind == "sms":
-            sender = settings.get("sender")
-            recipient = settings.get("recipient")
-            sid = settings.get("sid")
-            auth_token = settings.get("authToken")
-            new_notifier = sms.SmsNotifier(
-                sid, auth_token, sender, recipient, priority, layout, name
-            )
-        elif kind == "email":
-            sender = settings.get("sender")
-            recipient = settings.get("recipient")
-            api_key = settings.get("apiKey")
-            subject = settings.get("subject")
-            new_notifier = email.EmailNotifier(
-                api_key, sender, recipient, priority, layout, subject, name
-            )
-        elif kind == "mimir":
-            auth_token = settings.get("auth_token")
-            device_uuid = settings.get("device_uuid")
-            url = settings.get("url")
-            new_notifier = mimir.MimirNotifier(
-                url, device_uuid, auth_token, priority, layout, name
-            )
-        else:
-            new_notifier = None
+    return notifiers
 
-        if new_notifier:
-            notifiers[name] = new_notifier
 
-    return notifiers
+def load_queues(config: dict) -> dict:
+    """
+    Returns the capacity and overflow policy of each of the daemon's queues,
+    using defaults for any queue or setting that isn't configured.
+    :param config: Dict of queue name to queue configuration object
+    :return: Dict of queue name to queue configuration object
+    """
+    loaded = {}
+    for name, (maxsize, policy) in queues.DEFAULTS.items():
+        queue = config.get(name)
+        loaded[name] = QueueConfig(
+            maxsize=getattr(queue, "maxsize", maxsize),
+            policy=getattr(queue, "policy", policy),
+        )
+    return loaded
+
+
+def load_rules(config: RuleConfigs) -> list:
+    """
+    Load rules from given list of rule configurations
+    :param config: List of rule configuration objects
+    :return: List of rules
+    """
+    return [rules.from_dict(vars(rule)) for rule in config]
 
 
 def load_storage(config: StorageConfigs) -> dict:
@@ -280,27 +625,110 @@ def load_storage(config: StorageConfigs) -> dict:
     """
     storages = {}
     for storage in config:
-        kind = storage.type
-        name = storage.name
-        settings = storage.settings
-
-        # Set up storage engines defined in configuration file
-        if kind == "memory":
-            max_size = int(settings.get("maxSize", DEFAULT_STORAGE_MAX_LENGTH))
-            new_storage = memory.MemoryStorage(size=max_size, name=name)
-        else:
-            new_storage = None
-
-        if new_storage:
-            storages[name] = new_storage
+        factory = _load_plugin(plugins.STORAGE, storage.type)
+        if factory:
+            storages[storage.name] = _write_behind(storage, factory(storage))
     return storages
 
 
-def read(file: str) -> ConfigSchema:
+def _write_behind(config: StorageConfig, storage):
+    """
+    Wraps the given storage engine in a write-behind buffer if its
+    configuration enables one with the "writeBehind" setting. Engines that do
+    I/O when storing, such as tiered storage, enable it by default.
+    """
+    settings = config.settings or {}
+    default = "true" if getattr(storage, "write_behind", False) else "false"
+    if settings.get("writeBehind", default).lower() != "true":
+        return storage
+
+    from evl.storage import writebehind
+
+    return writebehind.WriteBehindStorage(
+        storage,
+        int(settings.get("batchSize", writebehind.DEFAULT_BATCH_SIZE)),
+        float(settings.get("flushInterval", writebehind.DEFAULT_FLUSH_INTERVAL)),
+        int(settings.get("maxRetries", writebehind.DEFAULT_MAX_RETRIES)),
+    )
+
+
+def _load_plugin(group: str, kind: str):
+    """
+    Returns the factory for the given backend type, or None if the backend
+    is unknown or cannot be loaded.
+    :param group: Plugin group of the backend
+    :param kind: Backend type name from the configuration file
+    """
+    try:
+        return plugins.load(group, kind)
+    except plugins.PluginError as e:
+        logger.error(str(e))
+        return None
+
+
+def diff_section(old: list, new: list) -> SectionDiff:
+    """
+    Compares two lists of named configuration objects.
+    :param old: Running configuration objects
+    :param new: Reloaded configuration objects
+    :return: Names of added, removed and changed entries
+    """
+    old_by_name = {entry.name: vars(entry) for entry in old}
+    new_by_name = {entry.name: vars(entry) for entry in new}
+
+    return SectionDiff(
+        added=[name for name in new_by_name if name not in old_by_name],
+        removed=[name for name in old_by_name if name not in new_by_name],
+        changed=[
+            name
+            for name, entry in new_by_name.items()
+            if name in old_by_name and old_by_name[name] != entry
+        ],
+    )
+
+
+def diff(old: Config, new: Config) -> ConfigDiff:
+    """
+    Returns the differences between the running and a reloaded configuration.
+    :param old: Running configuration
+    :param new: Reloaded configuration
+    :return: ConfigDiff describing the changes
+    """
+    return ConfigDiff(old, new)
+
+
+def _describe_all(entries: list) -> list:
+    return [vars(entry) for entry in entries]
+
+
+def load_suppression(config: SuppressionConfig) -> SuppressionConfig:
+    """
+    Returns the event suppression configuration, using defaults for any
+    setting that isn't configured. Suppression is off unless enabled.
+    :param config: Suppression configuration object, if configured
+    :return: Suppression configuration object with windows keyed by CommandType
+    """
+    enabled = getattr(config, "enabled", False)
+    mode = getattr(config, "mode", suppress.DROP)
+    windows = getattr(config, "windows", None)
+
+    if windows is None:
+        windows = dict(suppress.DEFAULT_WINDOWS)
+    else:
+        windows = {
+            cmd.CommandType(number): window for number, window in windows.items()
+        }
+
+    return SuppressionConfig(enabled=enabled, mode=mode, windows=windows)
+
+
+def read(file: str, backends: bool = True) -> ConfigSchema:
     """
     Reads configuration from given file path and returns dictionary of
     configuration objects.
     :param file: Configuration file path
+    :param backends: Whether to load the configured heartbeats, notifiers and
+        storage engines, or leave them to the caller
     :return: ConfigSchema object containing parsed configuration
     """
     file = os.path.expanduser(file)
@@ -314,7 +742,7 @@ def read(file: str) -> ConfigSchema:
     except json.JSONDecodeError:
         logger.critical("Invalid configuration file '{file}'!".format(file=file))
 
-    config_schema = ConfigSchema()
+    config_schema = ConfigSchema(backends=backends)
     config = config_schema.load(data)
 
     return config
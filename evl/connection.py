@@ -1,13 +1,27 @@
 import asyncio
 import logging
+import time
 
+from collections import deque
+
+import evl.capture as capture
+import evl.control as control
 import evl.tpi as tpi
 import evl.command as cmd
 import evl.data as dt
 import evl.event as ev
+import evl.queues as queues
 
 logger = logging.getLogger(__name__)
 
+# Seconds to wait for the acknowledgement of a sent command.
+ACK_TIMEOUT = 2.0
+
+ACKNOWLEDGE = cmd.CommandType.COMMAND_ACKNOWLEDGE.value
+
+# Errors the EVL device answers a sent command with instead of acknowledging it.
+ERROR_COMMANDS = {cmd.CommandType.COMMAND_ERROR, cmd.CommandType.SYSTEM_ERROR}
+
 
 class Connection:
     """
@@ -22,27 +36,44 @@ class Connection:
         host: str,
         port: int = 4025,
         password: str = "",
+        capture_writer: capture.CaptureWriter = None,
+        queue_config: dict = None,
     ):
 
         self.host = host
         self.port = port
         self.password = password
+        self.capture = capture_writer
 
         self._event_manager = event_manager
 
-        self._recv_queue = asyncio.Queue()
-        self._send_queue = asyncio.Queue()
-        self._ack_queue = asyncio.Queue()
+        if queue_config is None:
+            queue_config = {}
+        self._recv_queue = queues.frame_queue("recv", queue_config.get("recv"))
+        self._send_queue = queues.frame_queue("send", queue_config.get("send"))
+        self._ack_queue = queues.frame_queue("ack", queue_config.get("ack"))
 
         self._reader: asyncio.StreamReader = None
         self._writer: asyncio.StreamWriter = None
 
-    async def start(self):
+        # Futures awaiting the acknowledgement of each queued packet, in order.
+        self._acks = {}
+        # Packet sent and awaiting acknowledgement, if any.
+        self._sending = None
+
+        self.commander = control.Commander(self)
+
+    async def start(self, reader=None, writer=None):
         """
         Begins processing by connecting to the EVL device and initiating
         the various data handling routines.
+        :param reader: Optional stream reader to use instead of connecting
+        :param writer: Optional stream writer to use instead of connecting
         """
-        await self._connect()
+        if reader is None:
+            await self._connect()
+        else:
+            (self._reader, self._writer) = (reader, writer)
 
         await asyncio.gather(self._receive(), self._send(), self._process())
 
@@ -70,6 +101,7 @@ class Connection:
             if not data:
                 break
 
+            received_ns = time.perf_counter_ns()
             decoded = incomplete + data.decode("ascii")
             if decoded.endswith("\r\n"):
                 # Complete command(s) received
@@ -82,6 +114,8 @@ class Connection:
                 incomplete = split[-1]
 
             for e in events:
+                if self.capture is not None:
+                    self.capture.write(e, received_ns)
                 await self._recv_queue.put(e)
 
         logger.warning("Disconnected!")
@@ -95,15 +129,63 @@ class Connection:
         logger.debug("Initiating send loop...")
         while True:
             packet = await self._send_queue.get()
-            self._writer.write(packet.encode())
-            await self._writer.drain()
 
+            # Anything still queued answers a packet that already timed out.
+            while not self._ack_queue.empty():
+                logger.warning(
+                    "Discarding late acknowledgement: %s", self._ack_queue.get_nowait()
+                )
+
+            ack = None
+            # Set before writing, as an error may arrive while draining.
+            self._sending = packet
+            try:
+                self._writer.write(packet.encode())
+                await self._writer.drain()
+                ack = await self._wait_for_ack(packet)
+            finally:
+                self._sending = None
+            self._acknowledge(packet, ack)
+
+    async def _wait_for_ack(self, packet: str):
+        """
+        Waits for the acknowledgement of the given packet, or for an error,
+        until ACK_TIMEOUT has passed. Acknowledgements of other packets are
+        discarded.
+        :param packet: Sent packet
+        :return: Acknowledgement or error frame, or None on timeout
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + ACK_TIMEOUT
+        while True:
             try:
-                ack = await asyncio.wait_for(self._ack_queue.get(), timeout=2.0)
-                if tpi.parse_data(ack) != tpi.parse_command(packet):
-                    logger.error("Incorrect acknowledgement!")
+                ack = await asyncio.wait_for(
+                    self._ack_queue.get(), timeout=max(deadline - loop.time(), 0)
+                )
             except asyncio.TimeoutError:
                 logger.error("Timeout waiting for acknowledgement!")
+                return None
+
+            acknowledged = tpi.parse_command(ack) == ACKNOWLEDGE
+            if not acknowledged or tpi.parse_data(ack) == tpi.parse_command(packet):
+                return ack
+            logger.warning("Discarding acknowledgement of another command: %s", ack)
+
+    def _acknowledge(self, packet: str, ack: str) -> None:
+        """
+        Passes the acknowledgement of a sent packet to the oldest caller
+        still waiting for it.
+        :param packet: Sent packet
+        :param ack: Acknowledgement or error frame, or None on timeout
+        """
+        waiting = self._acks.get(packet)
+        while waiting:
+            future = waiting.popleft()
+            if not future.done():
+                future.set_result(ack)
+                break
+        if not waiting:
+            self._acks.pop(packet, None)
 
     async def _process(self):
         """
@@ -113,28 +195,55 @@ class Connection:
         logger.debug("Initiating process loop...")
         while True:
             event = await self._recv_queue.get()
+            try:
+                await self.process_frame(event)
+            finally:
+                self._recv_queue.task_done()
+
+    async def process_frame(self, event: str):
+        """
+        Validates and processes a single incoming frame.
+        :param event: Raw frame received from the EVL device
+        """
+        if not tpi.validate_checksum(event):
+            logger.error("Invalid checksum detected on incoming data!")
+            return
 
-            if not tpi.validate_checksum(event):
-                logger.error("Invalid checksum detected on incoming data!")
-                continue
-
-            command = cmd.Command(tpi.parse_command(event))
-            data = tpi.parse_data(event)
-            if (
-                command.command_type == cmd.CommandType.LOGIN
-                and dt.LoginType(data) == dt.LoginType.PASSWORD_REQUEST
-            ):
-                logger.debug("Logging in...")
-                await self.send(cmd.CommandType.NETWORK_LOGIN, self.password)
-            elif command.command_type == cmd.CommandType.COMMAND_ACKNOWLEDGE:
+        command = cmd.Command(tpi.parse_command(event))
+        data = tpi.parse_data(event)
+        if (
+            command.command_type == cmd.CommandType.LOGIN
+            and dt.LoginType(data) == dt.LoginType.PASSWORD_REQUEST
+        ):
+            logger.debug("Logging in...")
+            await self.send(cmd.CommandType.NETWORK_LOGIN, self.password)
+        elif command.command_type == cmd.CommandType.COMMAND_ACKNOWLEDGE:
+            await self._ack_queue.put(event)
+        else:
+            if command.command_type in ERROR_COMMANDS and self._sending is not None:
+                # Answers the packet being sent, and is dispatched as well.
                 await self._ack_queue.put(event)
-            else:
-                await self._event_manager.enqueue(command, data)
+            self.commander.observe(command, data)
+            await self._event_manager.enqueue(command, data)
+
+    def queues(self) -> dict:
+        """Returns the connection's receive, send and acknowledgement queues."""
+        return {
+            "recv": self._recv_queue,
+            "send": self._send_queue,
+            "ack": self._ack_queue,
+        }
+
+    async def join(self):
+        """Waits until all received frames have been processed."""
+        await self._recv_queue.join()
 
     def stop(self):
         """Cleanly stop all processing and disconnect from the EVL device."""
         if self._writer is not None:
             self._writer.close()
+        if self.capture is not None:
+            self.capture.close()
 
     async def send(self, command: cmd.CommandType, data: str = ""):
         """
@@ -142,9 +251,27 @@ class Connection:
         :param command: CommandType to send
         :param data: Data to send, if applicable
         """
-        command_str = command.value
-        checksum = tpi.calculate_checksum(command_str + data)
-        packet = "{command}{data}{checksum}\r\n".format(
-            command=command_str, data=data, checksum=checksum
-        )
+        await self._send_queue.put(_packet(command, data))
+
+    async def request(self, command: cmd.CommandType, data: str = "") -> asyncio.Future:
+        """
+        Sends the given command and data to the EVL device, returning a future
+        for its acknowledgement.
+        :param command: CommandType to send
+        :param data: Data to send, if applicable
+        :return: Future resolving to the acknowledgement or error frame
+            received for the command, or None if none was received in time
+        """
+        packet = _packet(command, data)
+        future = asyncio.get_running_loop().create_future()
+        self._acks.setdefault(packet, deque()).append(future)
         await self._send_queue.put(packet)
+        return future
+
+
+def _packet(command: cmd.CommandType, data: str) -> str:
+    command_str = command.value
+    checksum = tpi.calculate_checksum(command_str + data)
+    return "{command}{data}{checksum}\r\n".format(
+        command=command_str, data=data, checksum=checksum
+    )
@@ -0,0 +1,252 @@
+"""
+Commands sent to the EVL device, awaiting the panel's response.
+
+Commander.execute() queues a command, waits for the EVL to acknowledge it
+with 500 or reject it with 501 or 502 and, for commands with a visible
+result, waits for the first event reporting the outcome, such as 652
+PARTITION_ARMED or 659 PARTITION_FAILED_TO_ARM after arming a partition. The
+result holds the outcome and the measured round-trip latencies.
+
+Commands for the same partition, or of the same type for commands without a
+partition, run one at a time, so that each response is attributed to the
+command that caused it.
+"""
+
+import asyncio
+import logging
+import time
+
+from collections import Counter
+
+import evl.command as cmd
+import evl.data as dt
+import evl.tpi as tpi
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for a command's acknowledgement and response.
+DEFAULT_TIMEOUT = 10.0
+
+# Outcomes of a command.
+OK = "ok"
+FAILED = "failed"
+ERROR = "error"
+TIMEOUT = "timeout"
+
+_ARM_RESPONSES = {
+    cmd.CommandType.PARTITION_ARMED: True,
+    cmd.CommandType.EXIT_DELAY_IN_PROGRESS: True,
+    cmd.CommandType.PARTITION_FAILED_TO_ARM: False,
+    cmd.CommandType.FAILURE_TO_ARM: False,
+    cmd.CommandType.PARTITION_IS_BUSY: False,
+    cmd.CommandType.INVALID_ACCESS_CODE: False,
+    cmd.CommandType.FUNCTION_NOT_AVAILABLE: False,
+    cmd.CommandType.KEYPAD_LOCK_OUT: False,
+}
+
+# Events reporting the outcome of a command, and whether each means success.
+# Other commands complete once acknowledged.
+RESPONSES = {
+    cmd.CommandType.PARTITION_ARM_AWAY: _ARM_RESPONSES,
+    cmd.CommandType.PARTITION_ARM_STAY: _ARM_RESPONSES,
+    cmd.CommandType.PARTITION_ARM_ZERO_ENTRY_DELAY: _ARM_RESPONSES,
+    cmd.CommandType.PARTITION_ARM_WITH_CODE: _ARM_RESPONSES,
+    cmd.CommandType.PARTITION_DISARM_WITH_CODE: {
+        cmd.CommandType.PARTITION_DISARMED: True,
+        cmd.CommandType.INVALID_ACCESS_CODE: False,
+        cmd.CommandType.FUNCTION_NOT_AVAILABLE: False,
+        cmd.CommandType.KEYPAD_LOCK_OUT: False,
+    },
+    cmd.CommandType.DUMP_ZONE_TIMERS: {
+        cmd.CommandType.ENVISALINK_ZONE_TIMER_DUMP: True,
+    },
+}
+
+# Commands whose data starts with a partition number.
+PARTITION_CONTROL_COMMANDS = {
+    cmd.CommandType.PARTITION_ARM_AWAY,
+    cmd.CommandType.PARTITION_ARM_STAY,
+    cmd.CommandType.PARTITION_ARM_ZERO_ENTRY_DELAY,
+    cmd.CommandType.PARTITION_ARM_WITH_CODE,
+    cmd.CommandType.PARTITION_DISARM_WITH_CODE,
+}
+
+# Commands that also take a user code.
+CODE_COMMANDS = {
+    cmd.CommandType.PARTITION_ARM_WITH_CODE,
+    cmd.CommandType.PARTITION_DISARM_WITH_CODE,
+}
+
+# Commands by the name used in requests.
+COMMANDS = {
+    "poll": cmd.CommandType.POLL,
+    "status_report": cmd.CommandType.STATUS_REPORT,
+    "dump_zone_timers": cmd.CommandType.DUMP_ZONE_TIMERS,
+    "arm_away": cmd.CommandType.PARTITION_ARM_AWAY,
+    "arm_stay": cmd.CommandType.PARTITION_ARM_STAY,
+    "arm_zero_entry_delay": cmd.CommandType.PARTITION_ARM_ZERO_ENTRY_DELAY,
+    "arm": cmd.CommandType.PARTITION_ARM_WITH_CODE,
+    "disarm": cmd.CommandType.PARTITION_DISARM_WITH_CODE,
+}
+
+_ACKNOWLEDGE = cmd.CommandType.COMMAND_ACKNOWLEDGE.value
+
+
+def command_data(name: str, partition: str = None, code: str = None) -> tuple:
+    """
+    Returns the command and data to send for a named command.
+    :param name: Command name, one of COMMANDS
+    :param partition: Partition number, for partition commands
+    :param code: User code of 4 to 6 digits, for arming with code and disarming
+    :return: (CommandType, data) tuple
+    """
+    command = COMMANDS.get(name)
+    if command is None:
+        raise ValueError("Unknown command {name}!".format(name=name))
+    if command not in PARTITION_CONTROL_COMMANDS:
+        return command, ""
+
+    partition = str(partition) if partition is not None else ""
+    if len(partition) != 1 or not "1" <= partition <= "8":
+        raise ValueError("A partition from 1 to 8 is required!")
+    if command not in CODE_COMMANDS:
+        return command, partition
+
+    code = str(code) if code is not None else ""
+    if not code.isdigit() or not 4 <= len(code) <= 6:
+        raise ValueError("A code of 4 to 6 digits is required!")
+    return command, partition + code
+
+
+class CommandResult:
+    """Outcome and latencies of a command sent to the EVL device."""
+
+    def __init__(self, command: cmd.CommandType, partition: str = None):
+        self.command = command
+        self.partition = partition
+        self.outcome = None
+        # Command number of the response event, if any.
+        self.response = None
+        # Error code sent by the EVL with 502 SYSTEM_ERROR, if any.
+        self.error = None
+        # Nanoseconds until the acknowledgement and the outcome were received.
+        self.ack_latency = None
+        self.latency = None
+
+    def as_dict(self) -> dict:
+        return {
+            "command": self.command.value,
+            "description": cmd.Command(self.command.value).describe(),
+            "partition": self.partition,
+            "outcome": self.outcome,
+            "response": self.response,
+            "error": self.error,
+            "ack_latency_ms": _ms(self.ack_latency),
+            "latency_ms": _ms(self.latency),
+        }
+
+
+def _ms(nanoseconds: int) -> float:
+    return round(nanoseconds / 1e6, 3) if nanoseconds is not None else None
+
+
+class Commander:
+    """Sends commands through a connection and awaits their outcome."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.outcomes = Counter()
+
+        self._locks = {}
+        # (responses, partition, future) of commands awaiting a response.
+        self._waiters = []
+
+    async def execute(
+        self,
+        command: cmd.CommandType,
+        data: str = "",
+        timeout: float = DEFAULT_TIMEOUT,
+    ) -> CommandResult:
+        """
+        Sends a command and waits for its acknowledgement and, if it has one,
+        the event reporting its outcome.
+        :param command: CommandType to send
+        :param data: Data to send, if applicable
+        :param timeout: Seconds to wait for the command to complete, including
+            any wait for other commands to the same partition
+        :return: Result of the command
+        """
+        partition = data[:1] if command in PARTITION_CONTROL_COMMANDS else None
+        result = CommandResult(command, partition)
+        lock = self._locks.setdefault(partition or command, asyncio.Lock())
+        waiter = None
+
+        try:
+            async with asyncio.timeout(timeout):
+                async with lock:
+                    logger.debug("Sending %s command...", command.name)
+                    started = time.perf_counter_ns()
+                    responses = RESPONSES.get(command)
+                    if responses is not None:
+                        # Registered before sending, so no response is missed.
+                        waiter = asyncio.get_running_loop().create_future()
+                        self._waiters.append((responses, partition, waiter))
+
+                    ack = await (await self.connection.request(command, data))
+                    result.ack_latency = time.perf_counter_ns() - started
+                    self._complete(result, command, ack)
+                    if result.outcome is None:
+                        response, success = await waiter
+                        result.response = response.number
+                        result.outcome = OK if success else FAILED
+                    result.latency = time.perf_counter_ns() - started
+        except TimeoutError:
+            result.outcome = TIMEOUT
+        finally:
+            if waiter is not None:
+                waiter.cancel()
+                self._waiters = [
+                    entry for entry in self._waiters if entry[2] is not waiter
+                ]
+
+        self.outcomes[result.outcome] += 1
+        return result
+
+    @staticmethod
+    def _complete(result: CommandResult, command: cmd.CommandType, ack: str) -> None:
+        # Sets the outcome of a command from its acknowledgement, unless it
+        # still awaits a response.
+        if ack is None:
+            result.outcome = TIMEOUT
+        elif tpi.parse_command(ack) != _ACKNOWLEDGE:
+            result.outcome = ERROR
+            result.error = tpi.parse_data(ack) or None
+        elif tpi.parse_data(ack) != command.value:
+            result.outcome = ERROR
+        elif command not in RESPONSES:
+            result.outcome = OK
+
+    def observe(self, command: cmd.Command, data: str) -> None:
+        """
+        Completes the commands awaiting the given received command as their
+        response.
+        :param command: Command received from the EVL device
+        :param data: Data received with the given command
+        """
+        if not self._waiters:
+            return
+
+        partition = None
+        for responses, wanted, future in self._waiters:
+            success = responses.get(command.command_type)
+            if success is None or future.done():
+                continue
+            if wanted is not None:
+                if partition is None:
+                    partition = dt.parse(command, data).get("partition")
+                if partition != wanted:
+                    continue
+            future.set_result((command, success))
+
+    def stats(self) -> dict:
+        return {"outcomes": dict(self.outcomes), "pending": len(self._waiters)}
@@ -1,4 +1,8 @@
+import sys
+
+from array import array
 from enum import Enum
+from typing import Any, Callable, NamedTuple
 
 import evl.command as cmd
 
@@ -54,46 +58,230 @@ PARTITION_ARMED_NAMES = {
 }
 
 
+def _describe_led_bits(state: int) -> str:
+    leds = [
+        LedState(str(ind)).name.title() for ind in range(8) if state & (0x80 >> ind)
+    ]
+    return ", ".join(leds)
+
+
+# Descriptions of every possible LED state byte, indexed by its value.
+LED_STATE_DESCRIPTIONS = tuple(_describe_led_bits(state) for state in range(256))
+
+
 def describe_led_state(state: str) -> str:
     """
     Describes the given hex value LED state.
 
-    Converts the given hex value to a string of bits representing the LED
-    states and returns the enabled LEDs in a comma-separated string. Details
-    about LED state can be found in the EnvisaLink TPI documentation.
+    Each bit of the LED state byte represents one LED, see the EnvisaLink TPI
+    documentation for details. The enabled LEDs are looked up in a table of
+    all 256 possible states.
     :param state: Hex value of LED state
     :return: Comma-separated string of enabled LEDs
     """
-    state_base = 16
-    state_width = 8
+    return LED_STATE_DESCRIPTIONS[int(state, 16)]
 
-    bin_state = bin(int(state, state_base))[2:].zfill(state_width)
-    leds = [
-        LedState(str(ind)).name.title() for ind, st in enumerate(bin_state) if st == "1"
+
+ZONE_COUNT = 64
+
+# Zone timers count down from 0xFFFF in 5 second steps once a zone closes.
+ZONE_TIMER_OPEN = 0xFFFF
+ZONE_TIMER_RESOLUTION = 5
+
+
+def decode_zone_timers(data: str) -> array:
+    """
+    Decodes the data of a Zone Timer Dump (615) command into the number of
+    seconds since each zone was last closed.
+
+    The dump holds a 4 hex digit little-endian timer for each of the 64 zones.
+    A timer of FFFF means the zone is open, which decodes as 0 seconds.
+    :param data: Hex data of the zone timer dump
+    :return: Array of seconds since closed, indexed by zone number - 1
+    """
+    timers = array("H", bytes.fromhex(data[: ZONE_COUNT * 4]))
+    if sys.byteorder == "big":
+        timers.byteswap()
+
+    return array(
+        "L", [(ZONE_TIMER_OPEN - timer) * ZONE_TIMER_RESOLUTION for timer in timers]
+    )
+
+
+def decode_bypassed_zones(data: str) -> int:
+    """
+    Decodes the data of a Bypassed Zones Bitfield Dump (616) command.
+
+    The dump holds one byte for each group of 8 zones, starting with zones
+    1-8, with the least significant bit of each byte being the lowest zone.
+    :param data: Hex data of the bypassed zones bitfield
+    :return: Bitmask with bit n set if zone n + 1 is bypassed
+    """
+    return int.from_bytes(bytes.fromhex(data[: ZONE_COUNT // 4]), "little")
+
+
+def bypassed_zones(bitmask: int) -> list:
+    """
+    Returns the zones set in a bypassed zones bitmask.
+    :param bitmask: Bitmask as returned by decode_bypassed_zones()
+    :return: List of zone numbers, e.g. ["001", "012"]
+    """
+    return [
+        "{zone:03d}".format(zone=bit + 1)
+        for bit in range(ZONE_COUNT)
+        if bitmask >> bit & 1
     ]
-    return ", ".join(leds)
+
+
+class CommandHandler(NamedTuple):
+    """Parser and describer for the data of a command type."""
+
+    parse: Callable[[str], dict]
+    describe: Callable[[Any], str]
+
+
+def parse_data(data: str) -> dict:
+    return {"data": data or None}
+
+
+def parse_zone_data(data: str) -> dict:
+    # Zone commands always have zone as first 3 chars
+    return {"zone": data[0:3], "data": data[3:] or None}
+
+
+def parse_partition_data(data: str) -> dict:
+    # Partition commands always have partition as first char
+    return {"partition": data[:1], "data": data[1:] or None}
+
+
+def parse_partition_and_zone_data(data: str) -> dict:
+    return {"partition": data[:1], "zone": data[1:4], "data": data[4:] or None}
+
+
+def describe_nothing(event) -> str:
+    return ""
+
+
+def describe_led_event(event) -> str:
+    return describe_led_state(event.data)
+
+
+def describe_login_event(event) -> str:
+    return LOGIN_TYPE_NAMES[LoginType(event.data)]
+
+
+def describe_partition_armed_event(event) -> str:
+    armed_name = PARTITION_ARMED_NAMES[PartitionArmedType(event.data)]
+    return "({armed_name}: [{partition}]".format(
+        armed_name=armed_name, partition=event.partition_name()
+    )
+
+
+def describe_zone_timer_dump_event(event) -> str:
+    try:
+        timers = decode_zone_timers(event.data or "")
+    except ValueError:
+        return "Invalid zone timers"
+    return "{count} zones open".format(count=timers.count(0))
+
+
+def describe_bypass_dump_event(event) -> str:
+    try:
+        zones = bypassed_zones(decode_bypassed_zones(event.data or ""))
+    except ValueError:
+        return "Invalid bypassed zones"
+    return "Bypassed: {zones}".format(zones=", ".join(zones) or "None")
+
+
+def describe_partition_event(event) -> str:
+    return event.partition_name()
+
+
+def describe_partition_and_zone_event(event) -> str:
+    return "[{partition}] {zone}".format(
+        partition=event.partition_name(), zone=event.zone_name()
+    )
+
+
+def describe_zone_event(event) -> str:
+    return event.zone_name()
+
+
+DEFAULT_HANDLER = CommandHandler(parse_data, describe_nothing)
+
+# Parser and describer of each command type. Commands that aren't listed use
+# DEFAULT_HANDLER. Use register() to add or override a command.
+HANDLERS = {}
+
+
+def register(
+    command_type: cmd.CommandType,
+    parser: Callable[[str], dict] = None,
+    describer: Callable[[Any], str] = None,
+    name: str = None,
+    priority: cmd.Priority = None,
+) -> None:
+    """
+    Registers how data of the given command type is parsed and described.
+    :param command_type: Command type to register
+    :param parser: Function returning a dict of parsed data for the raw data
+    :param describer: Function returning the description of an event's data
+    :param name: Name of the command type, if overriding the default
+    :param priority: Priority of the command type, if overriding the default
+    """
+    current = HANDLERS.get(command_type, DEFAULT_HANDLER)
+    HANDLERS[command_type] = CommandHandler(
+        parser or current.parse, describer or current.describe
+    )
+
+    if name is not None:
+        cmd.NAMES[command_type] = name
+    if priority is not None:
+        cmd.PRIORITIES[command_type] = priority
+
+
+for _command_type in cmd.ZONE_COMMANDS:
+    register(_command_type, parse_zone_data, describe_zone_event)
+
+for _command_type in cmd.PARTITION_COMMANDS:
+    register(_command_type, parse_partition_data, describe_partition_event)
+
+for _command_type in cmd.PARTITION_AND_ZONE_COMMANDS:
+    register(
+        _command_type, parse_partition_and_zone_data, describe_partition_and_zone_event
+    )
+
+for _command_type in cmd.LOGIN_COMMANDS:
+    register(_command_type, describer=describe_login_event)
+
+register(cmd.CommandType.KEYPAD_LED_STATE, describer=describe_led_event)
+register(cmd.CommandType.KEYPAD_LED_FLASH_STATE, describer=describe_led_event)
+register(cmd.CommandType.PARTITION_ARMED, describer=describe_partition_armed_event)
+register(
+    cmd.CommandType.ENVISALINK_ZONE_TIMER_DUMP,
+    describer=describe_zone_timer_dump_event,
+)
+register(
+    cmd.CommandType.BYPASSED_ZONES_BITFIELD_DUMP,
+    describer=describe_bypass_dump_event,
+)
+
+
+def handler(command_type: cmd.CommandType) -> CommandHandler:
+    """
+    Returns the parser and describer registered for the given command type.
+    :param command_type: Command type
+    :return: Registered command handler
+    """
+    return HANDLERS.get(command_type, DEFAULT_HANDLER)
 
 
 def parse(command: cmd.Command, data: str) -> dict:
-    parsed = {}
-    command_type = command.command_type
-
-    if command_type in cmd.ZONE_COMMANDS:
-        # Zone commands always have zone as first 3 chars
-        parsed["zone"] = data[0:3]
-        parsed["data"] = data[3:]
-    elif command_type in cmd.PARTITION_COMMANDS:
-        # Partition commands always have partition as first char
-        parsed["partition"] = data[:1]
-        parsed["data"] = data[1:]
-    elif command_type in cmd.PARTITION_AND_ZONE_COMMANDS:
-        parsed["partition"] = data[:1]
-        parsed["zone"] = data[1:4]
-        parsed["data"] = data[4:]
-    else:
-        parsed["data"] = data
-
-    if parsed["data"] == "":
-        parsed["data"] = None
-
-    return parsed
+    """
+    Parses the data of the given command into a dict containing the zone,
+    partition and remaining data, as applicable.
+    :param command: Command the data was received with
+    :param data: Raw data
+    :return: Dict of parsed data
+    """
+    return HANDLERS.get(command.command_type, DEFAULT_HANDLER).parse(data)
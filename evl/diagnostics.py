@@ -0,0 +1,278 @@
+"""
+Live memory diagnostics for the admin endpoints.
+
+memory_report() estimates the memory held by each subsystem of a running
+daemon: events kept by storage engines, queued items, status tables and
+buffers waiting to be written or delivered. Sizes are deep sizes, as reported
+by sys.getsizeof() for an object and everything it holds, so they are
+estimates of what would be freed along with the object. Events held by more
+than one storage engine are counted for each of them.
+
+AllocationTracer starts and stops tracemalloc at runtime and compares each
+snapshot it takes with the previous one, showing which lines of code
+allocated the memory retained in between.
+"""
+
+import gc
+import os
+import sys
+import tracemalloc
+
+from array import array
+from collections import deque
+from enum import Enum
+
+# Number of allocation statistics returned by a snapshot.
+DEFAULT_LIMIT = 20
+# Number of frames kept for each allocation once tracing starts.
+DEFAULT_FRAMES = 1
+
+# Ways of grouping allocation statistics, see tracemalloc.Snapshot.statistics.
+KEY_TYPES = ("filename", "lineno", "traceback")
+
+_CONTAINERS = (list, tuple, set, frozenset, deque)
+
+# Allocations made by tracemalloc and the import machinery are left out.
+_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def deep_size(obj, seen: set = None) -> int:
+    """
+    Returns the size of an object and of the objects it holds, in bytes.
+    Classes, functions, enum members and objects not defined by this package
+    or by builtin containers are counted without the objects they hold, so
+    that the walk stays within the daemon's own data.
+    :param obj: Object to measure
+    :param seen: IDs of objects already counted, which are skipped
+    :return: Size in bytes
+    """
+    if seen is None:
+        seen = set()
+
+    size = 0
+    pending = [obj]
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+
+        if isinstance(obj, (str, bytes, bytearray, int, float, array)):
+            continue
+        elif isinstance(obj, dict):
+            pending.extend(obj.keys())
+            pending.extend(obj.values())
+        elif isinstance(obj, _CONTAINERS):
+            pending.extend(obj)
+        elif _walkable(obj):
+            if hasattr(obj, "__dict__"):
+                pending.append(obj.__dict__)
+            for name in getattr(type(obj), "__slots__", ()):
+                if hasattr(obj, name):
+                    pending.append(getattr(obj, name))
+    return size
+
+
+def _walkable(obj) -> bool:
+    # Instances of the package's own classes, whose attributes are its data.
+    return (
+        not isinstance(obj, (type, Enum))
+        and not callable(obj)
+        and type(obj).__module__.startswith("evl.")
+    )
+
+
+def _usage(items, seen: set) -> dict:
+    # Number and deep size of the given items, without their container.
+    size = sum(deep_size(item, seen) for item in items)
+    return {
+        "count": len(items),
+        "bytes": size,
+        "bytes_per_item": round(size / len(items)) if items else 0,
+    }
+
+
+def memory_report(event_manager) -> dict:
+    """
+    Returns the estimated memory held by each subsystem of the daemon.
+    :param event_manager: Event manager of the daemon
+    :return: Dict of sizes in bytes, by subsystem
+    """
+    status = event_manager.status
+    # Objects shared between subsystems, never counted as part of one.
+    roots = {id(event_manager), id(status), id(event_manager.bus)}
+
+    def size(obj) -> int:
+        return deep_size(obj, set(roots))
+
+    storage = {}
+    storage_buffers = {}
+    for name, engine in list(event_manager.storage.items()):
+        storage[name] = _usage(engine.all(), set(roots))
+        if hasattr(engine, "buffered"):
+            storage_buffers[name] = _usage(engine.buffered(), set(roots))
+
+    return {
+        "process": process_memory(),
+        "storage": storage,
+        "queues": {
+            name: _usage(queue.items(), set(roots))
+            for name, queue in status.queues.items()
+        },
+        "status": {
+            "zones": size(status.zones),
+            "partitions": size(status.partitions),
+            "armed_state": size(status.armed_state),
+            "zone_state": size(status.zone_state),
+            "partition_state": size(status.partition_state),
+            "zone_durations": size(status.zone_durations),
+            "zone_timers": size(status.zone_timers),
+            "last_event": size(status.last_event),
+            "names": size(type(event_manager).zones)
+            + size(type(event_manager).partitions),
+            "rollups": size(event_manager.rollups),
+            "rules": size(event_manager.rules),
+            "suppressor": size(event_manager.suppressor),
+        },
+        "buffers": {
+            "storage": storage_buffers,
+            "bus": [
+                {
+                    "frames": subscription.stats()["buffered"],
+                    "bytes": subscription.buffered_bytes(),
+                }
+                for subscription in list(event_manager.bus.subscriptions)
+            ],
+        },
+        "tracemalloc": TRACER.status(),
+    }
+
+
+def process_memory() -> dict:
+    """
+    Returns the resident and peak resident memory of the process, in bytes,
+    or None where unavailable, and the number of objects tracked by the
+    garbage collector.
+    :return: Dict of process memory figures
+    """
+    rss = None
+    try:
+        with open("/proc/self/statm") as statm:
+            rss = int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        # Imported here since the module is only available on Unix.
+        import resource
+    except ImportError:
+        max_rss = None
+    else:
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Reported in kilobytes on Linux and in bytes on macOS.
+        if sys.platform != "darwin":
+            max_rss *= 1024
+
+    return {"rss": rss, "max_rss": max_rss, "gc_objects": len(gc.get_objects())}
+
+
+class AllocationTracer:
+    """
+    Controls tracemalloc and keeps the latest snapshot, so that each snapshot
+    is reported as the allocations made or freed since the previous one.
+    """
+
+    def __init__(self):
+        self._snapshot = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = DEFAULT_FRAMES) -> dict:
+        """
+        Starts tracing allocations, if not already tracing.
+        :param frames: Number of frames kept for each allocation
+        :return: Tracing status
+        """
+        if frames < 1:
+            raise ValueError("At least one frame is required!")
+        if not self.tracing:
+            tracemalloc.start(frames)
+            self._snapshot = None
+        return self.status()
+
+    def stop(self) -> dict:
+        """
+        Stops tracing allocations, freeing the traces and the kept snapshot.
+        :return: Tracing status
+        """
+        tracemalloc.stop()
+        self._snapshot = None
+        return self.status()
+
+    def snapshot(self, limit: int = DEFAULT_LIMIT, key_type: str = "lineno") -> dict:
+        """
+        Takes a snapshot and returns the largest allocation statistics, as
+        differences from the previous snapshot if there is one.
+        :param limit: Number of statistics to return
+        :param key_type: How statistics are grouped, one of KEY_TYPES
+        :return: Dict with the statistics, largest first
+        """
+        if not self.tracing:
+            raise ValueError("Allocations are not being traced!")
+        if key_type not in KEY_TYPES:
+            raise ValueError("Invalid key type '{key}'!".format(key=key_type))
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+        previous, self._snapshot = self._snapshot, snapshot
+
+        if previous is None:
+            statistics = snapshot.statistics(key_type)
+        else:
+            statistics = snapshot.compare_to(previous, key_type)
+
+        return {
+            "compared": previous is not None,
+            "total": sum(stat.size for stat in statistics),
+            "total_diff": (
+                sum(stat.size_diff for stat in statistics)
+                if previous is not None
+                else None
+            ),
+            "statistics": [_statistic(stat) for stat in statistics[:limit]],
+        }
+
+    def status(self) -> dict:
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": self.tracing,
+            "frames": tracemalloc.get_traceback_limit() if self.tracing else None,
+            "traced": current,
+            "peak": peak,
+            "overhead": tracemalloc.get_tracemalloc_memory(),
+            "snapshot": self._snapshot is not None,
+        }
+
+
+def _statistic(stat) -> dict:
+    return {
+        "traceback": [
+            "{file}:{line}".format(file=frame.filename, line=frame.lineno)
+            for frame in stat.traceback
+        ],
+        "size": stat.size,
+        "count": stat.count,
+        "size_diff": getattr(stat, "size_diff", None),
+        "count_diff": getattr(stat, "count_diff", None),
+    }
+
+
+# tracemalloc is process-wide, and so is its tracer.
+TRACER = AllocationTracer()
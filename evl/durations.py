@@ -0,0 +1,136 @@
+from collections import OrderedDict
+
+import evl.command as cmd
+
+OPEN = "open"
+FAULT = "fault"
+
+# Commands starting and ending each kind of tracked period.
+STARTS = {
+    cmd.CommandType.ZONE_OPEN: OPEN,
+    cmd.CommandType.ZONE_FAULT: FAULT,
+}
+ENDS = {
+    cmd.CommandType.ZONE_RESTORED: OPEN,
+    cmd.CommandType.ZONE_FAULT_RESTORE: FAULT,
+}
+
+# Zones open for longer than this many seconds are reported as long open.
+DEFAULT_LONG_OPEN = 600
+
+# Weight of the latest interval in the moving average of time between starts.
+DEFAULT_ALPHA = 0.2
+
+
+class DurationStats:
+    """Running statistics of the periods a zone spent open (or faulted)."""
+
+    __slots__ = ("started_at", "last_start", "count", "total", "max", "interval")
+
+    def __init__(self):
+        self.started_at = None
+        self.last_start = None
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.interval = None
+
+    def start(self, timestamp: float, alpha: float) -> None:
+        if self.last_start is not None:
+            elapsed = timestamp - self.last_start
+            if self.interval is None:
+                self.interval = elapsed
+            else:
+                self.interval = alpha * elapsed + (1 - alpha) * self.interval
+        self.last_start = timestamp
+        self.started_at = timestamp
+
+    def end(self, timestamp: float) -> None:
+        duration = max(timestamp - self.started_at, 0)
+        self.started_at = None
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+
+    def as_dict(self, now: float) -> dict:
+        return {
+            "active": self.started_at is not None,
+            "current": now - self.started_at if self.started_at is not None else 0,
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "per_hour": 3600 / self.interval if self.interval else None,
+        }
+
+
+class DurationTracker:
+    """
+    Pairs Zone Open/Zone Restored and Zone Fault/Zone Fault Restore events as
+    they arrive and keeps running statistics of each zone's open and fault
+    periods: current duration, count, mean and maximum duration, and an
+    exponentially weighted moving average of how often the period starts.
+    """
+
+    def __init__(
+        self, long_open: float = DEFAULT_LONG_OPEN, alpha: float = DEFAULT_ALPHA
+    ):
+        self.long_open = long_open
+        self.alpha = alpha
+
+        self._stats = {OPEN: {}, FAULT: {}}
+        # Zones currently open, in the order they were opened.
+        self._open = OrderedDict()
+
+    def update(self, command_type: cmd.CommandType, zone: str, timestamp: float):
+        """
+        Updates the statistics of the given zone with an event. Events that
+        don't start or end a period are ignored.
+        :param command_type: Command type of the event
+        :param zone: Zone of the event
+        :param timestamp: Time of the event
+        """
+        kind = STARTS.get(command_type)
+        if kind is not None:
+            stats = self._stats[kind].get(zone)
+            if stats is None:
+                stats = self._stats[kind][zone] = DurationStats()
+            if stats.started_at is None:
+                stats.start(timestamp, self.alpha)
+                if kind == OPEN:
+                    self._open[zone] = timestamp
+            return
+
+        kind = ENDS.get(command_type)
+        if kind is not None:
+            stats = self._stats[kind].get(zone)
+            if stats is not None and stats.started_at is not None:
+                stats.end(timestamp)
+            if kind == OPEN:
+                self._open.pop(zone, None)
+
+    def long_open_zones(self, now: float) -> list:
+        """
+        Returns the zones that have been open for longer than the long open
+        threshold. Only those zones, and at most one other, are visited.
+        :param now: Current time
+        :return: List of zones, longest open first
+        """
+        zones = []
+        for zone, opened_at in self._open.items():
+            if now - opened_at <= self.long_open:
+                break
+            zones.append(zone)
+        return zones
+
+    def report(self, now: float) -> dict:
+        """
+        Returns the open and fault statistics of each zone.
+        :param now: Current time, used for the duration of current periods
+        :return: Dict of statistics by kind and zone, and the long open zones
+        """
+        report = {
+            kind: {zone: stats[zone].as_dict(now) for zone in sorted(stats)}
+            for kind, stats in self._stats.items()
+        }
+        report["long_open"] = self.long_open_zones(now)
+        return report
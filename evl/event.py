@@ -1,10 +1,17 @@
+import inspect
 import logging
 import time
 
 from datetime import datetime
 
+import evl.bus as bus
 import evl.command as cmd
 import evl.data as dt
+import evl.durations as durations
+import evl.rollup as rollup
+import evl.rules as rules
+import evl.scheduler as sched
+import evl.state as state
 import evl.util as util
 
 logger = logging.getLogger(__name__)
@@ -70,38 +77,25 @@ class Event:
         :return: Description of command data
         """
 
-        command_type = self.command.command_type
-        if command_type in (
-            cmd.CommandType.KEYPAD_LED_FLASH_STATE,
-            cmd.CommandType.KEYPAD_LED_STATE,
-        ):
-            return dt.describe_led_state(self.data)
-
-        elif command_type in cmd.LOGIN_COMMANDS:
-            login_type = dt.LoginType(self.data)
-            return dt.LOGIN_TYPE_NAMES[login_type]
-
-        elif command_type == cmd.CommandType.PARTITION_ARMED:
-            armed_type = dt.PartitionArmedType(self.data)
-            armed_name = dt.PARTITION_ARMED_NAMES[armed_type]
-            return "({armed_name}: [{partition}]".format(
-                armed_name=armed_name, partition=self.partition_name()
-            )
-
-        # General command types
-        elif command_type in cmd.PARTITION_COMMANDS:
-            return self.partition_name()
-
-        elif command_type in cmd.PARTITION_AND_ZONE_COMMANDS:
-            return "[{partition}] {zone}".format(
-                partition=self.partition_name(), zone=self.zone_name()
-            )
+        return dt.handler(self.command.command_type).describe(self)
 
-        elif command_type in cmd.ZONE_COMMANDS:
-            return self.zone_name()
-
-        else:
-            return ""
+    def as_dict(self) -> dict:
+        """
+        Returns the event as a dict of JSON serializable values.
+        :return: Dict of event details
+        """
+        return {
+            "command": self.command.number,
+            "data": self.data,
+            "zone": self.zone,
+            "partition": self.partition,
+            "priority": self.priority.name,
+            "timestamp": self.timestamp,
+            "description": {
+                "data": self.describe_data(),
+                "command": self.command.describe(),
+            },
+        }
 
     def timestamp_str(self) -> str:
         """
@@ -131,12 +125,30 @@ class Status:
         self.notifiers = {}
         self.storage = {}
         self.listeners = []
+        self.queues = {}
+        self.suppressor = None
+        self.scheduler = None
+        self.bus = None
+        self.commands = None
+        self.http = None
+        self.heartbeats = {}
 
         self.armed_state = {}
 
         self.partitions = {}
         self.zones = {}
 
+        # Decoded zone timer and bypassed zones dumps, see evl.data.
+        self.zone_timers = None
+        self.zone_timers_updated = None
+        self.bypassed_zones = 0
+
+        self.zone_durations = durations.DurationTracker()
+        self.zone_state = state.StateTable(state.ZONE_FLAGS)
+        self.partition_state = state.StateTable(
+            state.PARTITION_FLAGS, size=8, key_format="{}"
+        )
+
         self.last_event: Event = None
 
         self.connection = {"hostname": "", "port": 0}
@@ -160,6 +172,32 @@ class Status:
         ):
             self.armed_state[event.partition] = event.describe()
 
+        try:
+            transitions = state.ZONE_TRANSITIONS.get(command_type)
+            if transitions and event.zone:
+                self.zone_state.apply(int(event.zone), transitions, event.timestamp)
+
+            if event.zone:
+                self.zone_durations.update(command_type, event.zone, event.timestamp)
+
+            transitions = state.PARTITION_TRANSITIONS.get(command_type)
+            if transitions and event.partition:
+                self.partition_state.apply(
+                    int(event.partition), transitions, event.timestamp
+                )
+
+            if command_type == cmd.CommandType.ENVISALINK_ZONE_TIMER_DUMP:
+                self.zone_timers = dt.decode_zone_timers(event.data or "")
+                self.zone_timers_updated = event.timestamp
+            elif command_type == cmd.CommandType.BYPASSED_ZONES_BITFIELD_DUMP:
+                self.bypassed_zones = dt.decode_bypassed_zones(event.data or "")
+                # Bit n of the dump is zone n + 1.
+                self.zone_state.set_mask(
+                    state.BYPASS, self.bypassed_zones << 1, event.timestamp
+                )
+        except ValueError:
+            logger.error("Invalid %s data: %s", event.command, event.data)
+
         self.last_event = event
 
     def report(self) -> dict:
@@ -180,17 +218,77 @@ class Status:
         return {
             "statuses": {"zones": self.zones, "partitions": self.partitions},
             "armed_state": self.armed_state,
+            "bus": self.bus.stats() if self.bus else None,
+            "bypassed_zones": dt.bypassed_zones(self.bypassed_zones),
+            "commands": self.commands.stats() if self.commands else None,
             "connection": self.connection,
+            "heartbeats": {
+                name: heartbeat.stats() for name, heartbeat in self.heartbeats.items()
+            },
+            "http": self.http.stats() if self.http else None,
             "last_event": last_event,
             "listeners": [str(listener) for listener in self.listeners],
             "notifiers": [str(n) for _, n in self.notifiers.items()],
             "partitions": util.describe_dict(EventManager.partitions),
+            "queues": {name: queue.stats() for name, queue in self.queues.items()},
+            "state": self.describe_state(),
             "storage": [str(s) for _, s in self.storage.items()],
+            "storage_buffers": {
+                name: storage.stats()
+                for name, storage in self.storage.items()
+                if hasattr(storage, "stats")
+            },
+            "scheduler": self.scheduler.stats() if self.scheduler else None,
+            "suppression": self.suppressor.stats() if self.suppressor else None,
             "uptime": uptime.total_seconds(),
             "zones": util.describe_dict(EventManager.zones),
+            "zone_durations": self.zone_durations.report(time.time()),
+            "zone_timers": self.describe_zone_timers(),
+        }
+
+    def describe_state(self) -> dict:
+        """
+        Returns the zones and partitions with each state flag set, as of the
+        latest snapshots of the zone and partition state tables.
+        :return: Dict of zone and partition state
+        """
+        return {
+            "zones": self.zone_state.snapshot().as_dict(),
+            "partitions": self.partition_state.snapshot().as_dict(),
+        }
+
+    def describe_zone_timers(self) -> dict:
+        """
+        Returns the seconds since each zone was last closed, as of the last
+        zone timer dump. Open zones report 0 seconds.
+        :return: Dict of zone number to seconds, or None if no dump was received
+        """
+        if self.zone_timers is None:
+            return None
+
+        return {
+            "updated": self.zone_timers_updated,
+            "seconds_since_closed": {
+                "{zone:03d}".format(zone=index + 1): seconds
+                for index, seconds in enumerate(self.zone_timers)
+            },
         }
 
 
+async def close_storage(storage) -> None:
+    """
+    Closes the given storage engine, if it can be closed.
+    :param storage: Storage engine
+    """
+    close = getattr(storage, "close", None)
+    if close is None:
+        return
+
+    result = close()
+    if inspect.isawaitable(result):
+        await result
+
+
 class EventManager:
     """
     Represents an event manager that waits for incoming events from an event
@@ -206,11 +304,13 @@ class EventManager:
         notifiers: dict = None,
         storage: dict = None,
         status: Status = None,
+        suppressor=None,
     ):
 
         if notifiers is None:
             notifiers = {}
         self._notifiers = notifiers
+        self._build_routes()
 
         if storage is None:
             storage = {}
@@ -223,7 +323,26 @@ class EventManager:
         self.status.notifiers = self._notifiers
         self.status.storage = self.storage
 
+        self.rollups = rollup.Rollups()
+        self.rules = rules.RuleEngine(self)
+        self.scheduler = sched.Scheduler()
+        self.status.scheduler = self.scheduler
+        self.bus = bus.EventBus()
+        self.status.bus = self.bus
+        # Sends commands to the EVL device and awaits their outcome, set by
+        # the daemon once connected.
+        self.commander = None
+
         self._event_queue = event_queue
+        self.set_suppressor(suppressor)
+
+    def set_suppressor(self, suppressor) -> None:
+        """
+        Sets the suppressor used to drop events that don't change state.
+        :param suppressor: Suppressor, or None to dispatch every event
+        """
+        self.suppressor = suppressor
+        self.status.suppressor = suppressor
 
     def add_notifiers(self, notifiers: dict) -> None:
         """
@@ -232,6 +351,15 @@ class EventManager:
         """
         self._notifiers = util.merge_dicts(self._notifiers, notifiers)
         self.status.notifiers = self._notifiers
+        self._build_routes()
+
+    def notifier(self, name: str):
+        """
+        Returns the notifier with the given name.
+        :param name: Name of notifier
+        :return: Notifier, or None if there is no such notifier
+        """
+        return self._notifiers.get(name)
 
     def remove_notifier(self, name: str) -> None:
         """
@@ -240,6 +368,25 @@ class EventManager:
         :param name: Name of notifier to remove
         """
         self._notifiers.pop(name, None)
+        self._build_routes()
+
+    def _build_routes(self) -> None:
+        """
+        Rebuilds the table of notifiers to call for each event priority.
+
+        A notifier receives events at or above its "priority" attribute, or
+        all events if it has none. A notifier with a "commands" attribute only
+        receives events of those command types.
+        """
+        routes = {}
+        for priority in cmd.Priority:
+            routes[priority] = tuple(
+                (notifier, getattr(notifier, "commands", None))
+                for notifier in self._notifiers.values()
+                if priority.value
+                >= getattr(notifier, "priority", cmd.Priority.LOW).value
+            )
+        self._routes = routes
 
     def add_storages(self, storages: dict) -> None:
         """
@@ -249,6 +396,24 @@ class EventManager:
         self.storage = util.merge_dicts(self.storage, storages)
         self.status.storage = self.storage
 
+    def remove_storage(self, name: str):
+        """
+        Removes the storage engine with the given name from the list of active
+        storage engines.
+        :param name: Name of storage engine to remove
+        :return: Removed storage engine, if any
+        """
+        return self.storage.pop(name, None)
+
+    async def close(self) -> None:
+        """
+        Stops the scheduler and closes all storage engines, waiting for any
+        buffered events to be written.
+        """
+        await self.scheduler.close()
+        for storage in list(self.storage.values()):
+            await close_storage(storage)
+
     async def enqueue(self, command: cmd.Command, data: str = "") -> None:
         """
         Adds the given command and data to the event queue to be processed.
@@ -257,6 +422,10 @@ class EventManager:
         """
         await self._event_queue.put((command, data))
 
+    async def join(self) -> None:
+        """Waits until all queued events have been dispatched."""
+        await self._event_queue.join()
+
     def status_report(self) -> dict:
         """Returns the current status report of the system."""
         return self.status.report()
@@ -265,25 +434,45 @@ class EventManager:
         """Initiate wait for incoming events in the event queue."""
         while True:
             (command, data) = await self._event_queue.get()
-            parsed_data = dt.parse(command, data)
-            timestamp = int(time.time())
-            event = Event(command, parsed_data, timestamp)
-
-            self.status.update(event)
-
-            for storage_key in list(self.storage):
-                storage = self.storage.get(storage_key, None)
-                if storage:
-                    storage.store(event)
-
-            for notifier_key in list(self._notifiers):
-                notifier = self._notifiers.get(notifier_key, None)
-                if notifier:
-                    try:
-                        await notifier.notify(event)
-                    except Exception as e:
-                        logger.error(
-                            "Error notifying on {name}: {exception}".format(
-                                name=notifier, exception=e
-                            )
-                        )
+            try:
+                await self.dispatch(command, data)
+            finally:
+                self._event_queue.task_done()
+
+    async def dispatch(self, command: cmd.Command, data: str) -> None:
+        """
+        Parses the given command and data into an event, updates the system
+        status and passes the event to all storages and notifiers.
+        :param command: Command received from the EVL device
+        :param data: Data received with the given command
+        """
+        parsed_data = dt.parse(command, data)
+        if self.suppressor is not None and self.suppressor.suppress(
+            command, parsed_data
+        ):
+            return
+
+        timestamp = int(time.time())
+        event = Event(command, parsed_data, timestamp)
+
+        self.status.update(event)
+        self.rollups.add(event)
+
+        for storage_key in list(self.storage):
+            storage = self.storage.get(storage_key, None)
+            if storage:
+                storage.store(event)
+
+        # Published ahead of rules and notifiers, which may wait on the network.
+        self.bus.publish(event)
+
+        await self.rules.process(event)
+
+        command_type = command.command_type
+        for notifier, commands in self._routes[event.priority]:
+            if commands is not None and command_type not in commands:
+                continue
+            try:
+                await notifier.notify(event)
+            except Exception as e:
+                logger.error("Error notifying on %s: %s", notifier, e)
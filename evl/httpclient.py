@@ -0,0 +1,220 @@
+"""
+Daemon-wide HTTP client shared by heartbeats and HTTP notifiers.
+
+All outbound requests go through one aiohttp session, so connections to the
+same host are pooled and kept alive between requests instead of every user
+opening its own, and DNS lookups are cached.
+"""
+
+import asyncio
+import logging
+import time
+
+from collections import Counter
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of open connections, in total and to any one host.
+DEFAULT_LIMIT = 100
+DEFAULT_LIMIT_PER_HOST = 4
+# Timeouts in seconds for a whole request and for establishing a connection.
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_CONNECT_TIMEOUT = 10.0
+# Seconds an idle connection is kept open for reuse.
+DEFAULT_KEEPALIVE_TIMEOUT = 60.0
+# Seconds a resolved host name is cached for.
+DEFAULT_DNS_CACHE_TTL = 300
+
+
+def origin(url: str) -> str:
+    """
+    Returns the scheme, host and port of the given URL.
+    :param url: URL
+    :return: Origin of the URL, e.g. https://example.com:8443
+    """
+    parts = urlsplit(url)
+    return "{scheme}://{netloc}".format(scheme=parts.scheme, netloc=parts.netloc)
+
+
+class HttpClient:
+    """
+    Pooled HTTP client. The underlying session is created on first use, on
+    the running event loop.
+    """
+
+    def __init__(
+        self,
+        limit: int = DEFAULT_LIMIT,
+        limit_per_host: int = DEFAULT_LIMIT_PER_HOST,
+        timeout: float = DEFAULT_TIMEOUT,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+        dns_cache_ttl: int = DEFAULT_DNS_CACHE_TTL,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+
+        self._session = None
+        self._loop = None
+        self.requests = Counter()
+        self._last_request = {}
+
+    def session(self):
+        """
+        Returns the shared session, creating it if there is none yet for the
+        running event loop.
+        :return: aiohttp.ClientSession
+        """
+        # Imported here so that aiohttp is only loaded when HTTP is used.
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            logger.debug("Creating HTTP client session...")
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=self.timeout, sock_connect=self.connect_timeout
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            self._loop = loop
+        return self._session
+
+    def request(self, method: str, url: str, devices: tuple = (), **kwargs):
+        """
+        Makes a request with the shared session, to be used as an async
+        context manager, like aiohttp.ClientSession.request(). The request is
+        recorded as the last one made to its origin once it gets a successful
+        response.
+        :param method: HTTP method
+        :param url: URL to request
+        :param devices: UUIDs of the devices the request is made for, e.g. by
+            a notifier sending one of their events
+        :param kwargs: Arguments passed on to aiohttp.ClientSession.request()
+        :return: Response context manager
+        """
+        key = origin(url)
+        self.requests[key] += 1
+        keys = [key, *((key, device) for device in devices)]
+        return _Request(self, self.session().request(method, url, **kwargs), keys)
+
+    def last_request(self, url: str, device: str = None) -> float:
+        """
+        Returns when a request to the origin of the given URL last succeeded,
+        or, with a device, when a request for that device last succeeded.
+        :param url: URL
+        :param device: UUID of a device, or None for any request
+        :return: Time of the last successful request as given by
+            time.monotonic(), or None
+        """
+        key = origin(url)
+        return self._last_request.get(key if device is None else (key, device))
+
+    async def warm(self, urls: list) -> None:
+        """
+        Opens a pooled connection to the origin of each of the given URLs, so
+        that DNS lookups and TLS handshakes are done before the first real
+        request.
+        :param urls: URLs that will be requested
+        """
+        origins = sorted({origin(url) for url in urls if url})
+        await asyncio.gather(*[self._warm(url) for url in origins])
+
+    async def _warm(self, url: str) -> None:
+        import aiohttp
+
+        logger.debug("Opening HTTP connection to %s...", url)
+        # Not recorded as the last request, since it carries no data that
+        # heartbeats could piggyback on.
+        self.requests[url] += 1
+        try:
+            async with self.session().head(url) as resp:
+                await resp.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.debug("Unable to open HTTP connection to %s: %s", url, e)
+
+    async def close(self) -> None:
+        """Closes the shared session and all pooled connections."""
+        if self._session is not None and self._loop is asyncio.get_running_loop():
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+    def stats(self) -> dict:
+        """Returns the number of requests made to each origin."""
+        return {"requests": dict(self.requests)}
+
+
+class _Request:
+    """
+    Response context manager of HttpClient.request(), recording the time of
+    the request once it gets a response with a status below 400.
+    """
+
+    def __init__(self, client: HttpClient, request, keys: list):
+        self._client = client
+        self._request = request
+        self._keys = keys
+
+    async def __aenter__(self):
+        response = await self._request.__aenter__()
+        if response.ok:
+            now = time.monotonic()
+            for key in self._keys:
+                self._client._last_request[key] = now
+        return response
+
+    async def __aexit__(self, *exc_info):
+        return await self._request.__aexit__(*exc_info)
+
+
+_shared = None
+
+
+def shared() -> HttpClient:
+    """
+    Returns the daemon-wide HTTP client, creating one with default settings if
+    none has been configured.
+    :return: HTTP client
+    """
+    global _shared
+    if _shared is None:
+        _shared = HttpClient()
+    return _shared
+
+
+def configure(config) -> HttpClient:
+    """
+    Replaces the daemon-wide HTTP client with one using the given
+    configuration.
+    :param config: HTTP configuration
+    :return: HTTP client
+    """
+    global _shared
+    _shared = from_config(config)
+    return _shared
+
+
+def from_config(config) -> HttpClient:
+    """
+    Creates an HTTP client from the given HTTP configuration.
+    :param config: HTTP configuration
+    :return: HTTP client
+    """
+    return HttpClient(
+        limit=config.limit,
+        limit_per_host=config.limit_per_host,
+        timeout=config.timeout,
+        connect_timeout=config.connect_timeout,
+        keepalive_timeout=config.keepalive_timeout,
+        dns_cache_ttl=config.dns_cache_ttl,
+    )
@@ -1,11 +1,20 @@
+import inspect
 import json
 import logging
 
 import evl.command as cmd
+import evl.config as conf
+import evl.control as control
+import evl.diagnostics as diagnostics
 import evl.event as ev
+import evl.profiler as profiler
+import evl.rollup as rollup
 import evl.tasks.silentarm as silentarm
 
 from aiohttp import web
+from marshmallow import ValidationError
+
+DEFAULT_PORT = 5204
 
 logger = logging.getLogger(__name__)
 
@@ -13,19 +22,7 @@ logger = logging.getLogger(__name__)
 class EvlJsonSerializer(json.JSONEncoder):
     def default(self, o):
         if isinstance(o, ev.Event):
-            event_json = {
-                "command": o.command.number,
-                "data": o.data,
-                "zone": o.zone,
-                "partition": o.partition,
-                "priority": o.priority.name,
-                "timestamp": o.timestamp,
-                "description": {
-                    "data": o.describe_data(),
-                    "command": o.command.describe(),
-                },
-            }
-            return event_json
+            return o.as_dict()
         elif isinstance(o, cmd.Command):
             return o.describe()
         elif isinstance(o, cmd.CommandType):
@@ -37,6 +34,13 @@ class EvlJsonSerializer(json.JSONEncoder):
 
 
 class AsyncHttpListener:
+    """
+    HTTP API of the daemon. With workers, GET /events, /status_report and
+    /state are served on the port by that many worker processes from state
+    published through shared memory, and the full API is only served on the
+    core port, if one is given.
+    """
+
     def __init__(
         self,
         name: str,
@@ -44,6 +48,10 @@ class AsyncHttpListener:
         auth_token: str,
         event_manager: ev.EventManager,
         storage: str = "",
+        admin_token: str = None,
+        workers: int = 0,
+        core_port: int = None,
+        publish_interval: float = None,
     ):
         self.name = name
         self.port = port
@@ -52,6 +60,17 @@ class AsyncHttpListener:
         self.storage = storage
         self.current_tasks = {}
 
+        self.workers = workers
+        self.core_port = core_port
+        self.publish_interval = publish_interval
+        self._pool = None
+
+        # Set by the daemon to enable the /admin endpoints.
+        self.daemon = None
+        self.admin_token = admin_token
+
+        self._runner: web.ServerRunner = None
+
     def __str__(self):
         return self.name
 
@@ -65,16 +84,27 @@ class AsyncHttpListener:
         method = request.method
 
         if request.query.get("auth_token", "") != self.auth_token:
-            logger.debug(
-                "Unauthorized attempt to access path: {path}".format(path=path)
-            )
+            logger.debug("Unauthorized attempt to access path: %s", path)
             return web.Response(text="Unauthorized.", status=403)
 
-        logger.debug("Request for path: {path}".format(path=path))
+        if path.startswith("/admin/"):
+            return await self._admin(request)
+
+        logger.debug("Request for path: %s", path)
         if path == "/events" and method == "GET":
-            return self._events()
+            return await self._events(request)
         elif path == "/status_report" and method == "GET":
             return self._status_report()
+        elif path == "/state" and method == "GET":
+            return self._state()
+        elif path == "/rollups" and method == "GET":
+            return self._rollups(request)
+        elif path == "/rules" and method == "GET":
+            return self._rules()
+        elif path == "/rules" and (method == "POST" or method == "DELETE"):
+            return self._change_rules(method, await request.json())
+        elif path == "/commands" and method == "POST":
+            return await self._command(await request.json())
         elif path == "/tasks" and (method == "POST" or method == "DELETE"):
             task = await request.json()
             if "type" not in task:
@@ -87,20 +117,180 @@ class AsyncHttpListener:
         else:
             return web.Response(text="Not found.", status=404)
 
-    def _events(self) -> web.Response:
+    async def _admin(self, request: web.Request) -> web.Response:
+        """
+        Handles requests for the daemon administration endpoints. These require
+        the admin token in addition to the auth token, and are disabled unless
+        an admin token is configured.
+        :param request: Web request
+        :return: Web response from method handling the request
+        """
+        path = request.path
+        method = request.method
+
+        if not self.admin_token:
+            logger.debug("Admin endpoints are disabled, path: %s", path)
+            return web.Response(text="Administration disabled.", status=403)
+        if request.query.get("admin_token") != self.admin_token:
+            logger.debug("Unauthorized attempt to access path: %s", path)
+            return web.Response(text="Unauthorized.", status=403)
+
+        if self.daemon is None:
+            return web.Response(text="Administration unavailable.", status=503)
+
+        logger.debug("Admin request for path: %s", path)
+        if path == "/admin/reload" and method == "POST":
+            return await self._reload()
+        elif path == "/admin/memory" and method == "GET":
+            return self._memory()
+        elif path.startswith("/admin/tracemalloc"):
+            return self._tracemalloc(path, method, request.query)
+        elif path == "/admin/profile" and method == "POST":
+            return await self._profile(request.query)
+        else:
+            return web.Response(text="Not found.", status=404)
+
+    async def _reload(self) -> web.Response:
+        """
+        Reloads the daemon configuration.
+        :returns: Web response with JSON representation of the applied changes
+        """
+        try:
+            changes = await self.daemon.reload()
+        except ValueError as e:
+            return web.Response(text=str(e), status=400)
+
+        content = json.dumps(changes)
+        return web.Response(text=content, content_type="application/json")
+
+    def _memory(self) -> web.Response:
         """
-        Returns a JSON representation of past events.
+        Returns the estimated memory held by each subsystem of the daemon.
+        :returns: Web response with JSON representation of the memory report
+        """
+        content = json.dumps(diagnostics.memory_report(self.event_manager))
+        return web.Response(text=content, content_type="application/json")
+
+    def _tracemalloc(self, path: str, method: str, query) -> web.Response:
+        """
+        Starts or stops tracing allocations, or takes a snapshot reporting the
+        largest allocations since the previous one.
+        :param path: Request path
+        :param method: Request method
+        :param query: Query parameters: "frames" when starting, "limit" and
+            "key_type" when taking a snapshot
+        :returns: Web response with JSON representation of the tracing status
+            or snapshot
+        """
+        tracer = diagnostics.TRACER
+        try:
+            if path == "/admin/tracemalloc" and method == "GET":
+                result = tracer.status()
+            elif path == "/admin/tracemalloc/start" and method == "POST":
+                result = tracer.start(
+                    int(query.get("frames", diagnostics.DEFAULT_FRAMES))
+                )
+            elif path == "/admin/tracemalloc/stop" and method == "POST":
+                result = tracer.stop()
+            elif path == "/admin/tracemalloc/snapshot" and method == "POST":
+                result = tracer.snapshot(
+                    int(query.get("limit", diagnostics.DEFAULT_LIMIT)),
+                    query.get("key_type", "lineno"),
+                )
+            else:
+                return web.Response(text="Not found.", status=404)
+        except ValueError as e:
+            return web.Response(text=str(e), status=400)
+
+        content = json.dumps(result)
+        return web.Response(text=content, content_type="application/json")
+
+    async def _profile(self, query) -> web.Response:
+        """
+        Profiles the event loop for a while, see evl.profiler.
+        :param query: Query parameters: "mode", "duration", "interval",
+            "limit", "sort" and "format", "json" or "text" for the collapsed
+            stacks or pstats output only
+        :returns: Web response with the profile
+        """
+        try:
+            result = await profiler.PROFILER.profile(
+                mode=query.get("mode", profiler.SAMPLE),
+                duration=float(query.get("duration", profiler.DEFAULT_DURATION)),
+                interval=float(query.get("interval", profiler.DEFAULT_INTERVAL)),
+                limit=int(query.get("limit", profiler.DEFAULT_LIMIT)),
+                sort=query.get("sort", "cumulative"),
+                notifiers=list(self.event_manager.status.notifiers.values()),
+            )
+        except ValueError as e:
+            return web.Response(text=str(e), status=400)
+
+        if query.get("format") == "text":
+            return web.Response(text=result.get("stacks", result.get("stats")))
+
+        content = json.dumps(result)
+        return web.Response(text=content, content_type="application/json")
+
+    async def _events(self, request: web.Request) -> web.Response:
+        """
+        Returns a JSON representation of past events. The optional "start" and
+        "end" query parameters limit events to a range of timestamps, which
+        includes events that storage engines such as tiered storage keep on
+        disk. Storage engines may read a range in the background by returning
+        an awaitable.
+        :param request: Web request
         :returns: Web response with JSON representation of past events
         """
         storage = self.event_manager.storage.get(self.storage, None)
 
+        try:
+            start = _timestamp(request.query.get("start"))
+            end = _timestamp(request.query.get("end"))
+        except ValueError:
+            return web.Response(text="Invalid start or end.", status=400)
+
         events = []
-        if storage is not None:
+        if storage is not None and start is None and end is None:
             events = storage.all()
+        elif storage is not None and hasattr(storage, "range"):
+            events = storage.range(start, end)
+            if inspect.isawaitable(events):
+                events = await events
+        elif storage is not None:
+            events = [
+                event
+                for event in storage.all()
+                if (start is None or event.timestamp >= start)
+                and (end is None or event.timestamp <= end)
+            ]
 
         content = json.dumps(events, cls=EvlJsonSerializer)
         return web.Response(text=content, content_type="application/json")
 
+    async def _command(self, request: dict) -> web.Response:
+        """
+        Sends a command to the EVL device and waits for its outcome.
+        :param request: Dictionary with the command name and any partition,
+            code and timeout
+        :return: Web response with the outcome and latency of the command
+        """
+        commander = self.event_manager.commander
+        if commander is None:
+            return web.Response(text="Not connected.", status=503)
+
+        try:
+            command, data = control.command_data(
+                request.get("command"), request.get("partition"), request.get("code")
+            )
+            timeout = float(request.get("timeout", control.DEFAULT_TIMEOUT))
+        except (AttributeError, TypeError, ValueError) as e:
+            return web.Response(text=str(e), status=400)
+
+        result = await commander.execute(command, data, timeout)
+        return web.Response(
+            text=json.dumps(result.as_dict()), content_type="application/json"
+        )
+
     def _create_task(self, task: dict) -> web.Response:
         """
         Creates the task defined in the given dictionary.
@@ -113,39 +303,98 @@ class AsyncHttpListener:
 
     def _create_silent_arm(self, task: dict) -> web.Response:
         """
-        Creates a silent alarm task with the given task details.
+        Creates a silent alarm task with the given task details. Any number of
+        silent alarm tasks can be active at once.
         :param: Silent alarm task details
-        :returns: Web response with result of creating silent alarm task
+        :returns: Web response with the id of the created silent alarm task
         """
-        if self.current_tasks.get("silent-arm", None):
-            return web.Response(status=400)
+        # Forget tasks that were shut down by arming.
+        self.current_tasks = {
+            name: current
+            for name, current in self.current_tasks.items()
+            if getattr(current, "active", True)
+        }
 
         zones = task.get("zones", [])
         partitions = task.get("partitions", [])
+        try:
+            timeout = float(task["timeout"]) if task.get("timeout") else None
+        except (TypeError, ValueError):
+            return web.Response(status=400)
 
-        silent_arm_task = silentarm.SilentArmTask(self.event_manager, partitions, zones)
-        self.current_tasks["silent-arm"] = silent_arm_task
+        silent_arm_task = silentarm.SilentArmTask(
+            self.event_manager, partitions, zones, timeout=timeout
+        )
+        self.current_tasks[silent_arm_task.name] = silent_arm_task
         silent_arm_task.start()
 
-        return web.Response(
-            text="silent-arm task created", content_type="application/json"
-        )
+        content = json.dumps({"id": silent_arm_task.name})
+        return web.Response(text=content, content_type="application/json")
 
     def _delete_task(self, task: dict) -> web.Response:
         """
-        Deletes the given task, if it exists.
+        Deletes the given task, or all tasks of the given type if no id is
+        given.
         :param task: Details of task to delete
         :returns: Web response with result of deleting the given task
         """
-        if task["type"] == "silent_arm":
-            silent_arm = self.current_tasks.get("silent-arm", None)
-            if not silent_arm:
-                return web.Response(status=400)
-            silent_arm.stop()
-            del self.current_tasks["silent-arm"]
-            return web.Response(text="silent-arm task deleted")
+        if task["type"] != "silent_arm":
+            return web.Response(status=400)
+
+        if "id" in task:
+            names = [task["id"]] if task["id"] in self.current_tasks else []
+        else:
+            names = [
+                name
+                for name, current in self.current_tasks.items()
+                if isinstance(current, silentarm.SilentArmTask)
+            ]
+        if not names:
+            return web.Response(status=400)
+
+        for name in names:
+            self.current_tasks.pop(name).stop()
+        return web.Response(text="silent-arm task deleted")
+
+    def _rules(self) -> web.Response:
+        """
+        Returns a JSON representation of the active rules.
+        :returns: Web response with JSON representation of the active rules
+        """
+        content = json.dumps(
+            [rule.as_dict() for rule in self.event_manager.rules.rules()]
+        )
+        return web.Response(text=content, content_type="application/json")
+
+    def _change_rules(self, method: str, rule: dict) -> web.Response:
+        """
+        Adds the given rule, or removes the rule or group of rules with the
+        given name or group.
+        :param method: POST to add the rule, DELETE to remove it
+        :param rule: Rule details
+        :returns: Web response with result of changing the rules
+        """
+        engine = self.event_manager.rules
+        if method == "POST":
+            try:
+                # Validated like the rules of the configuration file.
+                (loaded,) = conf.load_rules([conf.RuleSchema().load(rule)])
+            except ValidationError as e:
+                return web.Response(
+                    text="Invalid rule: {errors}".format(errors=e.messages), status=400
+                )
+            except ValueError as e:
+                return web.Response(text=str(e), status=400)
+            engine.add(loaded)
+            return web.Response(text="rule added")
+
+        if "group" in rule:
+            removed = engine.remove_group(rule["group"])
         else:
+            removed = [engine.remove(rule.get("name"))]
+        if not any(removed):
             return web.Response(status=400)
+        return web.Response(text="rule removed")
 
     def _status_report(self) -> web.Response:
         """
@@ -156,12 +405,107 @@ class AsyncHttpListener:
         content = json.dumps(status, cls=EvlJsonSerializer)
         return web.Response(text=content, content_type="application/json")
 
+    def _state(self) -> web.Response:
+        """
+        Returns a JSON representation of the current zone and partition state.
+        :returns: Web response with JSON representation of zone and partition state
+        """
+        content = json.dumps(self.event_manager.status.describe_state())
+        return web.Response(text=content, content_type="application/json")
+
+    def _rollups(self, request: web.Request) -> web.Response:
+        """
+        Returns the event counts of zones, partitions or commands over time.
+        The "kind", "resolution" and "key" query parameters select the
+        counters; "top" returns the most active keys instead of all buckets.
+        :param request: Web request
+        :returns: Web response with JSON representation of the event counts
+        """
+        kind = request.query.get("kind", rollup.ZONE)
+        resolution = request.query.get("resolution", rollup.HOUR)
+        rollups = self.event_manager.rollups
+
+        try:
+            if "top" in request.query:
+                result = rollups.top(kind, resolution, int(request.query["top"]))
+            else:
+                result = rollups.query(kind, resolution, request.query.get("key"))
+        except ValueError as e:
+            return web.Response(text=str(e), status=400)
+
+        content = json.dumps({"kind": kind, "resolution": resolution, "counts": result})
+        return web.Response(text=content, content_type="application/json")
+
     async def listen(self) -> None:
         """Starts the HTTP listener."""
         logger.debug("Starting HTTP listener...")
+        port = self.port
+        if self.workers:
+            self._start_workers()
+            port = self.core_port
+            if port is None:
+                return
+
         server = web.Server(self.handler)
         runner = web.ServerRunner(server)
 
         await runner.setup()
-        site = web.TCPSite(runner, "localhost", self.port)
+        site = web.TCPSite(runner, "localhost", port)
         await site.start()
+        self._runner = runner
+
+    def _start_workers(self) -> None:
+        # Imported here so that worker processes are only set up when used.
+        import evl.listeners.httpworker as httpworker
+
+        self._pool = httpworker.HttpWorkerPool(
+            self.event_manager,
+            self.name,
+            self.port,
+            self.auth_token,
+            self.storage,
+            self.workers,
+            self.publish_interval or httpworker.DEFAULT_PUBLISH_INTERVAL,
+        )
+        self._pool.start()
+
+    async def stop(self) -> None:
+        """Stops the HTTP listener and any tasks it created."""
+        logger.debug("Stopping HTTP listener...")
+        for task in self.current_tasks.values():
+            task.stop()
+        self.current_tasks = {}
+
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        if self._pool is not None:
+            await self._pool.stop()
+            self._pool = None
+
+
+def _timestamp(value: str) -> int:
+    return int(value) if value is not None else None
+
+
+def from_config(config, event_manager: ev.EventManager) -> AsyncHttpListener:
+    """
+    Creates an HTTP listener from the given listener configuration.
+    :param config: Listener configuration
+    :param event_manager: Event manager the listener reports on
+    :return: HTTP listener
+    """
+    settings = config.settings
+    core_port = settings.get("core_port")
+    publish_interval = settings.get("publish_interval")
+    return AsyncHttpListener(
+        config.name,
+        int(settings.get("port", DEFAULT_PORT)),
+        settings.get("auth_token", ""),
+        event_manager,
+        settings.get("storage", "memory"),
+        settings.get("admin_token"),
+        workers=int(settings.get("workers", 0)),
+        core_port=int(core_port) if core_port else None,
+        publish_interval=float(publish_interval) if publish_interval else None,
+    )
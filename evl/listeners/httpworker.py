@@ -0,0 +1,237 @@
+"""
+Read-only HTTP API served from worker processes.
+
+The core process periodically serializes the status report, state and recent
+events once and publishes them through shared memory. Worker processes, which
+can share a port through SO_REUSEPORT, answer GET /events, /status_report and
+/state from the published state, so API traffic doesn't run on the event loop
+talking to the EVL device.
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import socket
+
+import evl.event as ev
+import evl.sharedstate as sharedstate
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PUBLISH_INTERVAL = 1.0
+
+EVENTS = "events"
+STATE = "state"
+STATUS_REPORT = "status_report"
+
+# Paths served by workers and the published section each one returns.
+PATHS = {"/events": EVENTS, "/state": STATE, "/status_report": STATUS_REPORT}
+
+
+class HttpWorker:
+    """Serves the read-only endpoints from published shared state."""
+
+    def __init__(
+        self,
+        reader: sharedstate.SharedStateReader,
+        port: int,
+        auth_token: str,
+        host: str = "localhost",
+        reuse_port: bool = False,
+    ):
+        self.reader = reader
+        self.port = port
+        self.auth_token = auth_token
+        self.host = host
+        self.reuse_port = reuse_port
+
+        # Parsed events of the last published state, for range queries.
+        self._events = None
+        self._events_sequence = None
+        self._runner = None
+
+    async def handler(self, request: web.Request) -> web.Response:
+        if request.query.get("auth_token", "") != self.auth_token:
+            return web.Response(text="Unauthorized.", status=403)
+
+        section = PATHS.get(request.path)
+        if section is None or request.method != "GET":
+            return web.Response(text="Not found.", status=404)
+
+        try:
+            sections = self.reader.read()
+        except sharedstate.SharedStateError as e:
+            return web.Response(text=str(e), status=503)
+
+        if section == EVENTS and ("start" in request.query or "end" in request.query):
+            return self._event_range(request, sections)
+        return web.Response(
+            body=sections.get(section, b"null"), content_type="application/json"
+        )
+
+    def _event_range(self, request: web.Request, sections: dict) -> web.Response:
+        try:
+            start = _timestamp(request.query.get("start"))
+            end = _timestamp(request.query.get("end"))
+        except ValueError:
+            return web.Response(text="Invalid start or end.", status=400)
+
+        if self._events_sequence != self.reader.sequence:
+            self._events = json.loads(sections.get(EVENTS, b"[]"))
+            self._events_sequence = self.reader.sequence
+
+        events = [
+            event
+            for event in self._events
+            if (start is None or event["timestamp"] >= start)
+            and (end is None or event["timestamp"] <= end)
+        ]
+        return web.Response(text=json.dumps(events), content_type="application/json")
+
+    async def listen(self) -> None:
+        server = web.Server(self.handler)
+        self._runner = web.ServerRunner(server)
+        await self._runner.setup()
+        site = web.TCPSite(
+            self._runner, self.host, self.port, reuse_port=self.reuse_port
+        )
+        await site.start()
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def _timestamp(value: str) -> int:
+    return int(value) if value is not None else None
+
+
+def run(path: str, port: int, auth_token: str, host: str, reuse_port: bool) -> None:
+    """
+    Runs a worker until the process is terminated.
+    :param path: Path of the shared state file
+    :param port: Port to listen on
+    :param auth_token: Token required by all requests
+    :param host: Host to listen on
+    :param reuse_port: Whether to share the port with other workers
+    """
+
+    async def serve():
+        worker = HttpWorker(
+            sharedstate.SharedStateReader(path), port, auth_token, host, reuse_port
+        )
+        await worker.listen()
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+class HttpWorkerPool:
+    """
+    Publishes the read-only state of an HTTP listener and runs the worker
+    processes serving it.
+    """
+
+    def __init__(
+        self,
+        event_manager: ev.EventManager,
+        name: str,
+        port: int,
+        auth_token: str,
+        storage: str,
+        workers: int,
+        publish_interval: float = DEFAULT_PUBLISH_INTERVAL,
+        host: str = "localhost",
+        path: str = None,
+        size: int = sharedstate.DEFAULT_SIZE,
+    ):
+        self.event_manager = event_manager
+        self.port = port
+        self.auth_token = auth_token
+        self.storage = storage
+        self.workers = workers
+        self.publish_interval = publish_interval
+        self.host = host
+        self.path = path or sharedstate.default_path(name)
+        self.size = size
+
+        self.published = 0
+        self.errors = 0
+
+        self._writer = None
+        self._timer = None
+        self._processes = []
+
+    def publish(self) -> None:
+        """Serializes the read-only state and publishes it to the workers."""
+        # Imported here since the HTTP listener imports this module.
+        from evl.listeners.asynchttp import EvlJsonSerializer
+
+        storage = self.event_manager.storage.get(self.storage, None)
+        events = storage.all() if storage is not None else []
+        sections = {
+            EVENTS: json.dumps(events, cls=EvlJsonSerializer),
+            STATE: json.dumps(self.event_manager.status.describe_state()),
+            STATUS_REPORT: json.dumps(
+                self.event_manager.status_report(), cls=EvlJsonSerializer
+            ),
+        }
+
+        try:
+            self._writer.write(
+                {name: data.encode("utf-8") for name, data in sections.items()}
+            )
+        except sharedstate.SharedStateError as e:
+            self.errors += 1
+            logger.error("Unable to publish HTTP state: %s", e)
+            return
+        self.published += 1
+
+    def start(self) -> None:
+        """Publishes the state, then starts the workers."""
+        self._writer = sharedstate.SharedStateWriter(self.path, self.size)
+        self.publish()
+        self._timer = self.event_manager.scheduler.call_every(
+            self.publish_interval, self.publish
+        )
+
+        reuse_port = self.workers > 1
+        if reuse_port and not hasattr(socket, "SO_REUSEPORT"):
+            logger.error("SO_REUSEPORT is unavailable, starting a single HTTP worker.")
+            self.workers = 1
+            reuse_port = False
+
+        context = multiprocessing.get_context("spawn")
+        for _ in range(self.workers):
+            process = context.Process(
+                target=run,
+                args=(self.path, self.port, self.auth_token, self.host, reuse_port),
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+        logger.debug(
+            "Started {count} HTTP workers on port {port}.".format(
+                count=self.workers, port=self.port
+            )
+        )
+
+    async def stop(self) -> None:
+        """Stops the workers and removes the shared state file."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        for process in self._processes:
+            process.terminate()
+        for process in self._processes:
+            await asyncio.to_thread(process.join)
+        self._processes = []
+
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
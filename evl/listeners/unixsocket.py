@@ -0,0 +1,153 @@
+"""
+Unix domain socket listener streaming events from the event bus to other
+services on the same host.
+
+A client connects and sends a subscribe frame with its topics, as described
+in evl.bus.Filter, e.g.:
+
+    {"priority": "HIGH", "partitions": ["1"], "zones": ["001"], "panel": true}
+
+It then receives event and lag frames until it disconnects. Sending another
+subscribe frame replaces its topics.
+"""
+
+import asyncio
+import logging
+import os
+import stat
+import tempfile
+
+import evl.bus as bus
+import evl.event as ev
+
+logger = logging.getLogger(__name__)
+
+
+def default_path(name: str) -> str:
+    """
+    Returns the default socket path for a listener.
+    :param name: Listener name
+    :return: Socket path
+    """
+    return os.path.join(tempfile.gettempdir(), "evl-{name}.sock".format(name=name))
+
+
+class UnixSocketListener:
+    """Serves event bus subscriptions on a Unix domain socket."""
+
+    def __init__(
+        self,
+        name: str,
+        path: str,
+        event_manager: ev.EventManager,
+        buffer: int = bus.DEFAULT_BUFFER,
+        mode: int = None,
+    ):
+        self.name = name
+        self.path = path
+        self.event_manager = event_manager
+        self.buffer = buffer
+        self.mode = mode
+
+        # Set by the daemon, unused by this listener.
+        self.daemon = None
+
+        self._server = None
+        # Writers of connected clients, by the task serving them.
+        self._clients = {}
+
+    def __str__(self):
+        return self.name
+
+    async def listen(self) -> None:
+        """Starts listening on the socket, replacing any stale socket file."""
+        logger.debug("Starting Unix socket listener on %s...", self.path)
+        if os.path.exists(self.path) and stat.S_ISSOCK(os.stat(self.path).st_mode):
+            os.remove(self.path)
+
+        self._server = await asyncio.start_unix_server(self._handle, self.path)
+        if self.mode is not None:
+            os.chmod(self.path, self.mode)
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        task = asyncio.current_task()
+        self._clients[task] = writer
+        subscription = None
+        topics = None
+        try:
+            message = await bus.read_frame(reader)
+            if message is None:
+                return
+            subscription = self.event_manager.bus.subscribe(
+                bus.Filter.from_dict(message), self.buffer
+            )
+            topics = asyncio.ensure_future(self._read_topics(reader, subscription))
+
+            while True:
+                frames = await subscription.get()
+                if not frames:
+                    break
+                writer.writelines(frames)
+                await writer.drain()
+        except bus.BusError as e:
+            logger.debug("Closing Unix socket subscriber: %s", e)
+        except ConnectionError:
+            pass
+        finally:
+            if topics is not None:
+                topics.cancel()
+            if subscription is not None:
+                subscription.close()
+            writer.close()
+            self._clients.pop(task, None)
+
+    async def _read_topics(
+        self, reader: asyncio.StreamReader, subscription: bus.Subscription
+    ) -> None:
+        try:
+            while True:
+                message = await bus.read_frame(reader)
+                if message is None:
+                    break
+                subscription.filter = bus.Filter.from_dict(message)
+        except (bus.BusError, ConnectionError) as e:
+            logger.debug("Closing Unix socket subscriber: %s", e)
+        finally:
+            subscription.close()
+
+    async def stop(self) -> None:
+        """Disconnects all subscribers and removes the socket."""
+        logger.debug("Stopping Unix socket listener...")
+        if self._server is None:
+            return
+
+        self._server.close()
+        # Closing a client's connection ends its subscription and task.
+        for writer in self._clients.values():
+            writer.close()
+        await asyncio.gather(*self._clients, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def from_config(config, event_manager: ev.EventManager) -> UnixSocketListener:
+    """
+    Creates a Unix socket listener from the given listener configuration.
+    :param config: Listener configuration
+    :param event_manager: Event manager whose bus is served
+    :return: Unix socket listener
+    """
+    settings = config.settings
+    mode = settings.get("mode")
+    return UnixSocketListener(
+        config.name,
+        os.path.expanduser(settings.get("path", default_path(config.name))),
+        event_manager,
+        buffer=int(settings.get("buffer", bus.DEFAULT_BUFFER)),
+        mode=int(mode, 8) if mode else None,
+    )
@@ -0,0 +1,76 @@
+"""
+Logging through a queue, so that writing log records to consoles, files and
+syslog happens on a background thread instead of the event loop.
+
+configure() applies a logging configuration and then moves the handlers of
+the "evl" logger behind a QueueHandler, with a QueueListener thread passing
+records on to them.
+"""
+
+import atexit
+import logging
+import logging.config
+import logging.handlers
+import queue
+
+LOGGER = "evl"
+
+_listener = None
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """
+    Queues records with their message merged, leaving formatting to the
+    handlers on the listener thread. Unlike the standard QueueHandler, records
+    aren't copied or made picklable, since they never leave the process.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merged here, as the arguments may change once the call returns.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def configure(config: dict) -> None:
+    """
+    Applies the given logging configuration, with the handlers of the "evl"
+    logger run from a background thread.
+    :param config: Logging configuration dictionary, see evl.config.load_logging
+    """
+    global _listener
+
+    stop()
+    logging.config.dictConfig(config)
+
+    logger = logging.getLogger(LOGGER)
+    handlers = list(logger.handlers)
+    if not handlers:
+        return
+
+    records = queue.SimpleQueue()
+    for handler in handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(QueueHandler(records))
+
+    _listener = logging.handlers.QueueListener(
+        records, *handlers, respect_handler_level=True
+    )
+    _listener.start()
+
+
+def stop() -> None:
+    """
+    Writes out any queued records, stops the background thread and closes
+    its handlers.
+    """
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop)
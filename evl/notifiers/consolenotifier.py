@@ -28,3 +28,12 @@ class ConsoleNotifier:
                     priority=event.priority,
                 )
             )
+
+
+def from_config(config) -> ConsoleNotifier:
+    """
+    Creates a console notifier from the given notifier configuration.
+    :param config: Notifier configuration
+    :return: Console notifier
+    """
+    return ConsoleNotifier(priority=Priority[config.priority], name=config.name)
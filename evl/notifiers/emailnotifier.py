@@ -72,3 +72,21 @@ class EmailNotifier:
                     status_code=response.status_code, message=response.body
                 )
             )
+
+
+def from_config(config) -> EmailNotifier:
+    """
+    Creates an email notifier from the given notifier configuration.
+    :param config: Notifier configuration
+    :return: Email notifier
+    """
+    settings = config.settings
+    return EmailNotifier(
+        settings.get("apiKey"),
+        settings.get("sender"),
+        settings.get("recipient"),
+        Priority[config.priority],
+        config.layout,
+        settings.get("subject"),
+        config.name,
+    )
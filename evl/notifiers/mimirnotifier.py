@@ -1,8 +1,11 @@
 import aiohttp
+import asyncio
 import json
 import logging
 import time
 
+import evl.httpclient as httpclient
+
 from evl.command import Priority
 from evl.event import Event
 
@@ -18,8 +21,8 @@ class MimirNotifier:
         priority: Priority = Priority.LOW,
         layout: str = None,
         name: str = None,
+        client: httpclient.HttpClient = None,
     ):
-        self.priority = priority
         self.url = url
         self.auth_token = auth_token
         self.uuid = uuid
@@ -33,17 +36,20 @@ class MimirNotifier:
         if name is None:
             self.name = "Mimir Notifier"
 
-        self.session = None
+        # Shared HTTP client of the daemon, unless one is given.
+        self.client = client
 
     def __str__(self):
         return self.name
 
     async def notify(self, event: Event):
-        session = self._session()
+        if event.priority.value < self.priority.value:
+            return
+
         try:
-            await self._send(session, event)
-        except aiohttp.ClientError as e:
-            logger.error(f"Error notifying on {self.name}: {e}")
+            await self._send(self.client or httpclient.shared(), event)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error("Error notifying on %s: %s", self.name, e)
 
     def _body(self, event: Event):
         utctime = time.gmtime(event.timestamp)
@@ -65,14 +71,28 @@ class MimirNotifier:
         }
         return json.dumps(body)
 
-    async def _send(self, session: aiohttp.ClientSession, event: Event):
+    async def _send(self, client: httpclient.HttpClient, event: Event):
         headers = {"Content-Type": "application/json", "Accept": "application/json"}
         body = self._body(event)
-        async with session.post(self.url, data=body, headers=headers) as resp:
+        request = client.request(
+            "POST", self.url, devices=(self.uuid,), data=body, headers=headers
+        )
+        async with request as resp:
             resp.raise_for_status()
 
-    def _session(self) -> aiohttp.ClientSession:
-        if self.session is None or self.session.closed:
-            logger.debug("No session available, creating a new one!")
-            self.session = aiohttp.ClientSession()
-        return self.session
+
+def from_config(config) -> MimirNotifier:
+    """
+    Creates a Mimir notifier from the given notifier configuration.
+    :param config: Notifier configuration
+    :return: Mimir notifier
+    """
+    settings = config.settings
+    return MimirNotifier(
+        settings.get("url"),
+        settings.get("device_uuid"),
+        settings.get("auth_token"),
+        Priority[config.priority],
+        config.layout,
+        config.name,
+    )
@@ -53,3 +53,21 @@ class SmsNotifier:
             self.client.messages.create(self.recipient, body=message, from_=self.sender)
         except TwilioException as e:
             logger.error("Unable to send SMS! ({exception})".format(exception=e))
+
+
+def from_config(config) -> SmsNotifier:
+    """
+    Creates an SMS notifier from the given notifier configuration.
+    :param config: Notifier configuration
+    :return: SMS notifier
+    """
+    settings = config.settings
+    return SmsNotifier(
+        settings.get("sid"),
+        settings.get("authToken"),
+        settings.get("sender"),
+        settings.get("recipient"),
+        Priority[config.priority],
+        config.layout,
+        config.name,
+    )
@@ -0,0 +1,114 @@
+"""
+Registry of notifier, storage and listener backends.
+
+Backends are referenced by the "type" value used in the configuration file
+and are only imported once a configuration refers to them. Built-in backends
+are listed below; third-party packages can provide additional backends by
+declaring an entry point in one of the groups below, e.g.:
+
+    [project.entry-points."evl.notifiers"]
+    pushover = "evl_pushover:from_config"
+
+Each entry point refers to a factory that receives the backend configuration
+object (and the event manager, for listeners) and returns the backend
+instance.
+"""
+
+import importlib
+import logging
+
+from importlib.metadata import entry_points
+from typing import Callable, Union
+
+logger = logging.getLogger(__name__)
+
+NOTIFIERS = "evl.notifiers"
+STORAGE = "evl.storage"
+LISTENERS = "evl.listeners"
+
+BUILTINS = {
+    NOTIFIERS: {
+        "console": "evl.notifiers.consolenotifier:from_config",
+        "email": "evl.notifiers.emailnotifier:from_config",
+        "mimir": "evl.notifiers.mimirnotifier:from_config",
+        "sms": "evl.notifiers.smsnotifier:from_config",
+    },
+    STORAGE: {
+        "memory": "evl.storage.memory:from_config",
+        "tiered": "evl.storage.tiered:from_config",
+    },
+    LISTENERS: {
+        "http": "evl.listeners.asynchttp:from_config",
+        "unix": "evl.listeners.unixsocket:from_config",
+    },
+}
+
+_registry = {group: dict(backends) for group, backends in BUILTINS.items()}
+
+
+class PluginError(Exception):
+    pass
+
+
+def register(group: str, name: str, factory: Union[str, Callable]) -> None:
+    """
+    Registers a backend factory under the given name.
+    :param group: One of NOTIFIERS, STORAGE or LISTENERS
+    :param name: Backend type name as used in the configuration file
+    :param factory: Factory callable or "module:attribute" reference to one
+    """
+    _registry.setdefault(group, {})[name] = factory
+
+
+def available(group: str) -> list:
+    """
+    Returns the names of all backends known in the given group, including
+    those provided through entry points.
+    :param group: One of NOTIFIERS, STORAGE or LISTENERS
+    :return: Sorted list of backend names
+    """
+    names = set(_registry.get(group, {}))
+    names.update(ep.name for ep in entry_points(group=group))
+    return sorted(names)
+
+
+def load(group: str, name: str) -> Callable:
+    """
+    Returns the factory for the given backend, importing its module if it has
+    not been imported yet.
+    :param group: One of NOTIFIERS, STORAGE or LISTENERS
+    :param name: Backend type name as used in the configuration file
+    :return: Backend factory
+    """
+    backends = _registry.setdefault(group, {})
+    factory = backends.get(name)
+
+    if factory is None:
+        # Entry points are only scanned for names that aren't registered, so
+        # configurations using built-in backends never pay for the lookup.
+        matches = entry_points(group=group, name=name)
+        if not matches:
+            raise PluginError(
+                "Unknown {group} type '{name}'!".format(group=group, name=name)
+            )
+        factory = next(iter(matches)).value
+
+    if isinstance(factory, str):
+        factory = _resolve(factory)
+        backends[name] = factory
+
+    return factory
+
+
+def _resolve(reference: str) -> Callable:
+    module_name, _, attribute = reference.partition(":")
+    logger.debug("Loading plugin {reference}...".format(reference=reference))
+    try:
+        module = importlib.import_module(module_name)
+        return getattr(module, attribute)
+    except (ImportError, AttributeError) as e:
+        raise PluginError(
+            "Unable to load plugin '{reference}': {exception}".format(
+                reference=reference, exception=e
+            )
+        ) from e
@@ -0,0 +1,231 @@
+"""
+On-demand CPU profiling of the running event loop, for the admin endpoints.
+
+Two modes are available:
+
+- sample: the event loop's stack is sampled on SIGPROF, after every interval
+  of CPU time used by the process, without slowing the loop down much. Time
+  spent waiting isn't sampled. Stacks are returned in collapsed form, one
+  "outer;...;inner count" line per distinct stack, as read by flame graph
+  tools. The event loop must run on the main thread, which handles signals.
+- cprofile: cProfile traces every call made on the event loop thread, which
+  gives exact call counts and times at the cost of slowing the loop down, and
+  returns pstats output.
+
+Both modes attribute time to the coroutines doing the daemon's work, see
+TARGETS, and to the notify() method of each notifier: CPU time in sample
+mode and wall clock time in cprofile mode. Attributed time is inclusive: time
+spent notifying from EventManager.wait counts towards both.
+"""
+
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import signal
+import threading
+import time
+
+from collections import Counter
+
+SAMPLE = "sample"
+CPROFILE = "cprofile"
+MODES = (SAMPLE, CPROFILE)
+
+# Seconds to profile for, by default and at most.
+DEFAULT_DURATION = 5.0
+MAX_DURATION = 60.0
+# Seconds between samples, by default and at least.
+DEFAULT_INTERVAL = 0.005
+MIN_INTERVAL = 0.001
+# Number of functions listed in pstats output.
+DEFAULT_LIMIT = 30
+
+SORT_KEYS = ("cumulative", "tottime", "calls", "ncalls")
+
+# Coroutines whose time is attributed separately, by qualified name.
+TARGETS = (
+    "Connection._process",
+    "EventManager.wait",
+    "AsyncHttpListener.handler",
+)
+
+
+def _label(code) -> str:
+    return "{file}:{name}".format(
+        file=os.path.basename(code.co_filename), name=code.co_qualname
+    )
+
+
+class Sampler:
+    """
+    Samples the main thread's stack on SIGPROF, which an interval timer sends
+    each time the process has used another interval of CPU time. Unlike
+    sampling from another thread, which has to wait for the GIL, samples are
+    taken wherever the interpreter happens to be.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        # Sampled stacks, as tuples of code objects from outermost to
+        # innermost, and how often each was seen.
+        self.stacks = Counter()
+
+        self._handler = None
+
+    def start(self) -> None:
+        if threading.current_thread() is not threading.main_thread():
+            raise ValueError("Sampling is only possible on the main thread!")
+        self._handler = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self) -> None:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self._handler or signal.SIG_DFL)
+
+    def _sample(self, signum: int, frame) -> None:
+        stack = []
+        while frame is not None:
+            stack.append(frame.f_code)
+            frame = frame.f_back
+        if stack:
+            stack.reverse()
+            self.stacks[tuple(stack)] += 1
+
+    def collapsed(self) -> str:
+        """Returns the sampled stacks in collapsed form, most frequent first."""
+        return "\n".join(
+            "{stack} {count}".format(
+                stack=";".join(_label(code) for code in stack), count=count
+            )
+            for stack, count in self.stacks.most_common()
+        )
+
+
+class Profiler:
+    """Runs one profile of the event loop at a time."""
+
+    def __init__(self):
+        self.running = False
+
+    async def profile(
+        self,
+        mode: str = SAMPLE,
+        duration: float = DEFAULT_DURATION,
+        interval: float = DEFAULT_INTERVAL,
+        limit: int = DEFAULT_LIMIT,
+        sort: str = "cumulative",
+        notifiers: list = None,
+    ) -> dict:
+        """
+        Profiles the running event loop for the given duration.
+        :param mode: One of MODES
+        :param duration: Seconds to profile for, up to MAX_DURATION
+        :param interval: Seconds between samples, in sample mode
+        :param limit: Number of functions listed, in cprofile mode
+        :param sort: Sort key of the listed functions, one of SORT_KEYS
+        :param notifiers: Notifiers whose notify() time is attributed
+        :return: Dict with the attributed time and the collapsed stacks or
+            pstats output
+        """
+        if mode not in MODES:
+            raise ValueError("Invalid profile mode '{mode}'!".format(mode=mode))
+        if not 0 < duration <= MAX_DURATION:
+            raise ValueError(
+                "Duration must be between 0 and {max} seconds!".format(max=MAX_DURATION)
+            )
+        if interval < MIN_INTERVAL:
+            raise ValueError(
+                "Interval must be at least {min} seconds!".format(min=MIN_INTERVAL)
+            )
+        if sort not in SORT_KEYS:
+            raise ValueError("Invalid sort key '{sort}'!".format(sort=sort))
+        if self.running:
+            raise ValueError("A profile is already running!")
+
+        targets = set(TARGETS)
+        for notifier in notifiers or ():
+            notify = getattr(type(notifier), "notify", None)
+            if notify is not None:
+                targets.add(notify.__qualname__)
+
+        self.running = True
+        try:
+            if mode == SAMPLE:
+                return await self._sample(duration, interval, targets)
+            return await self._cprofile(duration, limit, sort, targets)
+        finally:
+            self.running = False
+
+    async def _sample(self, duration: float, interval: float, targets: set) -> dict:
+        sampler = Sampler(interval)
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        sampler.start()
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            sampler.stop()
+        elapsed = time.perf_counter() - started
+        cpu = time.process_time() - cpu_started
+
+        total = sum(sampler.stacks.values())
+        counts = Counter()
+        for stack, count in sampler.stacks.items():
+            for name in {code.co_qualname for code in stack} & targets:
+                counts[name] += count
+
+        return {
+            "mode": SAMPLE,
+            "duration": elapsed,
+            "cpu": cpu,
+            "interval": interval,
+            "samples": total,
+            "attribution": {
+                name: {
+                    "seconds": round(cpu * count / total, 6),
+                    "percent": round(100 * count / total, 2),
+                }
+                for name, count in counts.most_common()
+            },
+            "stacks": sampler.collapsed(),
+        }
+
+    async def _cprofile(
+        self, duration: float, limit: int, sort: str, targets: set
+    ) -> dict:
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            profile.disable()
+        elapsed = time.perf_counter() - started
+
+        seconds = Counter()
+        for entry in profile.getstats():
+            name = getattr(entry.code, "co_qualname", None)
+            if name in targets:
+                seconds[name] += entry.totaltime
+
+        output = io.StringIO()
+        pstats.Stats(profile, stream=output).sort_stats(sort).print_stats(limit)
+
+        return {
+            "mode": CPROFILE,
+            "duration": elapsed,
+            "attribution": {
+                name: {
+                    "seconds": round(value, 6),
+                    "percent": round(100 * value / elapsed, 2),
+                }
+                for name, value in seconds.most_common()
+            },
+            "stats": output.getvalue(),
+        }
+
+
+# Profiles share the event loop thread, so only one runs at a time.
+PROFILER = Profiler()
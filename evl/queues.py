@@ -0,0 +1,282 @@
+import asyncio
+
+from collections import deque
+from typing import Callable
+
+import evl.command as cmd
+import evl.data as dt
+
+# Overflow policies applied when a bounded queue is full.
+BLOCK = "block"
+DROP_OLDEST_LOW_PRIORITY = "drop-oldest-low-priority"
+COALESCE = "coalesce"
+POLICIES = (BLOCK, DROP_OLDEST_LOW_PRIORITY, COALESCE)
+
+# Default (capacity, policy) of the daemon's queues.
+DEFAULTS = {
+    "event": (10000, DROP_OLDEST_LOW_PRIORITY),
+    "recv": (10000, BLOCK),
+    "send": (100, BLOCK),
+    "ack": (10, DROP_OLDEST_LOW_PRIORITY),
+}
+
+# Events at or above this priority are dispatched through the fast lane.
+FAST_LANE_PRIORITY = cmd.Priority.HIGH
+
+# Commands that only report the latest state, so a newer instance can replace
+# an older one still waiting in a queue.
+COALESCABLE_COMMANDS = {
+    cmd.CommandType.KEYPAD_LED_STATE,
+    cmd.CommandType.KEYPAD_LED_FLASH_STATE,
+}
+_COALESCABLE_NUMBERS = {command.value for command in COALESCABLE_COMMANDS}
+
+_NO_KEYS = frozenset()
+_KEYED_COMMANDS = (
+    cmd.PARTITION_COMMANDS | cmd.PARTITION_AND_ZONE_COMMANDS | cmd.ZONE_COMMANDS
+)
+
+
+def ordering_keys(command: cmd.Command, data: str) -> frozenset:
+    """
+    Returns the keys of the partition and zone the given command refers to.
+    Events sharing a key must be dispatched in the order they were received.
+    :param command: Command received from the EVL device
+    :param data: Data received with the given command
+    :return: Set of ("partition", id) and ("zone", id) tuples
+    """
+    if command.command_type not in _KEYED_COMMANDS:
+        return _NO_KEYS
+
+    parsed = dt.parse(command, data)
+    keys = set()
+    if "partition" in parsed:
+        keys.add(("partition", parsed["partition"]))
+    if "zone" in parsed:
+        keys.add(("zone", parsed["zone"]))
+    return frozenset(keys)
+
+
+def frame_priority(frame: str) -> cmd.Priority:
+    """Returns the priority of the command in the given raw frame."""
+    command = cmd.Command(frame[:3])
+    return cmd.PRIORITIES.get(command.command_type, cmd.Priority.LOW)
+
+
+def frame_coalesce_key(frame: str):
+    """Returns the coalesce key of the given raw frame, if it has one."""
+    number = frame[:3]
+    return number if number in _COALESCABLE_NUMBERS else None
+
+
+def event_priority(item: tuple) -> cmd.Priority:
+    """Returns the priority of the given (command, data) tuple."""
+    return cmd.PRIORITIES.get(item[0].command_type, cmd.Priority.LOW)
+
+
+def event_coalesce_key(item: tuple):
+    """Returns the coalesce key of the given (command, data) tuple, if any."""
+    command_type = item[0].command_type
+    return command_type if command_type in COALESCABLE_COMMANDS else None
+
+
+class BoundedQueue(asyncio.Queue):
+    """
+    Queue with a capacity and an overflow policy applied once it is full:
+
+    - block: put() waits for room, as with asyncio.Queue.
+    - drop-oldest-low-priority: the oldest item of the lowest queued priority
+      is dropped to make room, unless the new item has a lower priority still,
+      in which case the new item is dropped instead.
+    - coalesce: the new item replaces a queued item with the same coalesce
+      key. Items without a match are handled as drop-oldest-low-priority.
+
+    Overflows, dropped and coalesced items are counted.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 0,
+        policy: str = BLOCK,
+        priority: Callable = None,
+        coalesce_key: Callable = None,
+    ):
+        if policy not in POLICIES:
+            raise ValueError("Invalid queue policy '{policy}'!".format(policy=policy))
+
+        super().__init__(maxsize)
+        self.policy = policy
+        self._priority = priority or (lambda item: cmd.Priority.LOW)
+        self._coalesce_key = coalesce_key or (lambda item: None)
+
+        self.overflows = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    async def put(self, item) -> None:
+        if self.full():
+            if self.policy != BLOCK:
+                # Shed or coalesce instead of waiting for room.
+                self.put_nowait(item)
+                return
+            self.overflows += 1
+        await super().put(item)
+
+    def put_nowait(self, item) -> None:
+        if self.full() and self.policy != BLOCK:
+            self.overflows += 1
+            if self.policy == COALESCE and self._coalesce(item):
+                self.coalesced += 1
+                return
+
+            self.dropped += 1
+            if not self._evict(item):
+                return
+
+        super().put_nowait(item)
+
+    def items(self) -> list:
+        """Returns the queued items, lowest priority lane first."""
+        return [item for lane in self._lanes() for item in lane]
+
+    def _lanes(self) -> tuple:
+        """Returns the deques holding queued items, lowest priority first."""
+        return (self._queue,)
+
+    def _coalesce(self, item) -> bool:
+        key = self._coalesce_key(item)
+        if key is None:
+            return False
+
+        for lane in self._lanes():
+            for index, queued in enumerate(lane):
+                if self._coalesce_key(queued) == key:
+                    lane[index] = item
+                    return True
+        return False
+
+    def _evict(self, item) -> bool:
+        """
+        Drops the oldest queued item with the lowest priority, if that priority
+        isn't higher than the given item's.
+        :param item: Item to be queued
+        :return: True if an item was dropped, False if the given item should be
+        """
+        victim = None
+        lowest = self._priority(item).value
+        for lane in self._lanes():
+            for index, queued in enumerate(lane):
+                priority = self._priority(queued).value
+                if priority < lowest or (victim is None and priority == lowest):
+                    victim, lowest = (lane, index), priority
+
+        if victim is None:
+            return False
+
+        lane, index = victim
+        del lane[index]
+        self.task_done()
+        return True
+
+    def stats(self) -> dict:
+        """Returns the current depth, capacity and overflow counters."""
+        return {
+            "size": self.qsize(),
+            "maxsize": self.maxsize,
+            "policy": self.policy,
+            "overflows": self.overflows,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+        }
+
+
+class EventQueue(BoundedQueue):
+    """
+    Event queue of (command, data) tuples that dispatches HIGH and CRITICAL
+    priority events ahead of lower priority ones.
+
+    Events are kept in two FIFO lanes. Fast lane events are always dequeued
+    first. When a fast lane event arrives, any lower priority events still
+    queued for the same partition or zone are moved into the fast lane ahead
+    of it so that per-partition and per-zone ordering is preserved.
+    """
+
+    def __init__(self, maxsize: int = 0, policy: str = BLOCK):
+        super().__init__(maxsize, policy, event_priority, event_coalesce_key)
+
+    def _init(self, maxsize):
+        self._fast = deque()
+        self._bulk = deque()
+
+    def _put(self, item):
+        command, _ = item
+        priority = cmd.PRIORITIES.get(command.command_type, cmd.Priority.LOW)
+
+        if priority.value < FAST_LANE_PRIORITY.value:
+            self._bulk.append(item)
+            return
+
+        if self._bulk:
+            keys = ordering_keys(*item)
+            if keys:
+                self._promote(keys)
+        self._fast.append(item)
+
+    def _promote(self, keys: frozenset) -> None:
+        # Keys of bulk events are only computed here, since fast lane events
+        # are rare compared to the bulk traffic that is queued.
+        bulk = deque()
+        for queued in self._bulk:
+            if ordering_keys(*queued) & keys:
+                self._fast.append(queued)
+            else:
+                bulk.append(queued)
+        self._bulk = bulk
+
+    def _get(self):
+        if self._fast:
+            return self._fast.popleft()
+        return self._bulk.popleft()
+
+    def _lanes(self) -> tuple:
+        return (self._bulk, self._fast)
+
+    def qsize(self) -> int:
+        return len(self._fast) + len(self._bulk)
+
+    def empty(self) -> bool:
+        return not self._fast and not self._bulk
+
+    def depths(self) -> dict:
+        """Returns the number of queued events in each lane."""
+        return {"fast": len(self._fast), "bulk": len(self._bulk)}
+
+    def stats(self) -> dict:
+        return {**super().stats(), **self.depths()}
+
+
+def event_queue(config=None) -> EventQueue:
+    """
+    Creates the daemon's event queue.
+    :param config: Object with maxsize and policy attributes, or None for defaults
+    :return: Event queue
+    """
+    maxsize, policy = _settings("event", config)
+    return EventQueue(maxsize, policy)
+
+
+def frame_queue(name: str, config=None) -> BoundedQueue:
+    """
+    Creates one of the connection's raw frame queues.
+    :param name: One of "recv", "send" or "ack"
+    :param config: Object with maxsize and policy attributes, or None for defaults
+    :return: Frame queue
+    """
+    maxsize, policy = _settings(name, config)
+    return BoundedQueue(maxsize, policy, frame_priority, frame_coalesce_key)
+
+
+def _settings(name: str, config) -> tuple:
+    if config is None:
+        return DEFAULTS[name]
+    return config.maxsize, config.policy
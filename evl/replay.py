@@ -0,0 +1,59 @@
+import asyncio
+import contextlib
+import logging
+
+import evl.capture as capture
+import evl.connection as conn
+import evl.event as ev
+
+logger = logging.getLogger(__name__)
+
+SOCKET = "socket"
+PARSER = "parser"
+MODES = (SOCKET, PARSER)
+
+
+async def replay(
+    frames: list[capture.Frame],
+    event_manager: ev.EventManager,
+    speed: float = 1.0,
+    mode: str = SOCKET,
+) -> None:
+    """
+    Feeds the given captured frames into the given event manager and waits
+    until every resulting event has been dispatched. The event manager's wait()
+    loop must already be running.
+
+    In socket mode, the frames are passed through a Connection using a fake
+    stream so that framing, login and acknowledgement handling are exercised.
+    In parser mode, each frame is handed directly to the frame processor.
+    :param frames: Frames read from a capture file
+    :param event_manager: Event manager that receives the replayed events
+    :param speed: Replay speed multiplier, 0 to replay at maximum speed
+    :param mode: Either "socket" or "parser"
+    """
+    if mode not in MODES:
+        raise ValueError("Invalid replay mode '{mode}'!".format(mode=mode))
+
+    connection = conn.Connection(event_manager=event_manager, host="replay")
+    logger.debug(
+        "Replaying {count} frames in {mode} mode...".format(
+            count=len(frames), mode=mode
+        )
+    )
+
+    if mode == SOCKET:
+        reader = capture.ReplayReader(frames, speed)
+        task = asyncio.create_task(
+            connection.start(reader=reader, writer=capture.NullWriter())
+        )
+        await reader.finished.wait()
+        await connection.join()
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    else:
+        async for frame in capture.replay(frames, speed):
+            await connection.process_frame(frame)
+
+    await event_manager.join()
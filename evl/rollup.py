@@ -0,0 +1,168 @@
+import time
+
+from array import array
+
+MINUTE = "minute"
+HOUR = "hour"
+DAY = "day"
+
+# (Seconds per bucket, number of buckets) kept for each resolution.
+RESOLUTIONS = {
+    MINUTE: (60, 60),
+    HOUR: (3600, 24),
+    DAY: (86400, 30),
+}
+
+ZONE = "zone"
+PARTITION = "partition"
+COMMAND = "command"
+KINDS = (ZONE, PARTITION, COMMAND)
+
+
+class RingBuffer:
+    """
+    Fixed number of time buckets counting events, reusing the oldest bucket
+    once time moves past it. Memory use doesn't depend on the number of
+    events counted.
+    """
+
+    def __init__(self, width: int, count: int):
+        self.width = width
+        self.count = count
+
+        self._counts = array("L", [0]) * count
+        self._epochs = array("q", [-1]) * count
+
+    def add(self, timestamp: float, amount: int = 1) -> None:
+        """
+        Counts events at the given time.
+        :param timestamp: Time of the events
+        :param amount: Number of events
+        """
+        epoch = int(timestamp // self.width)
+        slot = epoch % self.count
+
+        current = self._epochs[slot]
+        if current != epoch:
+            if current > epoch:
+                # Older than the window kept in the buffer.
+                return
+            self._epochs[slot] = epoch
+            self._counts[slot] = 0
+        self._counts[slot] += amount
+
+    def buckets(self, now: float) -> list:
+        """
+        Returns the counts of all buckets in the window ending at the given
+        time, oldest first.
+        :param now: End of the window
+        :return: List of (bucket start timestamp, count) tuples
+        """
+        last = int(now // self.width)
+        buckets = []
+        for epoch in range(last - self.count + 1, last + 1):
+            slot = epoch % self.count
+            count = self._counts[slot] if self._epochs[slot] == epoch else 0
+            buckets.append((epoch * self.width, count))
+        return buckets
+
+    def total(self, now: float) -> int:
+        """Returns the number of events in the window ending at the given time."""
+        first = int(now // self.width) - self.count + 1
+        return sum(
+            count for epoch, count in zip(self._epochs, self._counts) if epoch >= first
+        )
+
+
+class Rollups:
+    """
+    Streaming per-zone, per-partition and per-command event counters, kept
+    at minute, hour and day resolution.
+    """
+
+    def __init__(self, resolutions: dict = None):
+        if resolutions is None:
+            resolutions = RESOLUTIONS
+        self.resolutions = dict(resolutions)
+
+        self._buffers = {kind: {} for kind in KINDS}
+
+    def add(self, event) -> None:
+        """
+        Counts the given event for its command, zone and partition.
+        :param event: Event to count
+        """
+        self._add(COMMAND, event.command.number, event.timestamp)
+        if event.zone:
+            self._add(ZONE, event.zone, event.timestamp)
+        if event.partition:
+            self._add(PARTITION, event.partition, event.timestamp)
+
+    def _add(self, kind: str, key: str, timestamp: float) -> None:
+        buffers = self._buffers[kind].get(key)
+        if buffers is None:
+            buffers = self._buffers[kind][key] = [
+                RingBuffer(width, count) for width, count in self.resolutions.values()
+            ]
+
+        for buffer in buffers:
+            buffer.add(timestamp)
+
+    def _buffer(self, kind: str, key: str, resolution: str) -> RingBuffer:
+        index = list(self.resolutions).index(resolution)
+        return self._buffers[kind][key][index]
+
+    def query(
+        self, kind: str, resolution: str = HOUR, key: str = None, now: float = None
+    ) -> dict:
+        """
+        Returns the bucketed counts of the given kind of key.
+        :param kind: One of ZONE, PARTITION or COMMAND
+        :param resolution: One of the configured resolutions, e.g. HOUR
+        :param key: Zone, partition or command number, or None for all
+        :param now: End of the window, defaults to the current time
+        :return: Dict of key to list of (bucket start timestamp, count) tuples
+        """
+        self._validate(kind, resolution)
+        if now is None:
+            now = time.time()
+
+        keys = [key] if key is not None else sorted(self._buffers[kind])
+        return {
+            key: self._buffer(kind, key, resolution).buckets(now)
+            for key in keys
+            if key in self._buffers[kind]
+        }
+
+    def top(
+        self, kind: str, resolution: str = HOUR, limit: int = 10, now: float = None
+    ) -> list:
+        """
+        Returns the most active keys of the given kind.
+        :param kind: One of ZONE, PARTITION or COMMAND
+        :param resolution: Resolution whose window is totalled
+        :param limit: Maximum number of keys to return
+        :param now: End of the window, defaults to the current time
+        :return: List of (key, count) tuples, most active first
+        """
+        self._validate(kind, resolution)
+        if now is None:
+            now = time.time()
+
+        totals = [
+            (key, self._buffer(kind, key, resolution).total(now))
+            for key in self._buffers[kind]
+        ]
+        totals = [(key, count) for key, count in totals if count]
+        totals.sort(key=lambda total: (-total[1], total[0]))
+        return totals[:limit]
+
+    def _validate(self, kind: str, resolution: str) -> None:
+        if kind not in self._buffers:
+            raise ValueError("Invalid rollup kind '{kind}'!".format(kind=kind))
+        if resolution not in self.resolutions:
+            raise ValueError(
+                "Invalid rollup resolution '{resolution}'!".format(
+                    resolution=resolution
+                )
+            )
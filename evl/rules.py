@@ -0,0 +1,283 @@
+"""
+Rule engine that runs actions when matching events are dispatched.
+
+Rules match on command type, zone, partition and minimum priority. They are
+indexed by (command type, zone), with None standing for any command type or
+zone, so each event only looks at the rules that can match it, however many
+rules are active.
+"""
+
+import itertools
+import logging
+
+from typing import Callable
+
+import evl.command as cmd
+
+logger = logging.getLogger(__name__)
+
+ZONE_ALARM = "zone_alarm"
+NOTIFY = "notify"
+SEND = "send"
+REMOVE = "remove"
+ACTIONS = (ZONE_ALARM, NOTIFY, SEND, REMOVE)
+
+
+class Action:
+    """
+    Action run by a rule:
+
+    - zone_alarm: queues a Software Zone Alarm for "zone", or the event's zone,
+      unless the event is a Software Zone Alarm itself.
+    - notify: passes the event to the "notifiers" with the given names.
+    - send: sends "command" with optional "data" to the EVL device.
+    - remove: removes the rules of "group", or the rule's own group.
+    """
+
+    def __init__(self, type: str, **settings):
+        if type not in ACTIONS:
+            raise ValueError("Invalid rule action '{type}'!".format(type=type))
+        if type == SEND:
+            cmd.CommandType(settings.get("command"))
+
+        self.type = type
+        self.settings = settings
+
+    def as_dict(self) -> dict:
+        return {"type": self.type, **self.settings}
+
+
+class Rule:
+    """
+    Runs its actions for events matching all of its conditions. A condition
+    that is None matches any event. Events without a partition match any
+    partition condition.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        actions: list,
+        commands: list = None,
+        zones: list = None,
+        partitions: list = None,
+        priority: cmd.Priority = None,
+        group: str = None,
+    ):
+        self.name = name
+        self.actions = actions
+        self.commands = frozenset(commands) if commands is not None else None
+        self.zones = frozenset(zones) if zones is not None else None
+        self.partitions = frozenset(partitions) if partitions is not None else None
+        self.priority = priority
+        self.group = group if group is not None else name
+
+    def __str__(self):
+        return self.name
+
+    def keys(self) -> list:
+        """Returns the (command type, zone) index keys of this rule."""
+        commands = self.commands if self.commands is not None else (None,)
+        zones = self.zones if self.zones is not None else (None,)
+        return list(itertools.product(commands, zones))
+
+    def matches(self, event) -> bool:
+        """Checks the conditions that aren't covered by the index."""
+        if (
+            self.partitions is not None
+            and event.partition is not None
+            and event.partition not in self.partitions
+        ):
+            return False
+        return self.priority is None or event.priority.value >= self.priority.value
+
+    def as_dict(self) -> dict:
+        def names(values):
+            return sorted(values) if values is not None else None
+
+        return {
+            "name": self.name,
+            "group": self.group,
+            "commands": names(
+                {command.value for command in self.commands}
+                if self.commands is not None
+                else None
+            ),
+            "zones": names(self.zones),
+            "partitions": names(self.partitions),
+            "priority": self.priority.name if self.priority else None,
+            "actions": [action.as_dict() for action in self.actions],
+        }
+
+
+def from_dict(rule: dict) -> Rule:
+    """
+    Creates a rule from its dict representation, as used by the
+    configuration file and the HTTP API.
+    :param rule: Dict with name, actions and optional conditions
+    :return: Rule
+    """
+    commands = rule.get("commands")
+    priority = rule.get("priority")
+    try:
+        return Rule(
+            name=rule["name"],
+            actions=[Action(**action) for action in rule.get("actions", [])],
+            commands=[cmd.CommandType(c) for c in commands] if commands else None,
+            zones=rule.get("zones"),
+            partitions=rule.get("partitions"),
+            priority=cmd.Priority[priority.upper()] if priority else None,
+            group=rule.get("group"),
+        )
+    except (KeyError, TypeError) as e:
+        raise ValueError("Invalid rule: {e}".format(e=e))
+
+
+class RuleEngine:
+    """
+    Indexes rules by (command type, zone) and runs the actions of the rules
+    matching each dispatched event.
+    """
+
+    def __init__(self, event_manager, send: Callable = None):
+        self.event_manager = event_manager
+        # Coroutine sending a command to the EVL device, set by the daemon.
+        self.send = send
+
+        self._rules = {}
+        self._index = {}
+        self._order = {}
+        self._sequence = itertools.count()
+
+        self.fired = 0
+
+    def __len__(self):
+        return len(self._rules)
+
+    def add(self, rule: Rule) -> None:
+        """
+        Adds the given rule, replacing any rule with the same name.
+        :param rule: Rule to add
+        """
+        self.remove(rule.name)
+
+        self._rules[rule.name] = rule
+        self._order[rule.name] = next(self._sequence)
+        for key in rule.keys():
+            self._index.setdefault(key, []).append(rule)
+
+    def remove(self, name: str) -> Rule:
+        """
+        Removes the rule with the given name.
+        :param name: Name of rule to remove
+        :return: Removed rule, if any
+        """
+        rule = self._rules.pop(name, None)
+        if rule is None:
+            return None
+
+        del self._order[name]
+        for key in rule.keys():
+            rules = self._index[key]
+            rules.remove(rule)
+            if not rules:
+                del self._index[key]
+        return rule
+
+    def remove_group(self, group: str) -> list:
+        """
+        Removes all rules of the given group.
+        :param group: Group of rules to remove
+        :return: Removed rules
+        """
+        names = [rule.name for rule in self._rules.values() if rule.group == group]
+        return [self.remove(name) for name in names]
+
+    def rules(self) -> list:
+        """Returns all rules, in the order they were added."""
+        return sorted(self._rules.values(), key=lambda rule: self._order[rule.name])
+
+    def match(self, event) -> list:
+        """
+        Returns the rules matching the given event, in the order they were
+        added.
+        :param event: Dispatched event
+        :return: List of matching rules
+        """
+        if not self._index:
+            return []
+
+        command_type = event.command.command_type
+        if event.zone is None:
+            keys = ((command_type, None), (None, None))
+        else:
+            keys = (
+                (command_type, event.zone),
+                (command_type, None),
+                (None, event.zone),
+                (None, None),
+            )
+
+        candidates = []
+        for key in keys:
+            candidates.extend(self._index.get(key, ()))
+
+        matched = [rule for rule in candidates if rule.matches(event)]
+        if len(matched) > 1:
+            matched.sort(key=lambda rule: self._order[rule.name])
+        return matched
+
+    async def process(self, event) -> None:
+        """
+        Runs the actions of all rules matching the given event.
+        :param event: Dispatched event
+        """
+        for rule in self.match(event):
+            self.fired += 1
+            for action in rule.actions:
+                try:
+                    await ACTION_HANDLERS[action.type](self, rule, action, event)
+                except Exception as e:
+                    logger.error(
+                        "Error running %s action of rule %s: %s", action.type, rule, e
+                    )
+
+    async def _zone_alarm(self, rule: Rule, action: Action, event) -> None:
+        if event.command.command_type == cmd.CommandType.SOFTWARE_ZONE_ALARM:
+            # Raised by this action, so matching it would raise it again.
+            return
+
+        zone = action.settings.get("zone", event.zone)
+        if zone is None:
+            return
+
+        logger.debug("Rule %s triggered zone alarm", rule)
+        command = cmd.Command(cmd.CommandType.SOFTWARE_ZONE_ALARM.value)
+        await self.event_manager.enqueue(command, "{zone}".format(zone=zone))
+
+    async def _notify(self, rule: Rule, action: Action, event) -> None:
+        for name in action.settings.get("notifiers", []):
+            notifier = self.event_manager.notifier(name)
+            if notifier is not None:
+                await notifier.notify(event)
+
+    async def _send(self, rule: Rule, action: Action, event) -> None:
+        if self.send is None:
+            logger.error("Rule %s can't send commands without a connection.", rule)
+            return
+
+        command = cmd.CommandType(action.settings["command"])
+        await self.send(command, action.settings.get("data", ""))
+
+    async def _remove(self, rule: Rule, action: Action, event) -> None:
+        group = action.settings.get("group", rule.group)
+        logger.debug("Rule %s removed group %s", rule, group)
+        self.remove_group(group)
+
+
+ACTION_HANDLERS = {
+    ZONE_ALARM: RuleEngine._zone_alarm,
+    NOTIFY: RuleEngine._notify,
+    SEND: RuleEngine._send,
+    REMOVE: RuleEngine._remove,
+}
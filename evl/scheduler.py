@@ -0,0 +1,374 @@
+"""
+Scheduler running timed callbacks from a hierarchical timer wheel.
+
+Timers are kept in a few wheels of slots, each wheel covering a longer span of
+time with coarser slots, instead of each timer being a sleeping task. Adding
+and cancelling a timer is O(1), and a single task wakes up only when the next
+slot holding timers is due, however many timers are scheduled.
+"""
+
+import asyncio
+import contextlib
+import inspect
+import logging
+import math
+import random
+import time
+
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# Length of one tick of the innermost wheel, in seconds. Timers fire on the
+# first tick at or after their deadline.
+DEFAULT_RESOLUTION = 0.1
+DEFAULT_SLOTS = 64
+# Four wheels of 64 slots of 0.1 seconds cover about 19 days. Timers further
+# out than that wait in an overflow set.
+DEFAULT_LEVELS = 4
+
+# Allowance for floating point error when converting times to ticks.
+_EPSILON = 1e-9
+
+
+class Timer:
+    """
+    Callback scheduled by a Scheduler, once at a deadline or periodically.
+    """
+
+    __slots__ = (
+        "callback",
+        "args",
+        "deadline",
+        "interval",
+        "jitter",
+        "nominal",
+        "tick",
+        "running",
+        "cancelled",
+        "_slot",
+        "_scheduler",
+    )
+
+    def __init__(self, scheduler, callback: Callable, args: tuple):
+        self.callback = callback
+        self.args = args
+        self.deadline = None
+        self.interval = None
+        self.jitter = 0.0
+        # Deadline of a periodic timer before jitter is added.
+        self.nominal = None
+        self.tick = None
+        # Task running the latest call of a coroutine callback.
+        self.running = None
+        self.cancelled = False
+        self._slot = None
+        self._scheduler = scheduler
+
+    def __str__(self) -> str:
+        return getattr(self.callback, "__qualname__", str(self.callback))
+
+    @property
+    def active(self) -> bool:
+        """True until the timer has fired, for a one-off timer, or is cancelled."""
+        return self._slot is not None
+
+    def cancel(self) -> None:
+        """Cancels the timer. Calls that are already running aren't affected."""
+        self._scheduler.cancel(self)
+
+
+class Scheduler:
+    """
+    Runs callbacks after a delay, at a given time or periodically. Callbacks
+    may be plain functions or coroutine functions; coroutines are run as
+    tasks, and a periodic call is skipped while the previous one is running.
+
+    Periodic timers are scheduled from their nominal start time plus a whole
+    number of intervals, so they don't drift however late they fire. Random
+    jitter can be added to each call to spread out timers with the same
+    interval.
+
+    The scheduler's task is started by the first timer added from a running
+    event loop. advance() fires due timers without the task, e.g. in tests.
+    """
+
+    def __init__(
+        self,
+        resolution: float = DEFAULT_RESOLUTION,
+        slots: int = DEFAULT_SLOTS,
+        levels: int = DEFAULT_LEVELS,
+        clock: Callable = time.monotonic,
+    ):
+        self.resolution = resolution
+        self.slots = slots
+        self.levels = levels
+        self.clock = clock
+
+        self._origin = clock()
+        self._tick = 0
+        # Number of ticks covered by one slot of each level, and by the whole
+        # outermost wheel.
+        self._spans = [slots**level for level in range(levels + 1)]
+        self._wheels = [[set() for _ in range(slots)] for _ in range(levels)]
+        self._overflow = set()
+        self._count = 0
+
+        self._task = None
+        self._wakeup = None
+        self._wake_tick = None
+        self._tasks = set()
+
+        self.fired = 0
+        self.skipped = 0
+        self.errors = 0
+        self.max_lag = 0.0
+
+    def __len__(self):
+        return self._count
+
+    def call_at(self, when: float, callback: Callable, *args) -> Timer:
+        """
+        Calls the given callback once at the given time.
+        :param when: Time to call the callback at, as given by the clock
+        :param callback: Function or coroutine function to call
+        :param args: Arguments to call the callback with
+        :return: Timer that can be cancelled
+        """
+        timer = Timer(self, callback, args)
+        self._schedule(timer, when)
+        return timer
+
+    def call_later(self, delay: float, callback: Callable, *args) -> Timer:
+        """
+        Calls the given callback once after the given delay.
+        :param delay: Delay in seconds
+        :param callback: Function or coroutine function to call
+        :param args: Arguments to call the callback with
+        :return: Timer that can be cancelled
+        """
+        return self.call_at(self.clock() + delay, callback, *args)
+
+    def call_every(
+        self,
+        interval: float,
+        callback: Callable,
+        *args,
+        jitter: float = 0.0,
+        delay: float = None,
+    ) -> Timer:
+        """
+        Calls the given callback every interval until the timer is cancelled.
+        :param interval: Interval in seconds
+        :param callback: Function or coroutine function to call
+        :param args: Arguments to call the callback with
+        :param jitter: Up to this many seconds are randomly added to each call
+        :param delay: Delay before the first call, defaults to the interval
+        :return: Timer that can be cancelled
+        """
+        if interval <= 0:
+            raise ValueError(
+                "Invalid timer interval '{interval}'!".format(interval=interval)
+            )
+
+        timer = Timer(self, callback, args)
+        timer.interval = interval
+        timer.jitter = jitter
+        timer.nominal = self.clock() + (interval if delay is None else delay)
+        self._schedule(timer, timer.nominal + self._jitter(jitter))
+        return timer
+
+    def cancel(self, timer: Timer) -> None:
+        """
+        Cancels the given timer, if it is still scheduled.
+        :param timer: Timer to cancel
+        """
+        timer.cancelled = True
+        if timer._slot is None:
+            return
+        timer._slot.discard(timer)
+        timer._slot = None
+        self._count -= 1
+
+    def advance(self, now: float = None) -> int:
+        """
+        Fires the timers that are due by the given time.
+        :param now: Current time, defaults to the clock
+        :return: Number of timers fired
+        """
+        if now is None:
+            now = self.clock()
+
+        target = math.floor((now - self._origin) / self.resolution + _EPSILON)
+        fired = 0
+        while self._tick < target:
+            if not self._count:
+                self._tick = target
+                break
+            for timer in self._step():
+                self._fire(timer, now)
+                fired += 1
+        return fired
+
+    async def run(self) -> None:
+        """Fires timers as they become due."""
+        self._task = asyncio.current_task()
+        self._wakeup = asyncio.Event()
+        while True:
+            self.advance()
+            self._wakeup.clear()
+            delay = self._next_delay()
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+
+    async def close(self) -> None:
+        """Stops firing timers and cancels callbacks that are still running."""
+        tasks = list(self._tasks)
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    def stats(self) -> dict:
+        """Returns the number of timers and how they have been fired."""
+        return {
+            "timers": self._count,
+            "running": len(self._tasks),
+            "fired": self.fired,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "max_lag": self.max_lag,
+        }
+
+    @staticmethod
+    def _jitter(jitter: float) -> float:
+        return random.uniform(0, jitter) if jitter else 0.0
+
+    def _schedule(self, timer: Timer, deadline: float) -> None:
+        timer.deadline = deadline
+        tick = math.ceil((deadline - self._origin) / self.resolution - _EPSILON)
+        timer.tick = max(tick, self._tick + 1)
+        self._place(timer)
+        self._count += 1
+
+        if self._task is None or self._task.done():
+            self._start()
+        elif self._wake_tick is None or timer.tick < self._wake_tick:
+            self._wakeup.set()
+
+    def _start(self) -> None:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._task = asyncio.create_task(self.run())
+
+    def _place(self, timer: Timer) -> None:
+        delta = timer.tick - self._tick
+        for level in range(self.levels):
+            if delta < self._spans[level + 1]:
+                index = (timer.tick // self._spans[level]) % self.slots
+                slot = self._wheels[level][index]
+                break
+        else:
+            slot = self._overflow
+
+        slot.add(timer)
+        timer._slot = slot
+
+    def _step(self) -> list:
+        self._tick += 1
+
+        # Timers in the slot of each outer wheel starting at this tick move to
+        # the inner wheels, or are due if they belong to this very tick.
+        due = []
+        for level in range(1, self.levels + 1):
+            span = self._spans[level]
+            if self._tick % span:
+                break
+            if level == self.levels:
+                slot = self._overflow
+            else:
+                slot = self._wheels[level][(self._tick // span) % self.slots]
+
+            timers = list(slot)
+            slot.clear()
+            for timer in timers:
+                if timer.tick <= self._tick:
+                    due.append(timer)
+                else:
+                    self._place(timer)
+
+        slot = self._wheels[0][self._tick % self.slots]
+        due.extend(slot)
+        slot.clear()
+
+        for timer in due:
+            timer._slot = None
+        self._count -= len(due)
+        due.sort(key=lambda timer: timer.deadline)
+        return due
+
+    def _fire(self, timer: Timer, now: float) -> None:
+        if timer.cancelled:
+            return
+        self.max_lag = max(self.max_lag, now - timer.deadline)
+
+        if timer.interval is not None:
+            # Calls missed by more than a whole interval are skipped rather
+            # than run back to back.
+            nominal = timer.nominal + timer.interval
+            if nominal <= now:
+                missed = math.floor((now - nominal) / timer.interval) + 1
+                nominal += missed * timer.interval
+                self.skipped += missed
+            timer.nominal = nominal
+            self._schedule(timer, nominal + self._jitter(timer.jitter))
+
+        if timer.running is not None and not timer.running.done():
+            logger.debug("Skipping %s, previous call still running.", timer)
+            self.skipped += 1
+            return
+
+        self.fired += 1
+        try:
+            result = timer.callback(*timer.args)
+        except Exception as e:
+            self.errors += 1
+            logger.error("Error running timer %s: %s", timer, e)
+            return
+
+        if inspect.isawaitable(result):
+            task = asyncio.ensure_future(result)
+            timer.running = task
+            self._tasks.add(task)
+            task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+            logger.error("Error running timer: %s", task.exception())
+
+    def _next_delay(self) -> float:
+        if not self._count:
+            self._wake_tick = None
+            return None
+
+        # Wake up at the next tick holding timers, or at the start of the next
+        # slot of the outer wheels, when timers move inward.
+        boundary = (self._tick // self.slots + 1) * self.slots
+        wake_tick = boundary
+        for tick in range(self._tick + 1, boundary):
+            if self._wheels[0][tick % self.slots]:
+                wake_tick = tick
+                break
+
+        self._wake_tick = wake_tick
+        delay = self._origin + wake_tick * self.resolution - self.clock()
+        return max(delay, 0)
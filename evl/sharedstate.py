@@ -0,0 +1,196 @@
+"""
+Publishing of read-only daemon state through shared memory.
+
+The core process writes named sections, such as the serialized status report,
+to a memory-mapped file that other processes read without any locking on the
+writer's side. The file starts with a fixed header holding a magic number, the
+format version, a sequence number, the length of the payload and its CRC32.
+The payload holds one record per section: the length of the section name and
+data, followed by the UTF-8 name and the data itself.
+
+Writes are guarded by a sequence lock: the sequence number is odd while the
+payload is being written and is bumped to the next even number once it is
+complete. Readers retry when the sequence number is odd or changed while they
+were copying the payload, and the CRC catches any torn read that slips past.
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+import time
+import zlib
+
+MAGIC = b"EVLS"
+VERSION = 1
+
+DEFAULT_SIZE = 4 * 1024 * 1024
+
+_HEADER = struct.Struct("<4sB3xQQI")
+_SEQUENCE = struct.Struct("<Q")
+_SEQUENCE_OFFSET = 8
+_PAYLOAD = struct.Struct("<QI")
+_PAYLOAD_OFFSET = 16
+_SECTION = struct.Struct("<HI")
+
+# Number of times a reader retries a read that raced with a write.
+RETRIES = 100
+
+
+class SharedStateError(Exception):
+    pass
+
+
+def default_path(name: str) -> str:
+    """
+    Returns a path for a shared state file, in memory-backed /dev/shm where
+    available.
+    :param name: Name identifying the state, e.g. the listener name
+    :return: Path of the shared state file
+    """
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(
+        directory, "evl-{name}-{pid}.state".format(name=name, pid=os.getpid())
+    )
+
+
+def encode(sections: dict) -> bytes:
+    """
+    Encodes the given sections into a payload.
+    :param sections: Dict of section name to bytes
+    :return: Encoded payload
+    """
+    parts = []
+    for name, data in sections.items():
+        encoded = name.encode("utf-8")
+        parts.append(_SECTION.pack(len(encoded), len(data)))
+        parts.append(encoded)
+        parts.append(data)
+    return b"".join(parts)
+
+
+def decode(payload: bytes) -> dict:
+    """
+    Decodes a payload encoded by encode().
+    :param payload: Encoded payload
+    :return: Dict of section name to bytes
+    """
+    sections = {}
+    offset = 0
+    while offset < len(payload):
+        name_length, data_length = _SECTION.unpack_from(payload, offset)
+        offset += _SECTION.size
+        name = payload[offset : offset + name_length].decode("utf-8")
+        offset += name_length
+        sections[name] = payload[offset : offset + data_length]
+        offset += data_length
+    return sections
+
+
+class SharedStateWriter:
+    """Publishes sections of state to a shared memory file."""
+
+    def __init__(self, path: str, size: int = DEFAULT_SIZE):
+        self.path = path
+        self.capacity = size
+        self.sequence = 0
+
+        # Only readable by the daemon's user, since the state holds the event
+        # history that the listeners only serve with the auth token.
+        fd = os.open(path, os.O_CREAT | os.O_RDWR | os.O_TRUNC, 0o600)
+        # The mode only applies to new files, so an existing one is changed.
+        os.fchmod(fd, 0o600)
+        self._file = os.fdopen(fd, "r+b")
+        self._file.truncate(_HEADER.size + size)
+        self._map = mmap.mmap(self._file.fileno(), _HEADER.size + size)
+        _HEADER.pack_into(self._map, 0, MAGIC, VERSION, 0, 0, 0)
+
+    def __str__(self):
+        return "Shared state ({path})".format(path=self.path)
+
+    def write(self, sections: dict) -> None:
+        """
+        Replaces the published state with the given sections.
+        :param sections: Dict of section name to bytes
+        """
+        payload = encode(sections)
+        if len(payload) > self.capacity:
+            raise SharedStateError(
+                "State of {length} bytes exceeds capacity of {capacity}!".format(
+                    length=len(payload), capacity=self.capacity
+                )
+            )
+
+        self.sequence += 1
+        _SEQUENCE.pack_into(self._map, _SEQUENCE_OFFSET, self.sequence)
+        self._map[_HEADER.size : _HEADER.size + len(payload)] = payload
+
+        _PAYLOAD.pack_into(
+            self._map, _PAYLOAD_OFFSET, len(payload), zlib.crc32(payload)
+        )
+
+        self.sequence += 1
+        _SEQUENCE.pack_into(self._map, _SEQUENCE_OFFSET, self.sequence)
+
+    def close(self, unlink: bool = True) -> None:
+        """
+        Closes the shared state file.
+        :param unlink: Whether to remove the file
+        """
+        self._map.close()
+        self._file.close()
+        if unlink:
+            os.remove(self.path)
+
+
+class SharedStateReader:
+    """
+    Reads the sections published by a SharedStateWriter. The last state read
+    is cached until a new one is published.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, _, _ = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise SharedStateError(
+                "Unsupported shared state file {path}!".format(path=path)
+            )
+
+        self.sequence = None
+        self._sections = {}
+
+    def read(self) -> dict:
+        """
+        Returns the latest published sections.
+        :return: Dict of section name to bytes
+        """
+        for _ in range(RETRIES):
+            (sequence,) = _SEQUENCE.unpack_from(self._map, _SEQUENCE_OFFSET)
+            if sequence == self.sequence:
+                return self._sections
+            if sequence % 2:
+                time.sleep(0)
+                continue
+
+            length, crc = _PAYLOAD.unpack_from(self._map, _PAYLOAD_OFFSET)
+            payload = self._map[_HEADER.size : _HEADER.size + length]
+            (after,) = _SEQUENCE.unpack_from(self._map, _SEQUENCE_OFFSET)
+            if after != sequence or zlib.crc32(payload) != crc:
+                continue
+
+            self._sections = decode(payload)
+            self.sequence = sequence
+            return self._sections
+
+        if self.sequence is None:
+            raise SharedStateError("Unable to read shared state!")
+        return self._sections
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
@@ -0,0 +1,223 @@
+from array import array
+
+import evl.command as cmd
+
+OPEN = "open"
+ALARM = "alarm"
+TAMPER = "tamper"
+FAULT = "fault"
+BYPASS = "bypass"
+ZONE_FLAGS = (OPEN, ALARM, TAMPER, FAULT, BYPASS)
+
+READY = "ready"
+ARMED = "armed"
+EXIT_DELAY = "exit_delay"
+ENTRY_DELAY = "entry_delay"
+BUSY = "busy"
+PARTITION_FLAGS = (READY, ARMED, ALARM, EXIT_DELAY, ENTRY_DELAY, BUSY)
+
+# Flags set (True) or cleared (False) by each command, for the zone or
+# partition the command refers to.
+ZONE_TRANSITIONS = {
+    cmd.CommandType.ZONE_ALARM: ((ALARM, True),),
+    cmd.CommandType.ZONE_ALARM_RESTORE: ((ALARM, False),),
+    cmd.CommandType.ZONE_TAMPER: ((TAMPER, True),),
+    cmd.CommandType.ZONE_TAMPER_RESTORE: ((TAMPER, False),),
+    cmd.CommandType.ZONE_FAULT: ((FAULT, True),),
+    cmd.CommandType.ZONE_FAULT_RESTORE: ((FAULT, False),),
+    cmd.CommandType.ZONE_OPEN: ((OPEN, True),),
+    cmd.CommandType.ZONE_RESTORED: ((OPEN, False),),
+}
+
+PARTITION_TRANSITIONS = {
+    cmd.CommandType.PARTITION_READY: ((READY, True), (BUSY, False)),
+    cmd.CommandType.PARTITION_NOT_READY: ((READY, False), (BUSY, False)),
+    cmd.CommandType.PARTITION_READY_FORCE_ARMING_ENABLED: (
+        (READY, True),
+        (BUSY, False),
+    ),
+    cmd.CommandType.PARTITION_ARMED: (
+        (ARMED, True),
+        (EXIT_DELAY, False),
+        (ENTRY_DELAY, False),
+    ),
+    cmd.CommandType.PARTITION_IN_ALARM: ((ALARM, True),),
+    cmd.CommandType.PARTITION_DISARMED: (
+        (ARMED, False),
+        (ALARM, False),
+        (EXIT_DELAY, False),
+        (ENTRY_DELAY, False),
+    ),
+    cmd.CommandType.EXIT_DELAY_IN_PROGRESS: ((EXIT_DELAY, True),),
+    cmd.CommandType.ENTRY_DELAY_IN_PROGRESS: ((ENTRY_DELAY, True),),
+    cmd.CommandType.PARTITION_IS_BUSY: ((BUSY, True),),
+}
+
+
+def _indexes(mask: int) -> list:
+    """Returns the positions of the bits set in the given mask."""
+    indexes = []
+    while mask:
+        low = mask & -mask
+        indexes.append(low.bit_length() - 1)
+        mask ^= low
+    return indexes
+
+
+class StateSnapshot:
+    """
+    Immutable view of a StateTable at a point in time. Snapshots share their
+    storage with the table until the table is next changed.
+    """
+
+    def __init__(self, flags: dict, changed_at: array, key_format: str):
+        self._flags = flags
+        self._changed_at = changed_at
+        self._key_format = key_format
+
+    def mask(self, flag: str) -> int:
+        """Returns the bitmask of the entries with the given flag set."""
+        return self._flags[flag]
+
+    def query(self, *flags: str, match_all: bool = False) -> list:
+        """
+        Returns the entries with any, or all, of the given flags set.
+        :param flags: Flags to match
+        :param match_all: True to only return entries with all flags set
+        :return: Sorted list of entry numbers
+        """
+        masks = [self._flags[flag] for flag in flags]
+        if not masks:
+            return []
+
+        mask = masks[0]
+        for other in masks[1:]:
+            mask = mask & other if match_all else mask | other
+        return _indexes(mask)
+
+    def get(self, index: int) -> dict:
+        """Returns the flags of the given entry."""
+        return {flag: bool(mask >> index & 1) for flag, mask in self._flags.items()}
+
+    def changed_at(self, index: int) -> float:
+        """Returns the time of the last change to the given entry, or 0."""
+        if index >= len(self._changed_at):
+            return 0.0
+        return self._changed_at[index]
+
+    def as_dict(self) -> dict:
+        """
+        Returns the entries with each flag set and the time of the last change
+        to each entry that has changed.
+        :return: Dict of flag to list of entry keys, and "changed_at"
+        """
+        state = {
+            flag: [self._key_format.format(index) for index in _indexes(mask)]
+            for flag, mask in self._flags.items()
+        }
+        state["changed_at"] = {
+            self._key_format.format(index): changed_at
+            for index, changed_at in enumerate(self._changed_at)
+            if changed_at
+        }
+        return state
+
+
+class StateTable:
+    """
+    Compact table of boolean flags for numbered entries, e.g. zones 1-64.
+
+    Each flag is kept as an integer bitset with bit n set for entry n, so
+    updates are O(1) and queries across all entries are a few integer
+    operations. The time of the last change to each entry is kept in an
+    array of floats. The table grows as needed for entries beyond its
+    initial size.
+    """
+
+    def __init__(self, flags: tuple, size: int = 64, key_format: str = "{:03d}"):
+        self.flags = tuple(flags)
+        self.key_format = key_format
+
+        self._flags = {flag: 0 for flag in self.flags}
+        self._changed_at = array("d", bytes(8 * (size + 1)))
+        self._snapshot = None
+
+    def __len__(self):
+        return len(self._changed_at) - 1
+
+    def _write(self, index: int) -> None:
+        # Copy-on-write: a snapshot keeps the storage it was taken from, so it
+        # is copied before the first change after a snapshot is taken.
+        if self._snapshot is not None:
+            self._changed_at = array("d", self._changed_at)
+            self._snapshot = None
+
+        if index >= len(self._changed_at):
+            self._changed_at.frombytes(bytes(8 * (index + 1 - len(self._changed_at))))
+
+    def set(self, index: int, flag: str, value: bool, timestamp: float) -> bool:
+        """
+        Sets or clears a flag of the given entry.
+        :param index: Entry number
+        :param flag: Flag to change
+        :param value: True to set the flag, False to clear it
+        :param timestamp: Time of the change
+        :return: True if the flag changed
+        """
+        mask = self._flags[flag]
+        bit = 1 << index
+        if bool(mask & bit) == value:
+            return False
+
+        self._write(index)
+        self._flags[flag] = mask | bit if value else mask & ~bit
+        self._changed_at[index] = timestamp
+        return True
+
+    def set_mask(self, flag: str, mask: int, timestamp: float) -> list:
+        """
+        Replaces a flag for all entries at once.
+        :param flag: Flag to replace
+        :param mask: Bitmask with bit n set if entry n has the flag set
+        :param timestamp: Time of the change
+        :return: Entries whose flag changed
+        """
+        changed = _indexes(self._flags[flag] ^ mask)
+        if not changed:
+            return changed
+
+        self._write(changed[-1])
+        self._flags[flag] = mask
+        for index in changed:
+            self._changed_at[index] = timestamp
+        return changed
+
+    def apply(self, index: int, transitions: tuple, timestamp: float) -> None:
+        """
+        Applies the (flag, value) transitions of a command to the given entry.
+        :param index: Entry number
+        :param transitions: Tuple of (flag, value) pairs
+        :param timestamp: Time of the change
+        """
+        for flag, value in transitions:
+            self.set(index, flag, value, timestamp)
+
+    def get(self, index: int) -> dict:
+        """Returns the flags of the given entry."""
+        return self.snapshot().get(index)
+
+    def query(self, *flags: str, match_all: bool = False) -> list:
+        """Returns the entries with any, or all, of the given flags set."""
+        return self.snapshot().query(*flags, match_all=match_all)
+
+    def snapshot(self) -> StateSnapshot:
+        """
+        Returns an immutable snapshot of the table. The same snapshot is
+        returned until the table changes.
+        :return: State snapshot
+        """
+        if self._snapshot is None:
+            self._snapshot = StateSnapshot(
+                dict(self._flags), self._changed_at, self.key_format
+            )
+        return self._snapshot
@@ -2,9 +2,11 @@ from collections import deque
 
 from evl.event import Event
 
+DEFAULT_SIZE = 100
+
 
 class MemoryStorage:
-    def __init__(self, size=100, name="Memory"):
+    def __init__(self, size=DEFAULT_SIZE, name="Memory"):
         self.size = size
         self.name = name
         self._deque = deque(maxlen=self.size)
@@ -17,3 +19,13 @@ class MemoryStorage:
 
     def __str__(self) -> str:
         return "{name}".format(name=self.name)
+
+
+def from_config(config) -> MemoryStorage:
+    """
+    Creates a memory storage engine from the given storage configuration.
+    :param config: Storage configuration
+    :return: Memory storage engine
+    """
+    size = int(config.settings.get("maxSize", DEFAULT_SIZE))
+    return MemoryStorage(size=size, name=config.name)
@@ -0,0 +1,385 @@
+import json
+import logging
+import lzma
+import os
+import time
+import zlib
+
+from collections import deque
+from typing import NamedTuple
+
+import evl.command as cmd
+
+from evl.event import Event
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = "~/.evl/events"
+DEFAULT_HOT_SIZE = 1000
+DEFAULT_SEGMENT_SIZE = 1000
+DEFAULT_RETENTION_DAYS = 365
+DEFAULT_COMPRESSION = "zlib"
+
+# Segments are merged by compaction until they hold this many segments' worth
+# of events.
+COMPACT_FACTOR = 16
+# Compaction runs after this many segments have been written.
+COMPACT_EVERY = 8
+
+COMPRESSORS = {
+    "zlib": (lambda data: zlib.compress(data, 9), zlib.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+}
+
+SEGMENT_VERSION = 1
+
+# Lists the segments being merged by compaction, so that an interrupted
+# compaction can be completed when the storage is next opened.
+JOURNAL = "compact.json"
+
+
+class Segment(NamedTuple):
+    """Cold segment file and the range of events it holds."""
+
+    sequence: int
+    start: int
+    end: int
+    count: int
+    path: str
+
+    @classmethod
+    def parse(cls, directory: str, file: str):
+        name, _, extension = file.rpartition(".")
+        if extension not in COMPRESSORS:
+            return None
+        try:
+            sequence, start, end, count = (int(part) for part in name.split("-"))
+        except ValueError:
+            return None
+        return cls(sequence, start, end, count, os.path.join(directory, file))
+
+
+def encode_segment(events: list) -> bytes:
+    """
+    Encodes events column by column, with timestamps stored as deltas, so that
+    similar values are next to each other and compress well.
+    :param events: Events to encode, oldest first
+    :return: Encoded segment
+    """
+    timestamps = [event.timestamp for event in events]
+    deltas = [timestamps[0]] + [b - a for a, b in zip(timestamps, timestamps[1:])]
+    segment = {
+        "version": SEGMENT_VERSION,
+        "timestamp": deltas,
+        "command": [event.command.number for event in events],
+        "data": [event.data for event in events],
+        "zone": [event.zone for event in events],
+        "partition": [event.partition for event in events],
+    }
+    return json.dumps(segment, separators=(",", ":")).encode()
+
+
+def decode_segment(data: bytes) -> list:
+    """
+    Decodes events encoded by encode_segment().
+    :param data: Encoded segment
+    :return: List of events, oldest first
+    """
+    segment = json.loads(data)
+    if segment.get("version") != SEGMENT_VERSION:
+        raise ValueError(
+            "Unsupported segment version {version}!".format(
+                version=segment.get("version")
+            )
+        )
+
+    events = []
+    timestamp = 0
+    columns = zip(
+        segment["timestamp"],
+        segment["command"],
+        segment["data"],
+        segment["zone"],
+        segment["partition"],
+    )
+    for delta, number, data, zone, partition in columns:
+        timestamp += delta
+        parsed = {"data": data, "zone": zone, "partition": partition}
+        events.append(Event(cmd.Command(number), parsed, timestamp))
+    return events
+
+
+class TieredStorage:
+    """
+    Storage engine that keeps the most recent events in memory and moves
+    older events to compressed, column-oriented segment files on disk.
+
+    Segments older than the retention period are deleted and small segments
+    are periodically merged. range() reads both tiers, only opening the
+    segments that overlap the requested time range.
+
+    Storing an event may write, compress and merge segments, so this engine
+    is wrapped in a write-behind buffer unless its configuration disables it,
+    which moves that work and range() off the event loop.
+    """
+
+    # Default of the "writeBehind" setting, see evl.config.
+    write_behind = True
+    # Events are kept on disk, so a replacement engine reads them itself
+    # rather than having them carried over on reload.
+    persistent = True
+
+    def __init__(
+        self,
+        path: str,
+        hot_size: int = DEFAULT_HOT_SIZE,
+        segment_size: int = DEFAULT_SEGMENT_SIZE,
+        retention_days: float = DEFAULT_RETENTION_DAYS,
+        compression: str = DEFAULT_COMPRESSION,
+        name: str = "Tiered",
+    ):
+        if compression not in COMPRESSORS:
+            raise ValueError(
+                "Invalid compression '{compression}'!".format(compression=compression)
+            )
+
+        self.path = os.path.expanduser(path)
+        self.hot_size = hot_size
+        self.segment_size = segment_size
+        self.retention = retention_days * 86400
+        self.compression = compression
+        self.name = name
+
+        self._hot = deque()
+        self._written = 0
+
+        os.makedirs(self.path, exist_ok=True)
+        self._segments = self._scan()
+
+    def __str__(self) -> str:
+        return "{name}".format(name=self.name)
+
+    def _scan(self) -> list:
+        self._recover()
+
+        by_sequence = {}
+        for segment in self._list():
+            by_sequence.setdefault(segment.sequence, []).append(segment)
+
+        segments = []
+        for group in by_sequence.values():
+            # A merged segment reuses the sequence of the first segment it
+            # replaces. If compaction was interrupted, keep the merged one.
+            # Segments that merely share a sequence are all kept.
+            group.sort(key=lambda segment: segment.count, reverse=True)
+            for segment in group:
+                if any(_contains(kept, segment) for kept in segments):
+                    os.remove(segment.path)
+                else:
+                    segments.append(segment)
+        return sorted(segments)
+
+    def _list(self) -> list:
+        segments = []
+        for file in os.listdir(self.path):
+            segment = Segment.parse(self.path, file)
+            if segment is not None:
+                segments.append(segment)
+        return segments
+
+    def _recover(self) -> None:
+        # Completes a compaction interrupted after its merged segment was
+        # written, or abandons one interrupted before, leaving its inputs.
+        journal = os.path.join(self.path, JOURNAL)
+        if not os.path.exists(journal):
+            return
+
+        with open(journal) as journal_file:
+            compaction = json.load(journal_file)
+        merged = compaction["merged"]
+        if os.path.exists(os.path.join(self.path, merged)):
+            logger.debug("Completing interrupted compaction into %s", merged)
+            for file in compaction["inputs"]:
+                path = os.path.join(self.path, file)
+                if file != merged and os.path.exists(path):
+                    os.remove(path)
+        os.remove(journal)
+
+    def store(self, event: Event) -> None:
+        self._hot.append(event)
+        if len(self._hot) >= self.hot_size + self.segment_size:
+            self.flush(self.segment_size)
+
+    def all(self) -> list:
+        """Returns the events held in memory."""
+        return list(self._hot)
+
+    def range(self, start: int = None, end: int = None) -> list:
+        """
+        Returns the events with timestamps between start and end, inclusive,
+        from both the memory and disk tiers.
+        :param start: Earliest timestamp, or None for no lower bound
+        :param end: Latest timestamp, or None for no upper bound
+        :return: List of events, oldest first
+        """
+        low = start if start is not None else float("-inf")
+        high = end if end is not None else float("inf")
+
+        events = []
+        for segment in self._segments:
+            if segment.end < low or segment.start > high:
+                continue
+            events.extend(
+                event for event in self._read(segment) if low <= event.timestamp <= high
+            )
+
+        events.extend(event for event in self._hot if low <= event.timestamp <= high)
+        return events
+
+    def segments(self) -> list:
+        """Returns the segments currently on disk, oldest first."""
+        return list(self._segments)
+
+    def flush(self, count: int = None) -> None:
+        """
+        Moves the oldest events in memory to a new segment on disk, then
+        applies retention and, periodically, compaction.
+        :param count: Number of events to move, or None for all
+        """
+        if count is None:
+            count = len(self._hot)
+        events = [self._hot.popleft() for _ in range(min(count, len(self._hot)))]
+        if events:
+            self._write(events)
+
+        self._expire()
+        if self._written >= COMPACT_EVERY:
+            self.compact()
+
+    def close(self) -> None:
+        """Writes all events held in memory to disk."""
+        self.flush()
+
+    def compact(self) -> None:
+        """Merges runs of consecutive small segments into larger ones."""
+        limit = self.segment_size * COMPACT_FACTOR
+        self._written = 0
+
+        run = []
+        for segment in list(self._segments):
+            if segment.count >= limit:
+                self._merge(run)
+                run = []
+                continue
+            if sum(s.count for s in run) + segment.count > limit:
+                self._merge(run)
+                run = []
+            run.append(segment)
+        self._merge(run)
+
+    def _merge(self, segments: list) -> None:
+        if len(segments) < 2:
+            return
+
+        events = []
+        for segment in segments:
+            events.extend(self._read(segment))
+
+        logger.debug(
+            "Compacting %d segments of %d events...", len(segments), len(events)
+        )
+        merged = self._segment(events, segments[0].sequence)
+        journal = os.path.join(self.path, JOURNAL)
+        self._replace(
+            journal,
+            json.dumps(
+                {
+                    "merged": os.path.basename(merged.path),
+                    "inputs": [os.path.basename(s.path) for s in segments],
+                }
+            ).encode(),
+        )
+
+        self._write(events, segments[0].sequence, index=False)
+        for segment in segments:
+            if segment.path != merged.path:
+                os.remove(segment.path)
+            self._segments.remove(segment)
+        os.remove(journal)
+        self._segments.append(merged)
+        self._segments.sort()
+
+    def _expire(self) -> None:
+        cutoff = time.time() - self.retention
+        while self._segments and self._segments[0].end < cutoff:
+            segment = self._segments.pop(0)
+            logger.debug("Removing expired segment %s", segment.path)
+            os.remove(segment.path)
+
+    def _segment(self, events: list, sequence: int) -> Segment:
+        file = "{sequence:08d}-{start}-{end}-{count}.{compression}".format(
+            sequence=sequence,
+            start=events[0].timestamp,
+            end=events[-1].timestamp,
+            count=len(events),
+            compression=self.compression,
+        )
+        return Segment.parse(self.path, file)
+
+    @staticmethod
+    def _replace(path: str, data: bytes) -> None:
+        # Writes the file under a temporary name first, so that it is either
+        # fully written or not there at all.
+        temp = path + ".tmp"
+        with open(temp, "wb") as file:
+            file.write(data)
+        os.replace(temp, path)
+
+    def _write(self, events: list, sequence: int = None, index: bool = True):
+        if sequence is None:
+            # The directory is listed again, rather than relying on the
+            # segments found when it was opened, so that a sequence is never
+            # reused if another engine wrote to the same directory since.
+            sequences = [s.sequence for s in self._segments + self._list()]
+            sequence = max(sequences) + 1 if sequences else 0
+
+        segment = self._segment(events, sequence)
+        compress, _ = COMPRESSORS[self.compression]
+        self._replace(segment.path, compress(encode_segment(events)))
+
+        if index:
+            self._segments.append(segment)
+            self._written += 1
+        return segment
+
+    def _read(self, segment: Segment) -> list:
+        _, decompress = COMPRESSORS[segment.path.rpartition(".")[2]]
+        with open(segment.path, "rb") as segment_file:
+            return decode_segment(decompress(segment_file.read()))
+
+
+def _contains(outer: Segment, inner: Segment) -> bool:
+    # Whether the inner segment is one of the inputs merged into the outer one.
+    return (
+        outer.sequence == inner.sequence
+        and outer.count > inner.count
+        and outer.start <= inner.start
+        and inner.end <= outer.end
+    )
+
+
+def from_config(config) -> TieredStorage:
+    """
+    Creates a tiered storage engine from the given storage configuration.
+    :param config: Storage configuration
+    :return: Tiered storage engine
+    """
+    settings = config.settings
+    return TieredStorage(
+        path=settings.get("path", DEFAULT_PATH),
+        hot_size=int(settings.get("hotSize", DEFAULT_HOT_SIZE)),
+        segment_size=int(settings.get("segmentSize", DEFAULT_SEGMENT_SIZE)),
+        retention_days=float(settings.get("retentionDays", DEFAULT_RETENTION_DAYS)),
+        compression=settings.get("compression", DEFAULT_COMPRESSION),
+        name=config.name,
+    )
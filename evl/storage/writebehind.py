@@ -0,0 +1,231 @@
+import asyncio
+import contextlib
+import logging
+import threading
+import time
+
+from evl.event import Event
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL = 1.0
+# Failed attempts at writing a batch before its events are dropped.
+DEFAULT_MAX_RETRIES = 3
+
+
+class WriteBehindStorage:
+    """
+    Wraps a storage engine so that storing an event only appends it to a
+    buffer. Buffered events are written to the wrapped engine in batches, from
+    a worker thread, once the batch size is reached or the flush interval has
+    passed, so engines that do I/O don't block the event loop.
+
+    Reads include events that haven't been written yet. all() returns a
+    copy of the wrapped engine's events taken after each batch, and range()
+    reads the wrapped engine from a worker thread, so reads never wait on the
+    event loop for a batch being written. A batch that fails to be written
+    stays at the front of the buffer and is retried on the next flush, up to
+    max_retries times before its events are dropped. close() waits for the
+    buffer to be written.
+    """
+
+    def __init__(
+        self,
+        storage,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+    ):
+        self.storage = storage
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+
+        # Events not yet written, including the batch being written, which is
+        # only removed once written.
+        self._buffer = []
+        # Events held in memory by the wrapped engine, as of the last batch.
+        self._stored = list(storage.all())
+        self._attempts = 0
+        self._closing = False
+        # Held while the wrapped engine is used, since writes happen on a
+        # worker thread while reads happen on the event loop.
+        self._lock = threading.Lock()
+        # Held by a flush, so that a batch is only written by one at a time.
+        self._flushing = asyncio.Lock()
+        self._wakeup = None
+        self._task = None
+
+        self.max_depth = 0
+        self.batches = 0
+        self.written = 0
+        self.errors = 0
+        self.dropped = 0
+        self.last_flush = 0.0
+        self.max_flush = 0.0
+        self._total_flush = 0.0
+
+    def __str__(self) -> str:
+        return str(self.storage)
+
+    @property
+    def persistent(self) -> bool:
+        """Whether the wrapped engine keeps its own events, e.g. on disk."""
+        return getattr(self.storage, "persistent", False)
+
+    def store(self, event: Event) -> None:
+        self._buffer.append(event)
+        self.max_depth = max(self.max_depth, len(self._buffer))
+
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def all(self) -> list:
+        return self._stored + self._buffer
+
+    def buffered(self) -> list:
+        """Returns the events not yet written to the wrapped storage engine."""
+        return list(self._buffer)
+
+    async def range(self, start: int = None, end: int = None) -> list:
+        """
+        Returns the events with timestamps between start and end, inclusive,
+        reading the wrapped engine from a worker thread.
+        :param start: Earliest timestamp, or None for no lower bound
+        :param end: Latest timestamp, or None for no upper bound
+        :return: List of events, oldest first
+        """
+        # Copied first, as events written meanwhile leave the buffer.
+        buffered = list(self._buffer)
+        events = await asyncio.to_thread(self._range, start, end)
+        written = {id(event) for event in events}
+
+        return events + [
+            event
+            for event in buffered
+            if (start is None or event.timestamp >= start)
+            and (end is None or event.timestamp <= end)
+            and id(event) not in written
+        ]
+
+    def _range(self, start: int, end: int) -> list:
+        with self._lock:
+            if hasattr(self.storage, "range"):
+                return self.storage.range(start, end)
+            return [
+                event
+                for event in self.storage.all()
+                if (start is None or event.timestamp >= start)
+                and (end is None or event.timestamp <= end)
+            ]
+
+    async def _run(self) -> None:
+        while not self._closing:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> bool:
+        """
+        Writes buffered events to the wrapped storage engine, stopping at the
+        first batch that fails to be written.
+        :return: True if the buffer was written, False if a batch failed
+        """
+        async with self._flushing:
+            return await self._flush()
+
+    async def _flush(self) -> bool:
+        while self._buffer:
+            batch = self._buffer[: self.batch_size]
+
+            start = time.perf_counter()
+            try:
+                stored = await asyncio.to_thread(self._write, batch)
+            except Exception as e:
+                self._failed(batch, e)
+                return False
+
+            # The batch leaves the buffer as the copy that includes it arrives.
+            del self._buffer[: len(batch)]
+            self._stored = stored
+            self._attempts = 0
+
+            elapsed = time.perf_counter() - start
+            self.batches += 1
+            self.written += len(batch)
+            self.last_flush = elapsed
+            self.max_flush = max(self.max_flush, elapsed)
+            self._total_flush += elapsed
+        return True
+
+    def _failed(self, batch: list, error: Exception) -> None:
+        # Leaves the batch at the front of the buffer to be retried, unless it
+        # has failed too often.
+        self.errors += 1
+        self._attempts += 1
+        if self._attempts <= self.max_retries:
+            logger.error(
+                "Error writing %d events to %s, will retry: %s",
+                len(batch),
+                self.storage,
+                error,
+            )
+            return
+
+        logger.error(
+            "Dropping %d events after %d failed writes to %s: %s",
+            len(batch),
+            self._attempts,
+            self.storage,
+            error,
+        )
+        del self._buffer[: len(batch)]
+        self.dropped += len(batch)
+        self._attempts = 0
+
+    def _write(self, batch: list) -> list:
+        with self._lock:
+            for event in batch:
+                self.storage.store(event)
+            return list(self.storage.all())
+
+    async def close(self) -> None:
+        """
+        Stops the background flush, writes any buffered events and closes the
+        wrapped storage engine, if it can be closed.
+        """
+        # Not cancelled, so that a batch being written isn't written again.
+        self._closing = True
+        if self._task is not None:
+            self._wakeup.set()
+            await self._task
+            self._task = None
+
+        # Each failure brings a batch closer to being dropped, so this ends.
+        while not await self.flush():
+            pass
+        if hasattr(self.storage, "close"):
+            await asyncio.to_thread(self._close)
+
+    def _close(self) -> None:
+        with self._lock:
+            self.storage.close()
+
+    def stats(self) -> dict:
+        """Returns the buffer depth and flush counters and latencies."""
+        return {
+            "depth": len(self._buffer),
+            "max_depth": self.max_depth,
+            "batches": self.batches,
+            "written": self.written,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "last_flush": self.last_flush,
+            "max_flush": self.max_flush,
+            "mean_flush": self._total_flush / self.batches if self.batches else 0.0,
+        }
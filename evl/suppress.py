@@ -0,0 +1,109 @@
+import time
+
+import evl.command as cmd
+
+DROP = "drop"
+COUNT = "count"
+MODES = (DROP, COUNT)
+
+# Commands reporting the same piece of state share a category, so that e.g. a
+# Zone Restored following a Zone Open counts as a change.
+CATEGORIES = {
+    cmd.CommandType.KEYPAD_LED_STATE: "keypad_led",
+    cmd.CommandType.KEYPAD_LED_FLASH_STATE: "keypad_led_flash",
+    cmd.CommandType.ZONE_ALARM: "zone_alarm",
+    cmd.CommandType.ZONE_ALARM_RESTORE: "zone_alarm",
+    cmd.CommandType.ZONE_TAMPER: "zone_tamper",
+    cmd.CommandType.ZONE_TAMPER_RESTORE: "zone_tamper",
+    cmd.CommandType.ZONE_FAULT: "zone_fault",
+    cmd.CommandType.ZONE_FAULT_RESTORE: "zone_fault",
+    cmd.CommandType.ZONE_OPEN: "zone_open",
+    cmd.CommandType.ZONE_RESTORED: "zone_open",
+    cmd.CommandType.PARTITION_READY: "partition_ready",
+    cmd.CommandType.PARTITION_NOT_READY: "partition_ready",
+    cmd.CommandType.PARTITION_READY_FORCE_ARMING_ENABLED: "partition_ready",
+    cmd.CommandType.TROUBLE_LED_ON: "trouble_led",
+    cmd.CommandType.TROUBLE_LED_OFF: "trouble_led",
+    cmd.CommandType.CHIME_ENABLED: "chime",
+    cmd.CommandType.CHIME_DISABLED: "chime",
+}
+
+# Debounce window, in seconds, of the commands that are suppressed by default.
+# None suppresses repeats for as long as the state doesn't change.
+DEFAULT_WINDOWS = {
+    cmd.CommandType.KEYPAD_LED_STATE: None,
+    cmd.CommandType.KEYPAD_LED_FLASH_STATE: None,
+    cmd.CommandType.ZONE_OPEN: None,
+    cmd.CommandType.ZONE_RESTORED: None,
+}
+
+
+class Suppressor:
+    """
+    Suppresses events that report a state that hasn't changed since the last
+    event of the same category for the same partition and zone.
+
+    Only commands with a debounce window are considered. A repeated state is
+    let through again once its window has elapsed since the last time that
+    state was passed on, so consumers still see periodic refreshes.
+    """
+
+    def __init__(self, windows: dict = None, mode: str = DROP):
+        if mode not in MODES:
+            raise ValueError("Invalid suppression mode '{mode}'!".format(mode=mode))
+
+        if windows is None:
+            windows = DEFAULT_WINDOWS
+        self.windows = dict(windows)
+        self.mode = mode
+
+        self._last = {}
+        self.passed = 0
+        self.suppressed = {}
+
+    def __str__(self):
+        return "Suppressor ({mode})".format(mode=self.mode)
+
+    def suppress(self, command: cmd.Command, parsed: dict, now: float = None) -> bool:
+        """
+        Records the state reported by the given command and returns whether the
+        resulting event should be dropped.
+        :param command: Command received from the EVL device
+        :param parsed: Parsed data of the given command
+        :param now: Monotonic time of the event, defaults to time.monotonic()
+        :return: True if the event should not be dispatched
+        """
+        command_type = command.command_type
+        category = CATEGORIES.get(command_type)
+        if category is None and command_type not in self.windows:
+            return False
+
+        if now is None:
+            now = time.monotonic()
+
+        # State is tracked for every command of a category, even those that
+        # aren't suppressed themselves, so that changes are always noticed.
+        key = (category or command_type, parsed.get("partition"), parsed.get("zone"))
+        state = (command_type, parsed.get("data"))
+
+        last = self._last.get(key)
+        if command_type in self.windows and last is not None and last[0] == state:
+            window = self.windows[command_type]
+            if window is None or now - last[1] < window:
+                self.suppressed[command.number] = (
+                    self.suppressed.get(command.number, 0) + 1
+                )
+                return self.mode == DROP
+
+        self._last[key] = (state, now)
+        self.passed += 1
+        return False
+
+    def stats(self) -> dict:
+        """Returns the number of passed and suppressed events by command."""
+        return {
+            "mode": self.mode,
+            "passed": self.passed,
+            "suppressed": dict(self.suppressed),
+            "tracked_states": len(self._last),
+        }
@@ -1,11 +1,32 @@
 import aiohttp
 import asyncio
 import logging
+import random
+import time
+
+import evl.httpclient as httpclient
+
+from evl.scheduler import Scheduler, Timer
 
 logger = logging.getLogger(__name__)
 
+# Default jitter, as a fraction of the heartbeat interval.
+DEFAULT_JITTER = 0.1
+
+HEADERS = {"Content-Type": "application/json", "Accept": "application/json"}
+
 
 class HeartbeatTask:
+    """
+    Pings a heartbeat server for a device every interval. Each ping is
+    delayed by a random jitter so that heartbeats with the same interval don't
+    all fire at once.
+
+    With piggybacking enabled, a ping is skipped when another request for
+    the device has been made to the same server since the last ping, less
+    than an interval ago, e.g. by a notifier sending events for the device.
+    """
+
     def __init__(
         self,
         name: str,
@@ -14,32 +35,154 @@ class HeartbeatTask:
         interval: int,
         url: str,
         auth_token: str,
+        client: httpclient.HttpClient = None,
+        jitter: float = None,
+        batch: bool = False,
+        piggyback: bool = False,
     ):
         self.name = name
         self.device_id = device_id
         self.uuid = uuid
         self.interval = int(interval)
+        self.base_url = url
         self.url = f"{url}/{device_id}"
         self.auth_token = auth_token
+        self.jitter = jitter if jitter is not None else self.interval * DEFAULT_JITTER
+        self.batch = batch
+        self.piggyback = piggyback
 
         self.body_content = {"auth_token": self.auth_token, "device": self.uuid}
+        # Shared HTTP client of the daemon, unless one is given.
+        self.client = client
+
+        self.sent = 0
+        self.piggybacked = 0
+        # Time of the last ping recorded for each device, by UUID.
+        self._last_pings = {}
 
     def __str__(self):
         return "Heartbeat Task"
 
-    async def start(self):
-        headers = {"Content-Type": "application/json", "Accept": "application/json"}
-        async with aiohttp.ClientSession(headers=headers) as session:
-            while True:
-                logger.debug("Pinging heartbeat server...")
-                try:
-                    await self._ping(session)
-                except aiohttp.ClientError as e:
-                    logger.debug(f"Error pinging heartbeat server: {e}")
+    def schedule(self, scheduler: Scheduler) -> Timer:
+        """
+        Pings the heartbeat server within one jitter of now, then every
+        interval.
+        :param scheduler: Scheduler to run the pings from
+        :return: Timer that stops the pings when cancelled
+        """
+        return scheduler.call_every(
+            self.interval,
+            self.ping,
+            jitter=self.jitter,
+            delay=random.uniform(0, self.jitter),
+        )
+
+    async def ping(self) -> None:
+        client = self.client or httpclient.shared()
+        if self._piggybacked(client):
+            logger.debug("Heartbeat piggybacked on recent request.")
+            self.piggybacked += 1
+            return
+
+        logger.debug("Pinging heartbeat server...")
+        try:
+            await self._ping(client)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.debug("Error pinging heartbeat server: %s", e)
+
+    def stats(self) -> dict:
+        return {"sent": self.sent, "piggybacked": self.piggybacked}
+
+    def devices(self) -> list:
+        """Returns the UUIDs of the devices pinged."""
+        return [self.uuid]
 
-                await asyncio.sleep(self.interval)
+    def _piggybacked(self, client: httpclient.HttpClient) -> bool:
+        if not self.piggyback:
+            return False
 
-    async def _ping(self, session: aiohttp.ClientSession):
-        async with session.put(self.url, json=self.body_content) as resp:
+        now = time.monotonic()
+        for device in self.devices():
+            last_request = client.last_request(self.url, device)
+            if last_request is None or last_request == self._last_pings.get(device):
+                return False
+            if now - last_request >= self.interval:
+                return False
+        return True
+
+    async def _ping(self, client: httpclient.HttpClient):
+        self.sent += 1
+        devices = self.devices()
+        request = client.request(
+            "PUT", self.url, devices=devices, json=self.body_content, headers=HEADERS
+        )
+        async with request as resp:
             resp.raise_for_status()
             logger.debug("Successfully pinged heartbeat server.")
+            self._last_pings = {
+                device: client.last_request(self.url, device) for device in devices
+            }
+
+
+class HeartbeatBatch(HeartbeatTask):
+    """
+    Pings a heartbeat server for several devices with a single request every
+    interval. The devices are PUT to the server's base URL as a list:
+
+    {"devices": [{"id": ..., "device": ..., "auth_token": ...}, ...]}
+    """
+
+    def __init__(self, heartbeats: list, client: httpclient.HttpClient = None):
+        first = heartbeats[0]
+        super().__init__(
+            name=",".join(heartbeat.name for heartbeat in heartbeats),
+            device_id=None,
+            uuid=None,
+            interval=first.interval,
+            url=first.base_url,
+            auth_token=None,
+            client=client or first.client,
+            jitter=max(heartbeat.jitter for heartbeat in heartbeats),
+            batch=True,
+            piggyback=all(heartbeat.piggyback for heartbeat in heartbeats),
+        )
+        self.heartbeats = heartbeats
+        self.url = first.base_url
+        self.body_content = {
+            "devices": [
+                {
+                    "id": heartbeat.device_id,
+                    "device": heartbeat.uuid,
+                    "auth_token": heartbeat.auth_token,
+                }
+                for heartbeat in heartbeats
+            ]
+        }
+
+    def __str__(self):
+        return "Heartbeat Batch"
+
+    def devices(self) -> list:
+        return [heartbeat.uuid for heartbeat in self.heartbeats]
+
+
+def batch(heartbeats: list) -> list:
+    """
+    Groups heartbeats that allow batching and share a server URL and interval
+    into batches, so that the number of requests grows with the number of
+    servers rather than devices.
+    :param heartbeats: Heartbeat tasks
+    :return: List of heartbeat tasks and batches, to be scheduled
+    """
+    groups = {}
+    scheduled = []
+    for heartbeat in heartbeats:
+        if heartbeat.batch:
+            key = (heartbeat.base_url, heartbeat.interval)
+            groups.setdefault(key, []).append(heartbeat)
+        else:
+            scheduled.append(heartbeat)
+
+    for group in groups.values():
+        scheduled.append(HeartbeatBatch(group) if len(group) > 1 else group[0])
+    return scheduled
@@ -1,21 +1,44 @@
+import itertools
 import logging
 
 import evl.event as ev
 import evl.command as cmd
+import evl.rules as rules
 
 logger = logging.getLogger(__name__)
 
+_ids = itertools.count(1)
+
 
 class SilentArmTask:
     """
     A task that sends a Software Zone Alarm command when a Zone Open
-    command occurs on a given zone.
+    command occurs on a given zone, until one of the given partitions is
+    armed.
+
+    The task is implemented as a group of rules in the event manager's rule
+    engine, so any number of silent arm tasks can be active at once. If a
+    timeout is given, the task stops after that many seconds even if no
+    partition is armed.
     """
 
-    def __init__(self, event_manager: ev.EventManager, partitions: list, zones: list):
+    def __init__(
+        self,
+        event_manager: ev.EventManager,
+        partitions: list,
+        zones: list,
+        name: str = None,
+        timeout: float = None,
+    ):
         self.event_manager = event_manager
         self.partitions = partitions
         self.zones = zones
+        self.timeout = timeout
+        self._expiry = None
+
+        if name is None:
+            name = "silent-arm-{id}".format(id=next(_ids))
+        self.name = name
 
         self.alarm_triggers = (cmd.CommandType.ZONE_OPEN,)
         self.shutdown_triggers = (
@@ -26,55 +49,53 @@ class SilentArmTask:
     def __str__(self):
         return "Silent Arm Task"
 
+    def rules(self) -> list:
+        """Returns the rules implementing this task."""
+        return [
+            rules.Rule(
+                "{name}:alarm".format(name=self.name),
+                [rules.Action(rules.ZONE_ALARM)],
+                commands=self.alarm_triggers,
+                zones=self.zones,
+                partitions=self.partitions,
+                group=self.name,
+            ),
+            rules.Rule(
+                "{name}:shutdown".format(name=self.name),
+                [rules.Action(rules.REMOVE)],
+                commands=self.shutdown_triggers,
+                partitions=self.partitions,
+                group=self.name,
+            ),
+        ]
+
+    @property
+    def active(self) -> bool:
+        """True until the task is stopped or shut down by arming."""
+        return any(rule.group == self.name for rule in self.event_manager.rules.rules())
+
     def start(self) -> None:
         """
-        Starts the silent alarm task by adding itself to the event manager's
-        list of notifiers.
+        Starts the silent alarm task by adding its rules to the event
+        manager's rule engine.
         """
         logger.debug("Starting silent-arm task")
-        self.event_manager.add_notifiers({"silent-arm": self})
+        for rule in self.rules():
+            self.event_manager.rules.add(rule)
+
+        if self.timeout:
+            self._expiry = self.event_manager.scheduler.call_later(
+                self.timeout, self.stop
+            )
 
     def stop(self) -> None:
         """
-        Stops the silent alarm task by removing itself from the event manager's
-        list of notifiers.
+        Stops the silent alarm task by removing its rules from the event
+        manager's rule engine.
         """
         logger.debug("Stopping silent arm task")
-        self.event_manager.remove_notifier("silent-arm")
-
-    async def notify(self, event: ev.Event) -> None:
-        """
-        Event notifier that triggers an alarm if the given event is in the
-        list of alarm triggers or shuts down the silent alarm task if the event
-        is in the list of shutdown triggers.
-        :param event: Event sent from EVL device
-        """
-        if event.command.command_type in self.alarm_triggers:
-            await self._alarm(event)
-        elif event.command.command_type in self.shutdown_triggers:
-            self._shutdown(event)
-
-    async def _alarm(self, event: ev.Event) -> None:
-        """
-        Sends a Software Zone Alarm event to the event manager queue if the
-        given event zone is in the list of alarm zones.
-        :param event: Event sent from EVL device
-        """
-        if event.zone not in self.zones:
-            return
-        if event.partition is not None and event.partition not in self.partitions:
-            return
-
-        logger.debug("Silent alarm task triggered")
-        command = cmd.Command(cmd.CommandType.SOFTWARE_ZONE_ALARM.value)
-        data = "{zone}".format(zone=event.zone)
-        await self.event_manager.enqueue(command, data)
-
-    def _shutdown(self, event: ev.Event) -> None:
-        """
-        Removes the silent arm notifier when a shutdown event is received.
-        """
-        if event.partition not in self.partitions:
-            return
+        self.event_manager.rules.remove_group(self.name)
 
-        self.stop()
+        if self._expiry is not None:
+            self._expiry.cancel()
+            self._expiry = None
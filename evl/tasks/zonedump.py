@@ -0,0 +1,34 @@
+import logging
+
+import evl.command as cmd
+
+from evl.scheduler import Scheduler, Timer
+
+logger = logging.getLogger(__name__)
+
+
+class ZoneDumpTask:
+    """
+    A task that periodically requests a zone timer dump from the EVL device so
+    that zone state can be reconciled from a single event.
+    """
+
+    def __init__(self, connection, interval: int):
+        self.connection = connection
+        self.interval = int(interval)
+
+    def __str__(self):
+        return "Zone Dump Task"
+
+    def schedule(self, scheduler: Scheduler) -> Timer:
+        """
+        Requests a dump every interval. The first dump is requested after one
+        interval, so that the connection has had time to log in.
+        :param scheduler: Scheduler to request the dumps from
+        :return: Timer that stops the dumps when cancelled
+        """
+        return scheduler.call_every(self.interval, self.dump)
+
+    async def dump(self) -> None:
+        logger.debug("Requesting zone timer dump...")
+        await self.connection.send(cmd.CommandType.DUMP_ZONE_TIMERS)
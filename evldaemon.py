@@ -1,29 +1,49 @@
 import argparse
 import asyncio
 import logging
-import logging.config
+import signal
 import socket
 
+from marshmallow import ValidationError
+
+import evl.capture as capture
 import evl.config as conf
 import evl.connection as conn
 import evl.event as ev
+import evl.httpclient as httpclient
+import evl.logs as logs
+import evl.queues as queues
+import evl.suppress as suppress
+
+from evl.storage.memory import MemoryStorage
+from evl.tasks.zonedump import ZoneDumpTask
 
 logger = logging.getLogger("evl")
 
 
 class EvlDaemon:
-    def __init__(self, host: str, password: str, port: int, config: conf.ConfigSchema):
+    def __init__(
+        self,
+        host: str,
+        password: str,
+        port: int,
+        config: conf.ConfigSchema,
+        capture_file: str = None,
+        config_file: str = None,
+    ):
 
         self.host = host
         self.password = password
         self.port = port
+        self.capture_file = capture_file
+        self.config_file = config_file
         self.connection = None
 
         if config is None:
             raise ValueError("Invalid config value!")
         self.config = config
 
-        self.event_queue = asyncio.Queue()
+        self.event_queue = queues.event_queue(self.config.queues["event"])
         self.status = ev.Status()
 
         # Assign zone and partition names as read from configuration file.
@@ -32,36 +52,276 @@ class EvlDaemon:
 
         # TODO: Read command name, priority, login name, etc. overrides from config.
 
-        self.event_manager = ev.EventManager(self.event_queue, status=self.status)
+        self.event_manager = ev.EventManager(
+            self.event_queue,
+            status=self.status,
+            suppressor=self._suppressor(self.config.suppression),
+        )
 
         self.event_manager.add_notifiers(self.config.notifiers)
         self.event_manager.add_storages(self.config.storage)
-        self.heartbeats = self.config.heartbeats
+        for rule in self.config.rules:
+            self.event_manager.rules.add(rule)
+        self.scheduler = self.event_manager.scheduler
+        self.http = httpclient.configure(self.config.http)
+        self.status.http = self.http
+        self.heartbeats = {hb.name: hb for hb in self.config.heartbeats}
+        self._heartbeat_timers = {}
+        self._zone_dump_timer = None
+        self._close_tasks = set()
+        self._reload_task = None
+        self._prewarm_task = None
+        self._listener_task = None
 
         self.listeners = conf.load_listeners(self.config.listeners, self.event_manager)
+        for listener in self.listeners:
+            listener.daemon = self
         self.status.listeners = self.listeners
 
     async def start(self):
         logger.debug("Starting daemon...")
         resolved = socket.gethostbyname(self.host)
+
+        capture_writer = None
+        if self.capture_file:
+            logger.debug(
+                "Capturing raw frames to {file}...".format(file=self.capture_file)
+            )
+            capture_writer = capture.CaptureWriter(self.capture_file)
+
         self.connection = conn.Connection(
-            event_manager=self.event_manager, host=resolved, password=self.password
+            event_manager=self.event_manager,
+            host=resolved,
+            password=self.password,
+            capture_writer=capture_writer,
+            queue_config=self.config.queues,
         )
+        self.status.queues = {"event": self.event_queue, **self.connection.queues()}
+        self.event_manager.rules.send = self.connection.send
+        self.event_manager.commander = self.connection.commander
+        self.status.commands = self.connection.commander
 
         self.status.connection = {"hostname": resolved, "port": self.connection.port}
 
+        if self.config.http.prewarm:
+            self._prewarm_task = asyncio.create_task(self.http.warm(self._urls()))
+        self._start_heartbeats()
+        self._start_zone_dump(self.config.zone_dump_interval)
+
         await asyncio.gather(
             self.connection.start(),
             self.event_manager.wait(),
             *[listener.listen() for listener in self.listeners],
-            *[heartbeat.start() for heartbeat in self.heartbeats]
         )
 
+    @staticmethod
+    def _suppressor(config) -> suppress.Suppressor:
+        if not config.enabled:
+            return None
+        return suppress.Suppressor(config.windows, config.mode)
+
+    def _urls(self) -> list:
+        """Returns the URLs of all heartbeats and notifiers making HTTP requests."""
+        users = [*self.heartbeats.values(), *self.config.notifiers.values()]
+        return [user.url for user in users if getattr(user, "url", None)]
+
+    def _start_heartbeats(self) -> None:
+        for name, heartbeat in self.heartbeats.items():
+            self._heartbeat_timers[name] = heartbeat.schedule(self.scheduler)
+        self.status.heartbeats = self.heartbeats
+
+    def _stop_heartbeats(self) -> None:
+        for timer in self._heartbeat_timers.values():
+            timer.cancel()
+        self._heartbeat_timers = {}
+
+    def _start_zone_dump(self, interval: int) -> None:
+        if self._zone_dump_timer is not None:
+            self._zone_dump_timer.cancel()
+            self._zone_dump_timer = None
+
+        if interval and self.connection is not None:
+            task = ZoneDumpTask(self.connection, interval)
+            self._zone_dump_timer = task.schedule(self.scheduler)
+
+    def _close_in_background(self, coroutine) -> None:
+        task = asyncio.create_task(coroutine)
+        self._close_tasks.add(task)
+        task.add_done_callback(self._close_tasks.discard)
+
+    def schedule_reload(self) -> None:
+        """Reloads the configuration in the background, e.g. on SIGHUP."""
+
+        async def reload():
+            try:
+                await self.reload()
+            except ValueError as e:
+                logger.error("Unable to reload configuration: {e}".format(e=e))
+
+        self._reload_task = asyncio.create_task(reload())
+
+    async def reload(self) -> dict:
+        """
+        Re-reads the configuration file and applies any changes to notifiers,
+        storage, heartbeats, listeners, logging and zone and partition names
+        without interrupting the connection to the EVL device or dropping
+        queued events.
+        :return: Dict describing the changes that were applied
+        """
+        if self.config_file is None:
+            raise ValueError("No configuration file to reload!")
+
+        logger.debug("Reloading configuration...")
+        try:
+            # Backends are only created below for entries that were added or
+            # changed, so that unchanged ones aren't opened a second time.
+            config = conf.read(self.config_file, backends=False)
+        except ValidationError as e:
+            raise ValueError("Invalid configuration: {e}".format(e=e.messages))
+
+        changes = conf.diff(self.config, config)
+        if changes.logging:
+            logs.configure(config.logging)
+        if changes.zones:
+            ev.EventManager.zones = config.zones
+        if changes.partitions:
+            ev.EventManager.partitions = config.partitions
+        if changes.suppression:
+            self.event_manager.set_suppressor(self._suppressor(config.suppression))
+        if changes.zone_dump_interval:
+            self._start_zone_dump(config.zone_dump_interval)
+
+        self._reload_notifiers(config, changes.sections["notifiers"])
+        await self._reload_storage(config, changes.sections["storage"])
+        self._reload_heartbeats(config, changes.sections["heartbeats"])
+        self._reload_rules(config, changes.sections["rules"])
+
+        listeners = changes.sections["listeners"]
+        if listeners:
+            # Listeners are restarted in the background so that a reload
+            # requested over HTTP can be answered by the listener it replaces.
+            self._listener_task = asyncio.create_task(
+                self._reload_listeners(config, listeners)
+            )
+
+        if changes.restart_required:
+            logger.warning(
+                "Restart required to apply changes to: {settings}".format(
+                    settings=", ".join(changes.restart_required)
+                )
+            )
+
+        self.config = config
+        logger.debug("Configuration reloaded.")
+        return changes.as_dict()
+
+    def _reload_notifiers(self, config, changes: conf.SectionDiff) -> None:
+        notifiers = conf.load_notifiers(changes.updated(config.sections["notifiers"]))
+        for name in changes.removed + changes.changed:
+            self.event_manager.remove_notifier(name)
+        self.event_manager.add_notifiers(notifiers)
+
+        config.notifiers = _unchanged(self.config.notifiers, changes)
+        config.notifiers.update(notifiers)
+
+    async def _reload_storage(self, config, changes: conf.SectionDiff) -> None:
+        for name in changes.removed:
+            storage = self.event_manager.remove_storage(name)
+            if storage is not None:
+                # Closed in the background so buffered events are written.
+                self._close_in_background(ev.close_storage(storage))
+
+        # Replaced engines are closed before their replacements are created,
+        # so that an engine keeping its events on disk finds all of them
+        # written. Events stored in the meantime are held in memory.
+        replaced, pending = {}, {}
+        for name in changes.changed:
+            storage = self.event_manager.remove_storage(name)
+            if storage is not None:
+                replaced[name] = storage
+                pending[name] = MemoryStorage(size=None, name=name)
+        self.event_manager.add_storages(pending)
+        for storage in replaced.values():
+            await ev.close_storage(storage)
+
+        storages = conf.load_storage(changes.updated(config.sections["storage"]))
+        for name, storage in storages.items():
+            events = pending[name].all() if name in pending else []
+            old = replaced.get(name)
+            if old is not None and not getattr(old, "persistent", False):
+                # Carry stored events over to the replacement storage engine.
+                events = old.all() + events
+            for event in events:
+                storage.store(event)
+
+        for name in pending:
+            self.event_manager.remove_storage(name)
+        self.event_manager.add_storages(storages)
+
+        config.storage = _unchanged(self.config.storage, changes)
+        config.storage.update(storages)
+
+    def _reload_rules(self, config, changes: conf.SectionDiff) -> None:
+        for name in changes.removed:
+            self.event_manager.rules.remove(name)
+
+        for rule in config.rules:
+            if rule.name in changes.added + changes.changed:
+                self.event_manager.rules.add(rule)
+
+    def _reload_heartbeats(self, config, changes: conf.SectionDiff) -> None:
+        if not changes:
+            config.heartbeats = self.config.heartbeats
+            return
+
+        # A batch can combine several configured heartbeats, so they are all
+        # restarted.
+        config.heartbeats = conf.load_heartbeats(config.sections["heartbeats"])
+        self._stop_heartbeats()
+        self.heartbeats = {hb.name: hb for hb in config.heartbeats}
+        self._start_heartbeats()
+
+    async def _reload_listeners(self, config, changes: conf.SectionDiff) -> None:
+        for listener in list(self.listeners):
+            if str(listener) in changes.removed + changes.changed:
+                await listener.stop()
+                self.listeners.remove(listener)
+
+        configs = [
+            listener
+            for listener in config.listeners
+            if listener.name in changes.added + changes.changed
+        ]
+        for listener in conf.load_listeners(configs, self.event_manager):
+            listener.daemon = self
+            self.listeners.append(listener)
+            await listener.listen()
+
     def stop(self):
         logger.debug("Stopping daemon...")
         self.connection.stop()
         logger.debug("Daemon stopped.")
 
+    async def close(self) -> None:
+        """
+        Stops all timers, writes any buffered events, closes pooled HTTP
+        connections and writes out queued log records.
+        """
+        await self.event_manager.close()
+        # Storage engines removed by a reload may still be writing events.
+        await asyncio.gather(*self._close_tasks)
+        await self.http.close()
+        logs.stop()
+
+
+def _unchanged(backends: dict, changes: conf.SectionDiff) -> dict:
+    """Returns the running backends that a reload leaves in place."""
+    return {
+        name: backend
+        for name, backend in backends.items()
+        if name not in changes.removed + changes.changed
+    }
+
 
 def main():
     print("Welcome to EvlDaemon.")
@@ -69,6 +329,9 @@ def main():
     parser.add_argument(
         "-c", "--config", required=False, default="~/.config/evl_daemon/config.json"
     )
+    parser.add_argument(
+        "--capture", required=False, help="Write raw TPI frames to this file"
+    )
     options = parser.parse_args()
     config = conf.read(options.config)
 
@@ -76,19 +339,25 @@ def main():
         print("Unable to read configuration file. Exiting.")
         exit(1)
 
-    logging.config.dictConfig(config.logging)
+    logs.configure(config.logging)
 
     host = str(config.ip)
-    ed = EvlDaemon(host, config.password, config.port, config)
+    ed = EvlDaemon(
+        host, config.password, config.port, config, options.capture, options.config
+    )
 
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
 
+    if hasattr(signal, "SIGHUP"):
+        loop.add_signal_handler(signal.SIGHUP, ed.schedule_reload)
+
     try:
         loop.run_until_complete(ed.start())
     except KeyboardInterrupt:
         logger.debug("Ctrl+C pressed, stopping...")
         ed.stop()
+        loop.run_until_complete(ed.close())
 
 
 if __name__ == "__main__":
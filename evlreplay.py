@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import time
+
+import evl.capture as capture
+import evl.config as conf
+import evl.event as ev
+import evl.logs as logs
+import evl.replay as replay
+
+logger = logging.getLogger("evl")
+
+
+async def run(frames: list, options: argparse.Namespace, config) -> dict:
+    event_manager = ev.EventManager(asyncio.Queue())
+    if config is not None:
+        ev.EventManager.zones = config.zones
+        ev.EventManager.partitions = config.partitions
+        event_manager.add_notifiers(config.notifiers)
+        event_manager.add_storages(config.storage)
+
+    waiter = asyncio.create_task(event_manager.wait())
+
+    start = time.perf_counter()
+    await replay.replay(frames, event_manager, options.speed, options.mode)
+    elapsed = time.perf_counter() - start
+
+    waiter.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await waiter
+
+    return {
+        "frames": len(frames),
+        "elapsed": elapsed,
+        "frames_per_second": len(frames) / elapsed if elapsed else None,
+        "status": event_manager.status_report(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a raw TPI capture file.")
+    parser.add_argument("capture", help="Capture file written by evldaemon --capture")
+    parser.add_argument(
+        "-s",
+        "--speed",
+        type=float,
+        default=1.0,
+        help="Replay speed multiplier, 0 for maximum speed (default: 1)",
+    )
+    parser.add_argument("-m", "--mode", choices=replay.MODES, default=replay.SOCKET)
+    parser.add_argument(
+        "-c", "--config", help="Use zones, notifiers and storage from this config"
+    )
+    options = parser.parse_args()
+
+    config = None
+    if options.config:
+        config = conf.read(options.config)
+        logs.configure(config.logging)
+
+    started_at, frames = capture.read(options.capture)
+    logger.debug(
+        "Read {count} frames captured at {started_at}.".format(
+            count=len(frames), started_at=time.ctime(started_at)
+        )
+    )
+
+    result = asyncio.run(run(frames, options, config))
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+import evl.bus as bus
+import evl.command as cmd
+import evl.data as dt
+import evl.event as ev
+
+from evl.listeners.unixsocket import UnixSocketListener
+
+
+def make_event(command: str, data: str) -> ev.Event:
+    command = cmd.Command(command)
+    return ev.Event(command, dt.parse(command, data), 1700000000)
+
+
+ZONE_OPEN = ("609", "001")
+PARTITION_READY = ("650", "1")
+ZONE_ALARM = ("601", "2003")
+LED_STATE = ("510", "81")
+
+
+def decode(frame: bytes) -> dict:
+    return json.loads(frame[4:])
+
+
+class FilterTest(unittest.TestCase):
+    def test_all_events_match_without_topics(self):
+        event_filter = bus.Filter()
+        for event in (ZONE_OPEN, PARTITION_READY, LED_STATE):
+            self.assertTrue(event_filter.matches(make_event(*event)))
+
+    def test_topics_select_partitions_zones_and_panel(self):
+        event_filter = bus.Filter.from_dict({"zones": ["001"], "partitions": [2]})
+
+        self.assertTrue(event_filter.matches(make_event(*ZONE_OPEN)))
+        self.assertTrue(event_filter.matches(make_event(*ZONE_ALARM)))
+        self.assertFalse(event_filter.matches(make_event(*PARTITION_READY)))
+        self.assertFalse(event_filter.matches(make_event(*LED_STATE)))
+
+        panel = bus.Filter.from_dict({"panel": True})
+        self.assertTrue(panel.matches(make_event(*LED_STATE)))
+        self.assertFalse(panel.matches(make_event(*ZONE_OPEN)))
+
+    def test_priority_is_minimum(self):
+        event_filter = bus.Filter.from_dict({"priority": "high"})
+
+        self.assertTrue(event_filter.matches(make_event(*ZONE_ALARM)))
+        self.assertFalse(event_filter.matches(make_event(*ZONE_OPEN)))
+
+    def test_invalid_topics_are_rejected(self):
+        for topics in ([], {"priority": "urgent"}, {"zones": "001"}):
+            with self.assertRaises(bus.BusError):
+                bus.Filter.from_dict(topics)
+
+
+class EventBusTest(unittest.TestCase):
+    def test_events_are_encoded_once(self):
+        event_bus = bus.EventBus()
+        first = event_bus.subscribe()
+        second = event_bus.subscribe()
+
+        event_bus.publish(make_event(*ZONE_OPEN))
+
+        (frame,) = asyncio.run(first.get())
+        self.assertIs(frame, asyncio.run(second.get())[0])
+        message = decode(frame)
+        self.assertEqual(bus.EVENT, message["type"])
+        self.assertEqual("001", message["event"]["zone"])
+
+    def test_full_buffer_drops_oldest_and_reports_lag(self):
+        event_bus = bus.EventBus()
+        subscription = event_bus.subscribe(maxsize=2)
+
+        for zone in ("001", "002", "003"):
+            event_bus.publish(make_event("609", zone))
+
+        frames = asyncio.run(subscription.get())
+        self.assertEqual({"type": bus.LAG, "dropped": 1}, decode(frames[0]))
+        self.assertEqual(
+            ["002", "003"], [decode(frame)["event"]["zone"] for frame in frames[1:]]
+        )
+        self.assertEqual(1, subscription.stats()["dropped"])
+        self.assertEqual(2, subscription.stats()["max_depth"])
+
+    def test_closed_subscription_is_removed(self):
+        event_bus = bus.EventBus()
+        subscription = event_bus.subscribe()
+        subscription.close()
+
+        event_bus.publish(make_event(*ZONE_OPEN))
+
+        self.assertEqual([], asyncio.run(subscription.get()))
+        self.assertEqual([], event_bus.subscriptions)
+
+
+class UnixSocketListenerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "evl.sock")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_subscriber_receives_matching_events(self):
+        async def run():
+            manager = ev.EventManager(asyncio.Queue())
+            listener = UnixSocketListener("bus", self.path, manager)
+            await listener.listen()
+
+            reader, writer = await asyncio.open_unix_connection(self.path)
+            writer.write(bus.encode({"zones": ["001"]}))
+            await writer.drain()
+            while not manager.bus.subscriptions:
+                await asyncio.sleep(0)
+
+            await manager.dispatch(cmd.Command(PARTITION_READY[0]), PARTITION_READY[1])
+            await manager.dispatch(cmd.Command(ZONE_OPEN[0]), ZONE_OPEN[1])
+            message = await asyncio.wait_for(bus.read_frame(reader), 5)
+
+            writer.close()
+            await listener.stop()
+            return message, manager.bus.subscriptions
+
+        message, subscriptions = asyncio.run(run())
+
+        self.assertEqual("609", message["event"]["command"])
+        self.assertEqual(2, message["sequence"])
+        self.assertEqual([], subscriptions)
+        self.assertFalse(os.path.exists(self.path))
@@ -0,0 +1,79 @@
+import asyncio
+import contextlib
+import os
+import tempfile
+import unittest
+
+import evl.capture as capture
+import evl.event as ev
+import evl.replay as replay
+import evl.tpi as tpi
+
+
+def make_frame(command: str, data: str = "") -> str:
+    return command + data + tpi.calculate_checksum(command + data)
+
+
+class CaptureTest(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp()
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def write_capture(self, frames: list) -> None:
+        writer = capture.CaptureWriter(self.path)
+        for offset, frame in enumerate(frames):
+            writer.write(frame, writer._start_ns + offset * 1000)
+        writer.close()
+
+    def test_capture_round_trip(self):
+        frames = [make_frame("609", "001"), make_frame("610", "001")]
+        self.write_capture(frames)
+
+        _, read = capture.read(self.path)
+
+        self.assertEqual(frames, [frame.frame for frame in read])
+        self.assertEqual([0, 1000], [frame.offset_ns for frame in read])
+
+    def test_truncated_record_is_ignored(self):
+        self.write_capture([make_frame("609", "001"), make_frame("610", "001")])
+        with open(self.path, "r+b") as f:
+            f.truncate(os.path.getsize(self.path) - 2)
+
+        _, read = capture.read(self.path)
+
+        self.assertEqual(1, len(read))
+
+    def test_invalid_capture_raises(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not a capture file")
+
+        with self.assertRaises(capture.CaptureError):
+            capture.read(self.path)
+
+    def replay(self, mode: str) -> ev.EventManager:
+        self.write_capture([make_frame("609", "003"), make_frame("609", "004")])
+        _, frames = capture.read(self.path)
+
+        async def run():
+            event_manager = ev.EventManager(asyncio.Queue())
+            waiter = asyncio.create_task(event_manager.wait())
+            await replay.replay(frames, event_manager, speed=0, mode=mode)
+            waiter.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await waiter
+            return event_manager
+
+        return asyncio.run(run())
+
+    def test_replay_through_socket(self):
+        event_manager = self.replay(replay.SOCKET)
+        self.assertEqual("004", event_manager.status.last_event.zone)
+        self.assertEqual({"003", "004"}, set(event_manager.status.zones))
+
+    def test_replay_through_parser(self):
+        event_manager = self.replay(replay.PARSER)
+        self.assertEqual("004", event_manager.status.last_event.zone)
+        self.assertEqual({"003", "004"}, set(event_manager.status.zones))
@@ -1,6 +1,11 @@
+import tempfile
 import unittest
 
-from evl.config import ConfigSchema
+from evl.command import CommandType
+from evl.config import ConfigSchema, diff
+from evl.httpclient import DEFAULT_LIMIT_PER_HOST
+from evl.queues import DEFAULTS
+from evl.storage.tiered import TieredStorage
 
 
 class ConfigTest(unittest.TestCase):
@@ -36,3 +41,205 @@ class ConfigTest(unittest.TestCase):
         zones = {"1", "2"}
         errors = ConfigSchema().validate(self.make_config(zones=zones))
         self.assertIn("zones", errors)
+
+    def test_http_defaults(self):
+        config = ConfigSchema().load({**self.make_config(), "http": {"timeout": 5}})
+        self.assertEqual(5, config.http.timeout)
+        self.assertEqual(DEFAULT_LIMIT_PER_HOST, config.http.limit_per_host)
+        self.assertTrue(config.http.prewarm)
+
+
+class ConfigDiffTest(unittest.TestCase):
+    def make_config(self, **overrides):
+        config = {
+            "ip": "127.0.0.1",
+            "partitions": {"1": "Main"},
+            "zones": {"001": "Front Door"},
+            "notifiers": [
+                {"name": "console", "type": "console", "priority": "Low"},
+                {"name": "other", "type": "console", "priority": "High"},
+            ],
+            "storage": [
+                {"name": "memory", "type": "memory", "settings": {"maxSize": "10"}}
+            ],
+        }
+        config.update(overrides)
+        return ConfigSchema().load(config)
+
+    def test_identical_configs_have_no_changes(self):
+        self.assertFalse(diff(self.make_config(), self.make_config()))
+
+    def test_notifier_changes_are_detected(self):
+        new = self.make_config(
+            notifiers=[
+                {"name": "console", "type": "console", "priority": "Medium"},
+                {"name": "added", "type": "console", "priority": "Low"},
+            ]
+        )
+        changes = diff(self.make_config(), new).sections["notifiers"]
+
+        self.assertEqual(["added"], changes.added)
+        self.assertEqual(["other"], changes.removed)
+        self.assertEqual(["console"], changes.changed)
+
+    def test_zone_changes_are_detected(self):
+        changes = diff(self.make_config(), self.make_config(zones={"001": "Door"}))
+
+        self.assertTrue(changes.zones)
+        self.assertFalse(changes.partitions)
+        self.assertFalse(changes.sections["storage"])
+
+    def test_zone_dump_interval_changes_are_detected(self):
+        changes = diff(self.make_config(), self.make_config(zone_dump_interval=60))
+
+        self.assertTrue(changes.zone_dump_interval)
+        self.assertFalse(changes.restart_required)
+
+    def test_connection_changes_require_restart(self):
+        changes = diff(self.make_config(), self.make_config(ip="127.0.0.2"))
+        self.assertEqual(["ip"], changes.restart_required)
+
+
+class QueueConfigTest(unittest.TestCase):
+    def make_config(self, queues):
+        return {"ip": "127.0.0.1", "partitions": {}, "zones": {}, "queues": queues}
+
+    def test_queue_defaults_are_used(self):
+        config = ConfigSchema().load(self.make_config({"event": {"maxsize": 5}}))
+
+        self.assertEqual(5, config.queues["event"].maxsize)
+        self.assertEqual(DEFAULTS["event"][1], config.queues["event"].policy)
+        self.assertEqual(DEFAULTS["recv"][0], config.queues["recv"].maxsize)
+
+    def test_queue_policy_is_valid(self):
+        errors = ConfigSchema().validate(self.make_config({"event": {"policy": "x"}}))
+        self.assertIn("queues", errors)
+
+    def test_queue_name_is_valid(self):
+        errors = ConfigSchema().validate(self.make_config({"other": {}}))
+        self.assertIn("queues", errors)
+
+
+class StorageConfigTest(unittest.TestCase):
+    def make_config(self, settings):
+        storage = {"name": "memory", "type": "memory", "settings": settings}
+        return {"ip": "127.0.0.1", "partitions": {}, "zones": {}, "storage": [storage]}
+
+    def test_storage_is_not_buffered_by_default(self):
+        config = ConfigSchema().load(self.make_config({"maxSize": "10"}))
+
+        self.assertFalse(hasattr(config.storage["memory"], "stats"))
+
+    def test_write_behind_wraps_storage(self):
+        settings = {
+            "maxSize": "10",
+            "writeBehind": "true",
+            "batchSize": "50",
+            "flushInterval": "2",
+        }
+        storage = ConfigSchema().load(self.make_config(settings)).storage["memory"]
+
+        self.assertEqual(50, storage.batch_size)
+        self.assertEqual(2.0, storage.flush_interval)
+        self.assertEqual(10, storage.storage.size)
+
+    def test_tiered_storage_is_buffered_by_default(self):
+        with tempfile.TemporaryDirectory() as path:
+            storage = {"name": "history", "type": "tiered", "settings": {"path": path}}
+            config = self.make_config({})
+            config["storage"] = [storage]
+
+            buffered = ConfigSchema().load(config).storage["history"]
+            storage["settings"]["writeBehind"] = "false"
+            unbuffered = ConfigSchema().load(config).storage["history"]
+
+        self.assertIsInstance(buffered.storage, TieredStorage)
+        self.assertFalse(hasattr(unbuffered, "stats"))
+
+
+class SuppressionConfigTest(unittest.TestCase):
+    def make_config(self, suppression=None):
+        config = {"ip": "127.0.0.1", "partitions": {}, "zones": {}}
+        if suppression is not None:
+            config["suppression"] = suppression
+        return config
+
+    def test_suppression_is_off_by_default(self):
+        for suppression in (None, {"mode": "count"}):
+            config = ConfigSchema().load(self.make_config(suppression))
+            self.assertFalse(config.suppression.enabled)
+
+    def test_suppression_is_enabled(self):
+        config = ConfigSchema().load(
+            self.make_config({"enabled": True, "windows": {"610": 300}})
+        )
+
+        self.assertTrue(config.suppression.enabled)
+        self.assertEqual({CommandType.ZONE_RESTORED: 300.0}, config.suppression.windows)
+
+
+class RuleConfigTest(unittest.TestCase):
+    def make_config(self, rule):
+        return {"ip": "127.0.0.1", "partitions": {}, "zones": {}, "rules": [rule]}
+
+    def test_rules_are_loaded(self):
+        rule = {
+            "name": "door",
+            "commands": ["609"],
+            "zones": ["001"],
+            "actions": [{"type": "send", "command": "001"}],
+        }
+        config = ConfigSchema().load(self.make_config(rule))
+
+        self.assertEqual("door", config.rules[0].name)
+        self.assertEqual(
+            {"type": "send", "command": "001"}, config.rules[0].actions[0].as_dict()
+        )
+
+    def test_rule_actions_are_valid(self):
+        for action in ({"type": "explode"}, {"type": "send", "command": "xyz"}):
+            rule = {"name": "door", "actions": [action]}
+            errors = ConfigSchema().validate(self.make_config(rule))
+            self.assertIn("rules", errors)
+
+
+class LoggingConfigTest(unittest.TestCase):
+    def make_config(self, *loggers):
+        return {"ip": "127.0.0.1", "partitions": {}, "zones": {}, "logging": loggers}
+
+    def test_rotating_handler_is_loaded(self):
+        logger = {
+            "name": "file",
+            "type": "rotating",
+            "level": "INFO",
+            "path": "/tmp/evl.log",
+            "max_bytes": 1024,
+        }
+        config = ConfigSchema().load(self.make_config(logger))
+        handler = config.logging["handlers"]["file"]
+
+        self.assertEqual("logging.handlers.RotatingFileHandler", handler["class"])
+        self.assertEqual(1024, handler["maxBytes"])
+        self.assertEqual("file", handler["formatter"])
+
+    def test_logger_level_is_most_verbose_handler(self):
+        config = ConfigSchema().load(
+            self.make_config(
+                {"name": "console", "type": "console", "level": "WARNING"},
+                {"name": "syslog", "type": "syslog", "level": "INFO"},
+            )
+        )
+
+        self.assertEqual("INFO", config.logging["loggers"]["evl"]["level"])
+
+    def test_file_logging_requires_path(self):
+        errors = ConfigSchema().validate(
+            self.make_config({"name": "file", "type": "file"})
+        )
+        self.assertIn("logging", errors)
+
+    def test_logging_type_is_valid(self):
+        errors = ConfigSchema().validate(
+            self.make_config({"name": "other", "type": "carrier-pigeon"})
+        )
+        self.assertIn("logging", errors)
@@ -0,0 +1,254 @@
+import asyncio
+import contextlib
+import unittest
+
+from unittest import mock
+
+import evl.command as cmd
+import evl.connection as conn
+import evl.control as control
+import evl.event as ev
+import evl.tpi as tpi
+
+
+def frame(command: str, data: str = "") -> bytes:
+    checksum = tpi.calculate_checksum(command + data)
+    return "{command}{data}{checksum}\r\n".format(
+        command=command, data=data, checksum=checksum
+    ).encode()
+
+
+class FakeEvl:
+    """Stream writer answering each packet with the frames given by respond."""
+
+    def __init__(self, reader: asyncio.StreamReader, respond):
+        self.reader = reader
+        self.respond = respond
+        self.packets = []
+
+    def write(self, data: bytes) -> None:
+        packet = data.decode().strip()
+        self.packets.append(packet)
+        for response in self.respond(packet[:3], packet[3:-2]):
+            self.reader.feed_data(response)
+
+    async def drain(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class DrainingEvl(FakeEvl):
+    """Stream writer answering each packet while its write is being drained."""
+
+    def write(self, data: bytes) -> None:
+        self.packets.append(data.decode().strip())
+
+    async def drain(self) -> None:
+        packet = self.packets[-1]
+        for response in self.respond(packet[:3], packet[3:-2]):
+            self.reader.feed_data(response)
+        await asyncio.sleep(0.01)
+
+
+class LateEvl(FakeEvl):
+    """
+    Stream writer answering the packets it is sent, in order, with the given
+    (delay in seconds, frame) responses.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, responses: list):
+        super().__init__(reader, None)
+        self.responses = list(responses)
+
+    def write(self, data: bytes) -> None:
+        self.packets.append(data.decode().strip())
+        delay, response = self.responses.pop(0)
+        asyncio.get_running_loop().call_later(delay, self.reader.feed_data, response)
+
+
+def arm_responses(command: str, data: str) -> list:
+    responses = [frame("500", command)]
+    if command in ("030", "031"):
+        responses.append(frame("652", data[:1] + "0"))
+    elif command == "040":
+        responses.append(frame("670", data[:1]))
+    return responses
+
+
+class CommanderTest(unittest.TestCase):
+    def execute(
+        self,
+        respond,
+        *commands,
+        timeout: float = 1.0,
+        writer=FakeEvl,
+        interval: float = 0,
+    ) -> list:
+        async def execute(index: int, command: tuple):
+            # Commands are started the given interval apart.
+            await asyncio.sleep(index * interval)
+            return await self.commander.execute(*command, timeout=timeout)
+
+        async def run():
+            reader = asyncio.StreamReader()
+            connection = conn.Connection(ev.EventManager(asyncio.Queue()), "evl")
+            task = asyncio.create_task(
+                connection.start(reader=reader, writer=writer(reader, respond))
+            )
+            self.commander = connection.commander
+            results = await asyncio.gather(
+                *[execute(index, command) for index, command in enumerate(commands)]
+            )
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+            return results
+
+        return asyncio.run(run())
+
+    def test_arming_awaits_armed_event(self):
+        (result,) = self.execute(
+            arm_responses, (cmd.CommandType.PARTITION_ARM_AWAY, "1")
+        )
+
+        self.assertEqual(control.OK, result.outcome)
+        self.assertEqual("652", result.response)
+        self.assertLessEqual(result.ack_latency, result.latency)
+        self.assertEqual({control.OK: 1}, self.commander.stats()["outcomes"])
+
+    def test_failure_event_fails_command(self):
+        (result,) = self.execute(
+            arm_responses, (cmd.CommandType.PARTITION_DISARM_WITH_CODE, "11234")
+        )
+
+        self.assertEqual(control.FAILED, result.outcome)
+        self.assertEqual("670", result.response)
+
+    def test_system_error_is_reported(self):
+        (result,) = self.execute(
+            lambda command, data: [frame("502", "020")], (cmd.CommandType.POLL, "")
+        )
+
+        self.assertEqual(control.ERROR, result.outcome)
+        self.assertEqual("020", result.error)
+
+    def test_error_received_while_draining_is_reported(self):
+        (result,) = self.execute(
+            lambda command, data: [frame("502", "020")],
+            (cmd.CommandType.POLL, ""),
+            writer=DrainingEvl,
+        )
+
+        self.assertEqual(control.ERROR, result.outcome)
+        self.assertEqual("020", result.error)
+
+    @mock.patch.object(conn, "ACK_TIMEOUT", 0.2)
+    def test_late_acknowledgement_is_discarded(self):
+        # The poll is acknowledged after it timed out, while the status
+        # report is waiting for its own acknowledgement.
+        results = self.execute(
+            [(0.3, frame("500", "000")), (0.15, frame("500", "001"))],
+            (cmd.CommandType.POLL, ""),
+            (cmd.CommandType.STATUS_REPORT, ""),
+            writer=LateEvl,
+        )
+
+        self.assertEqual(
+            [control.TIMEOUT, control.OK], [result.outcome for result in results]
+        )
+
+    @mock.patch.object(conn, "ACK_TIMEOUT", 0.1)
+    def test_acknowledgement_queued_before_sending_is_discarded(self):
+        # The first poll is acknowledged after it timed out, before the
+        # second poll, which fails, is sent.
+        results = self.execute(
+            [(0.15, frame("500", "000")), (0, frame("502", "020"))],
+            (cmd.CommandType.POLL, ""),
+            (cmd.CommandType.POLL, ""),
+            writer=LateEvl,
+            interval=0.2,
+        )
+
+        self.assertEqual(
+            [control.TIMEOUT, control.ERROR], [result.outcome for result in results]
+        )
+
+    def test_missing_response_times_out(self):
+        (result,) = self.execute(
+            lambda command, data: [frame("500", command)],
+            (cmd.CommandType.PARTITION_ARM_STAY, "1"),
+            timeout=0.1,
+        )
+
+        self.assertEqual(control.TIMEOUT, result.outcome)
+        self.assertEqual(0, self.commander.stats()["pending"])
+
+    def test_concurrent_commands_get_their_own_response(self):
+        results = self.execute(
+            arm_responses,
+            (cmd.CommandType.PARTITION_ARM_AWAY, "1"),
+            (cmd.CommandType.PARTITION_ARM_STAY, "2"),
+            (cmd.CommandType.PARTITION_ARM_AWAY, "1"),
+            (cmd.CommandType.POLL, ""),
+        )
+
+        self.assertEqual([control.OK] * 4, [result.outcome for result in results])
+        self.assertEqual(
+            ["1", "2", "1", None], [result.partition for result in results]
+        )
+        self.assertIsNone(results[3].response)
+
+    def test_command_data_is_validated(self):
+        self.assertEqual(
+            (cmd.CommandType.PARTITION_DISARM_WITH_CODE, "21234"),
+            control.command_data("disarm", 2, "1234"),
+        )
+        for args in (("explode",), ("arm_away", "9"), ("arm", "1", "12")):
+            with self.assertRaises(ValueError):
+                control.command_data(*args)
+
+
+class StubCommander:
+    async def execute(self, command, data, timeout):
+        self.sent = (command, data, timeout)
+        result = control.CommandResult(command, data[:1])
+        result.outcome = control.OK
+        return result
+
+
+class CommandEndpointTest(unittest.TestCase):
+    def post(self, commander, body: dict) -> tuple:
+        # Imported here so that the remaining tests can run without aiohttp.
+        from aiohttp.test_utils import RawTestServer, TestClient
+
+        from evl.listeners.asynchttp import AsyncHttpListener
+
+        async def run():
+            manager = ev.EventManager(asyncio.Queue())
+            manager.commander = commander
+            listener = AsyncHttpListener("http", 0, "token", manager)
+            async with TestClient(RawTestServer(listener.handler)) as client:
+                resp = await client.post(
+                    "/commands", params={"auth_token": "token"}, json=body
+                )
+                return resp.status, await resp.text()
+
+        return asyncio.run(run())
+
+    def test_command_is_executed(self):
+        commander = StubCommander()
+        status, text = self.post(
+            commander, {"command": "arm", "partition": "1", "code": "1234"}
+        )
+
+        self.assertEqual(200, status)
+        self.assertIn('"outcome": "ok"', text)
+        self.assertEqual(
+            (cmd.CommandType.PARTITION_ARM_WITH_CODE, "11234", 10.0), commander.sent
+        )
+
+    def test_invalid_command_is_rejected(self):
+        self.assertEqual(400, self.post(StubCommander(), {"command": "explode"})[0])
+        self.assertEqual(503, self.post(None, {"command": "poll"})[0])
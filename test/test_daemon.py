@@ -0,0 +1,190 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+import evl.command as cmd
+import evl.config as conf
+import evl.plugins as plugins
+
+from evl.storage.memory import MemoryStorage
+from evl.storage.tiered import Segment, TieredStorage
+from evldaemon import EvlDaemon
+
+
+class CountingStorage(MemoryStorage):
+    created = []
+
+    def __init__(self, config):
+        super().__init__(int(config.settings.get("maxSize", 10)), config.name)
+        CountingStorage.created.append(config.name)
+
+
+class FakeListener:
+    def __init__(self, config, event_manager):
+        self.name = config.name
+        self.listening = False
+        self.daemon = None
+
+    def __str__(self) -> str:
+        return self.name
+
+    async def listen(self) -> None:
+        self.listening = True
+
+    async def stop(self) -> None:
+        self.listening = False
+
+
+plugins.register(plugins.STORAGE, "counting", CountingStorage)
+plugins.register(plugins.LISTENERS, "fake", FakeListener)
+
+
+class ReloadTest(unittest.TestCase):
+    def setUp(self):
+        CountingStorage.created = []
+        self.events = 1
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.path = os.path.join(directory.name, "config.json")
+
+    def write_config(self, **overrides) -> None:
+        config = {
+            "ip": "127.0.0.1",
+            "partitions": {"1": "Main"},
+            "zones": {"001": "Front Door"},
+            "heartbeats": [
+                {
+                    "name": "hb",
+                    "auth_token": "token",
+                    "device_id": 1,
+                    "device_uuid": "uuid",
+                    "url": "http://localhost/heartbeat",
+                }
+            ],
+            "listeners": [
+                {"name": "one", "type": "fake", "settings": {}},
+                {"name": "two", "type": "fake", "settings": {}},
+            ],
+            "storage": [
+                {"name": "kept", "type": "counting", "settings": {"maxSize": "10"}},
+                {"name": "changed", "type": "counting", "settings": {"maxSize": "10"}},
+            ],
+        }
+        config.update(overrides)
+        with open(self.path, "w") as config_file:
+            json.dump(config, config_file)
+
+    def reload(self, before: dict = None, **overrides) -> tuple:
+        self.write_config(**(before or {}))
+
+        async def run():
+            daemon = EvlDaemon(
+                "127.0.0.1", "", 4025, conf.read(self.path), config_file=self.path
+            )
+            before = {
+                "storage": dict(daemon.event_manager.storage),
+                "heartbeats": dict(daemon.heartbeats),
+                "listeners": list(daemon.listeners),
+            }
+            for _ in range(self.events):
+                await daemon.event_manager.dispatch(cmd.Command("609"), "001")
+
+            self.write_config(**overrides)
+            changes = await daemon.reload()
+            for _ in range(self.events):
+                await daemon.event_manager.dispatch(cmd.Command("609"), "002")
+            if daemon._listener_task is not None:
+                await daemon._listener_task
+            await daemon.close()
+            return daemon, before, changes
+
+        return asyncio.run(run())
+
+    def test_only_changed_storage_is_created(self):
+        storage = [
+            {"name": "kept", "type": "counting", "settings": {"maxSize": "10"}},
+            {"name": "changed", "type": "counting", "settings": {"maxSize": "20"}},
+            {"name": "added", "type": "counting", "settings": {}},
+        ]
+        daemon, before, changes = self.reload(storage=storage)
+
+        self.assertEqual(
+            ["kept", "changed", "changed", "added"], CountingStorage.created
+        )
+        self.assertEqual(
+            {"added": ["added"], "removed": [], "changed": ["changed"]},
+            changes["storage"],
+        )
+
+        storages = daemon.event_manager.storage
+        self.assertIs(before["storage"]["kept"], storages["kept"])
+        self.assertIsNot(before["storage"]["changed"], storages["changed"])
+        self.assertEqual(20, storages["changed"].size)
+        self.assertEqual(
+            ["001", "002"], [event.zone for event in storages["changed"].all()]
+        )
+        self.assertEqual(storages, daemon.config.storage)
+
+    def test_removed_storage_is_dropped(self):
+        storage = [{"name": "kept", "type": "counting", "settings": {"maxSize": "10"}}]
+        daemon, _, _ = self.reload(storage=storage)
+
+        self.assertEqual(["kept"], list(daemon.event_manager.storage))
+        self.assertEqual(["kept", "changed"], CountingStorage.created)
+
+    def test_changed_listeners_are_restarted(self):
+        listeners = [
+            {"name": "one", "type": "fake", "settings": {}},
+            {"name": "two", "type": "fake", "settings": {"port": "1"}},
+            {"name": "three", "type": "fake", "settings": {}},
+        ]
+        daemon, before, _ = self.reload(listeners=listeners)
+
+        one, two = before["listeners"]
+        self.assertEqual(
+            ["one", "two", "three"], [str(listener) for listener in daemon.listeners]
+        )
+        self.assertIs(one, daemon.listeners[0])
+        self.assertIsNot(two, daemon.listeners[1])
+        self.assertFalse(two.listening)
+        self.assertTrue(all(listener.listening for listener in daemon.listeners[1:]))
+        self.assertTrue(all(listener.daemon is daemon for listener in daemon.listeners))
+
+    def test_heartbeats_are_only_restarted_when_changed(self):
+        daemon, before, _ = self.reload()
+        self.assertIs(before["heartbeats"]["hb"], daemon.heartbeats["hb"])
+
+        heartbeats = [
+            {
+                "name": "hb",
+                "auth_token": "token",
+                "device_id": 1,
+                "device_uuid": "uuid",
+                "interval": 30,
+                "url": "http://localhost/heartbeat",
+            }
+        ]
+        daemon, before, _ = self.reload(heartbeats=heartbeats)
+        self.assertIsNot(before["heartbeats"]["hb"], daemon.heartbeats["hb"])
+        self.assertEqual(30, daemon.heartbeats["hb"].interval)
+        self.assertEqual(daemon.config.heartbeats, list(daemon.heartbeats.values()))
+
+    def test_changed_tiered_storage_keeps_each_event_once(self):
+        def tiered(hot_size: str) -> list:
+            settings = {"path": self.directory, "hotSize": hot_size}
+            return [{"name": "history", "type": "tiered", "settings": settings}]
+
+        self.events = 12
+        self.reload(before={"storage": tiered("5")}, storage=tiered("3"))
+
+        segments = [
+            Segment.parse(self.directory, file) for file in os.listdir(self.directory)
+        ]
+        segments = [segment for segment in segments if segment is not None]
+        sequences = [segment.sequence for segment in segments]
+        self.assertEqual(len(set(sequences)), len(sequences))
+        self.assertEqual(24, sum(segment.count for segment in segments))
+        self.assertEqual(24, len(TieredStorage(self.directory).range()))
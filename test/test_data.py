@@ -31,3 +31,42 @@ class TestData(unittest.TestCase):
         parsed = dt.parse(command, data)
 
         self.assertEqual(parsed, {"data": data})
+
+    def test_partition_data_parse(self):
+        command = cmd.Command("650")
+        data = "1"
+        parsed = dt.parse(command, data)
+
+        self.assertEqual(parsed, {"partition": "1", "data": None})
+
+    def test_led_state_table(self):
+        self.assertEqual(256, len(dt.LED_STATE_DESCRIPTIONS))
+        self.assertEqual("", dt.describe_led_state("00"))
+        self.assertEqual("Backlight", dt.describe_led_state("80"))
+        self.assertEqual("ready", dt.describe_led_state("01").lower())
+        self.assertEqual(8, len(dt.describe_led_state("FF").split(", ")))
+
+    def test_register(self):
+        command_type = cmd.CommandType.SYSTEM_IN_INSTALLERS_MODE
+        try:
+            dt.register(command_type, parser=lambda data: {"raw": data})
+
+            parsed = dt.parse(cmd.Command(command_type.value), "abc")
+            self.assertEqual({"raw": "abc"}, parsed)
+            self.assertIs(dt.describe_nothing, dt.handler(command_type).describe)
+        finally:
+            del dt.HANDLERS[command_type]
+
+        self.assertIs(dt.DEFAULT_HANDLER, dt.handler(command_type))
+
+    def test_decode_zone_timers(self):
+        data = "FFFF" + "FEFF" + "0000" + "FFFF" * 61
+        timers = dt.decode_zone_timers(data)
+
+        self.assertEqual(64, len(timers))
+        self.assertEqual([0, 5, 0xFFFF * 5, 0], list(timers[:4]))
+
+    def test_decode_bypassed_zones(self):
+        bitmask = dt.decode_bypassed_zones("0180000000000080")
+
+        self.assertEqual(["001", "016", "064"], dt.bypassed_zones(bitmask))
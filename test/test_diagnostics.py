@@ -0,0 +1,157 @@
+import asyncio
+import json
+import sys
+import unittest
+
+from unittest import mock
+
+import evl.command as cmd
+import evl.diagnostics as diagnostics
+import evl.event as ev
+import evl.queues as queues
+
+from evl.storage.memory import MemoryStorage
+
+
+class DeepSizeTest(unittest.TestCase):
+    def test_nested_objects_are_counted_once(self):
+        data = "x" * 1000
+        items = [data, data]
+
+        self.assertEqual(
+            sys.getsizeof(items) + sys.getsizeof(data), diagnostics.deep_size(items)
+        )
+
+    def test_events_are_walked_but_enums_are_not(self):
+        event = ev.Event(cmd.Command("609"), {"zone": "001"}, 1700000000)
+
+        seen = set()
+        size = diagnostics.deep_size(event, seen)
+
+        self.assertGreater(size, sys.getsizeof(event) + sys.getsizeof(event.command))
+        self.assertIn(id(event.command.__dict__), seen)
+        self.assertIn(id(event.priority), seen)
+        self.assertNotIn(id(event.priority.__dict__), seen)
+
+
+class MemoryReportTest(unittest.TestCase):
+    def test_subsystems_are_reported(self):
+        async def run():
+            manager = ev.EventManager(
+                queues.event_queue(), storage={"memory": MemoryStorage(10)}
+            )
+            manager.status.queues = {"event": manager._event_queue}
+            subscription = manager.bus.subscribe()
+            for zone in ("001", "002", "003"):
+                await manager.dispatch(cmd.Command("609"), zone)
+            await manager.enqueue(cmd.Command("610"), "001")
+            report = diagnostics.memory_report(manager)
+            subscription.close()
+            return report
+
+        report = asyncio.run(run())
+
+        storage = report["storage"]["memory"]
+        self.assertEqual(3, storage["count"])
+        self.assertEqual(storage["bytes"] // 3, storage["bytes_per_item"])
+        self.assertEqual(1, report["queues"]["event"]["count"])
+        self.assertGreater(report["status"]["zones"], 0)
+        self.assertEqual(3, report["buffers"]["bus"][0]["frames"])
+        self.assertGreater(report["process"]["max_rss"], 0)
+        json.dumps(report)
+
+
+class ProcessMemoryTest(unittest.TestCase):
+    def test_peak_memory_is_optional(self):
+        with mock.patch.dict(sys.modules, {"resource": None}):
+            memory = diagnostics.process_memory()
+
+        self.assertIsNone(memory["max_rss"])
+        self.assertGreater(memory["gc_objects"], 0)
+
+
+class AllocationTracerTest(unittest.TestCase):
+    def setUp(self):
+        self.tracer = diagnostics.AllocationTracer()
+
+    def tearDown(self):
+        self.tracer.stop()
+
+    def test_snapshots_are_compared_with_the_previous_one(self):
+        self.assertTrue(self.tracer.start(frames=2)["tracing"])
+        self.assertFalse(self.tracer.snapshot()["compared"])
+
+        retained = [bytearray(1024) for _ in range(100)]
+        result = self.tracer.snapshot(limit=5)
+
+        self.assertTrue(result["compared"])
+        self.assertLessEqual(len(result["statistics"]), 5)
+        top = result["statistics"][0]
+        self.assertGreaterEqual(top["size_diff"], 100 * 1024)
+        self.assertIn(__file__, top["traceback"][0])
+        del retained
+
+    def test_snapshot_requires_tracing(self):
+        with self.assertRaises(ValueError):
+            self.tracer.snapshot()
+
+        self.tracer.start()
+        with self.assertRaises(ValueError):
+            self.tracer.snapshot(key_type="module")
+        self.assertFalse(self.tracer.stop()["tracing"])
+
+
+class AdminEndpointTest(unittest.TestCase):
+    def request(self, requests: list, admin_token: str = "admin") -> list:
+        # Imported here so that the remaining tests can run without aiohttp.
+        from aiohttp.test_utils import RawTestServer, TestClient
+
+        from evl.listeners.asynchttp import AsyncHttpListener
+
+        async def run():
+            listener = AsyncHttpListener(
+                "http",
+                0,
+                "token",
+                ev.EventManager(asyncio.Queue()),
+                admin_token=admin_token,
+            )
+            listener.daemon = object()
+            responses = []
+            async with TestClient(RawTestServer(listener.handler)) as client:
+                for method, path in requests:
+                    resp = await client.request(
+                        method,
+                        path,
+                        params={"auth_token": "token", "admin_token": "admin"},
+                    )
+                    responses.append((resp.status, await resp.text()))
+            return responses
+
+        return asyncio.run(run())
+
+    def tearDown(self):
+        diagnostics.TRACER.stop()
+
+    def test_memory_and_tracemalloc_endpoints(self):
+        responses = self.request(
+            [
+                ("GET", "/admin/memory"),
+                ("POST", "/admin/tracemalloc/snapshot"),
+                ("POST", "/admin/tracemalloc/start"),
+                ("POST", "/admin/tracemalloc/snapshot"),
+                ("POST", "/admin/tracemalloc/stop"),
+                ("GET", "/admin/tracemalloc/unknown"),
+            ]
+        )
+
+        self.assertEqual([200, 400, 200, 200, 200, 404], [r[0] for r in responses])
+        self.assertIn("storage", json.loads(responses[0][1]))
+        self.assertTrue(json.loads(responses[2][1])["tracing"])
+        self.assertFalse(json.loads(responses[4][1])["tracing"])
+
+    def test_admin_endpoints_require_a_configured_admin_token(self):
+        requests = [("GET", "/admin/memory"), ("POST", "/admin/reload")]
+
+        self.assertEqual([403, 403], [r[0] for r in self.request(requests, None)])
+        self.assertEqual([403, 403], [r[0] for r in self.request(requests, "other")])
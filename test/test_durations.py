@@ -0,0 +1,52 @@
+import unittest
+
+import evl.command as cmd
+import evl.durations as durations
+
+
+class DurationTrackerTest(unittest.TestCase):
+    def setUp(self):
+        self.tracker = durations.DurationTracker(long_open=300, alpha=0.5)
+
+    def test_open_durations(self):
+        events = [
+            (cmd.CommandType.ZONE_OPEN, 0),
+            (cmd.CommandType.ZONE_RESTORED, 10),
+            (cmd.CommandType.ZONE_OPEN, 100),
+            (cmd.CommandType.ZONE_RESTORED, 130),
+            (cmd.CommandType.ZONE_OPEN, 400),
+        ]
+        for command_type, timestamp in events:
+            self.tracker.update(command_type, "001", timestamp)
+
+        stats = self.tracker.report(450)[durations.OPEN]["001"]
+        self.assertTrue(stats["active"])
+        self.assertEqual(50, stats["current"])
+        self.assertEqual(2, stats["count"])
+        self.assertEqual(20, stats["mean"])
+        self.assertEqual(30, stats["max"])
+        # Intervals of 100s then 300s, averaged with alpha 0.5.
+        self.assertEqual(3600 / 200, stats["per_hour"])
+
+    def test_fault_periods_are_tracked_separately(self):
+        self.tracker.update(cmd.CommandType.ZONE_FAULT, "002", 0)
+        self.tracker.update(cmd.CommandType.ZONE_FAULT_RESTORE, "002", 5)
+
+        report = self.tracker.report(10)
+        self.assertEqual(1, report[durations.FAULT]["002"]["count"])
+        self.assertEqual({}, report[durations.OPEN])
+
+    def test_long_open_zones(self):
+        self.tracker.update(cmd.CommandType.ZONE_OPEN, "001", 0)
+        self.tracker.update(cmd.CommandType.ZONE_OPEN, "002", 100)
+        self.tracker.update(cmd.CommandType.ZONE_OPEN, "003", 200)
+        self.tracker.update(cmd.CommandType.ZONE_RESTORED, "001", 250)
+
+        self.assertEqual([], self.tracker.long_open_zones(350))
+        self.assertEqual(["002"], self.tracker.long_open_zones(450))
+        self.assertEqual(["002", "003"], self.tracker.long_open_zones(550))
+
+    def test_restore_without_open_is_ignored(self):
+        self.tracker.update(cmd.CommandType.ZONE_RESTORED, "001", 10)
+
+        self.assertEqual({}, self.tracker.report(20)[durations.OPEN])
@@ -1,3 +1,4 @@
+import asyncio
 import unittest
 
 import evl.command as cmd
@@ -13,3 +14,59 @@ class TestEventManager(unittest.TestCase):
         event = ev.Event(command, {})
 
         self.assertEqual(cmd.Priority.CRITICAL, event.priority)
+
+    def test_notifiers_only_receive_routed_events(self):
+        low, high = RecordingNotifier(cmd.Priority.LOW), RecordingNotifier(
+            cmd.Priority.HIGH
+        )
+        alarms = RecordingNotifier(cmd.Priority.LOW)
+        alarms.commands = frozenset({cmd.CommandType.ZONE_ALARM})
+        manager = ev.EventManager(asyncio.Queue())
+        manager.add_notifiers({"low": low, "high": high, "alarms": alarms})
+
+        async def dispatch():
+            await manager.dispatch(cmd.Command("510"), "81")
+            await manager.dispatch(cmd.Command("601"), "1001")
+
+        asyncio.run(dispatch())
+        self.assertEqual(["510", "601"], low.numbers)
+        self.assertEqual(["601"], high.numbers)
+        self.assertEqual(["601"], alarms.numbers)
+
+        manager.remove_notifier("low")
+        asyncio.run(dispatch())
+        self.assertEqual(2, len(low.numbers))
+        self.assertEqual(["601", "601"], high.numbers)
+
+
+class RecordingNotifier:
+    def __init__(self, priority: cmd.Priority):
+        self.priority = priority
+        self.numbers = []
+
+    async def notify(self, event: ev.Event) -> None:
+        self.numbers.append(event.command.number)
+
+
+class TestStatus(unittest.TestCase):
+    def test_zone_dumps(self):
+        status = ev.Status()
+        timers = cmd.Command(cmd.CommandType.ENVISALINK_ZONE_TIMER_DUMP.value)
+        bypass = cmd.Command(cmd.CommandType.BYPASSED_ZONES_BITFIELD_DUMP.value)
+
+        status.update(ev.Event(timers, {"data": "FFFF" + "FEFF" * 63}))
+        status.update(ev.Event(bypass, {"data": "0200000000000000"}))
+        report = status.report()
+
+        seconds = report["zone_timers"]["seconds_since_closed"]
+        self.assertEqual(0, seconds["001"])
+        self.assertEqual(5, seconds["064"])
+        self.assertEqual(["002"], report["bypassed_zones"])
+
+    def test_invalid_zone_dump(self):
+        status = ev.Status()
+        timers = cmd.Command(cmd.CommandType.ENVISALINK_ZONE_TIMER_DUMP.value)
+
+        with self.assertLogs("evl.event", "ERROR"):
+            status.update(ev.Event(timers, {"data": "FFF"}))
+        self.assertIsNone(status.report()["zone_timers"])
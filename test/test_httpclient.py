@@ -0,0 +1,224 @@
+import asyncio
+import json
+import unittest
+
+from aiohttp import web
+
+import evl.command as cmd
+import evl.event as ev
+import evl.httpclient as httpclient
+
+import evl.tasks.heartbeat as heartbeat
+
+from evl.notifiers.mimirnotifier import MimirNotifier
+
+
+class ServerTestCase(unittest.TestCase):
+    """Runs tests against a local HTTP server recording its requests."""
+
+    def setUp(self):
+        self.requests = []
+        self.peers = set()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.text()
+        self.requests.append((request.method, request.path, body))
+        self.peers.add(request.transport.get_extra_info("peername"))
+        if request.path == "/error":
+            return web.Response(text="error", status=500)
+        return web.Response(text="ok")
+
+    def serve(self, test):
+        async def run():
+            app = web.Application()
+            app.router.add_route("*", "/{tail:.*}", self.handle)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            port = runner.addresses[0][1]
+            try:
+                await test("http://127.0.0.1:{port}".format(port=port))
+            finally:
+                await runner.cleanup()
+
+        asyncio.run(run())
+
+
+class HttpClientTest(ServerTestCase):
+    def test_connections_are_warmed_and_reused(self):
+        client = httpclient.HttpClient(limit_per_host=2)
+        task = heartbeat.HeartbeatTask("hb", 1, "uuid", 60, "", "token", client=client)
+        notifier = MimirNotifier("", "uuid", "token", client=client)
+        event = ev.Event(cmd.Command("609"), {"zone": "001"}, 1700000000)
+
+        async def test(url):
+            task.url = url + "/api/devices/1"
+            notifier.url = url + "/api/events"
+
+            await client.warm([task.url, notifier.url])
+            await task.ping()
+            await notifier.notify(event)
+            self.assertEqual(2, client.session().connector.limit_per_host)
+            await client.close()
+
+        self.serve(test)
+
+        methods = [(method, path) for method, path, _ in self.requests]
+        self.assertEqual(
+            [("HEAD", "/"), ("PUT", "/api/devices/1"), ("POST", "/api/events")],
+            methods,
+        )
+        # Requests are made over the pre-warmed connection.
+        self.assertEqual(1, len(self.peers))
+        self.assertEqual(
+            {"auth_token": "token", "device": "uuid"}, json.loads(self.requests[1][2])
+        )
+        self.assertEqual(3, sum(client.stats()["requests"].values()))
+
+    def test_unreachable_hosts_are_ignored_when_warming(self):
+        client = httpclient.HttpClient(connect_timeout=1)
+
+        async def run():
+            await client.warm(["http://127.0.0.1:1/api"])
+            await client.close()
+
+        asyncio.run(run())
+        self.assertEqual({"http://127.0.0.1:1": 1}, client.stats()["requests"])
+
+    def test_origin(self):
+        self.assertEqual(
+            "https://example.com:8443",
+            httpclient.origin("https://example.com:8443/api/devices?x=1"),
+        )
+
+
+class HeartbeatTest(ServerTestCase):
+    def make_heartbeat(self, name, device_id, url="http://127.0.0.1/api", **kwargs):
+        return heartbeat.HeartbeatTask(
+            name, device_id, "uuid-" + name, 60, url, "token-" + name, **kwargs
+        )
+
+    def test_heartbeats_are_batched_by_url_and_interval(self):
+        heartbeats = [
+            self.make_heartbeat("a", 1, batch=True),
+            self.make_heartbeat("b", 2, batch=True),
+            self.make_heartbeat("c", 3, url="http://other/api", batch=True),
+            self.make_heartbeat("d", 4),
+        ]
+        scheduled = heartbeat.batch(heartbeats)
+
+        self.assertEqual(["d", "a,b", "c"], [task.name for task in scheduled])
+        self.assertEqual("http://127.0.0.1/api", scheduled[1].url)
+        self.assertEqual(
+            [1, 2], [device["id"] for device in scheduled[1].body_content["devices"]]
+        )
+        self.assertEqual(6, heartbeats[0].jitter)
+
+    def test_batch_is_sent_in_one_request(self):
+        client = httpclient.HttpClient()
+
+        async def test(url):
+            tasks = heartbeat.batch(
+                [
+                    self.make_heartbeat(
+                        name, index, url + "/api", client=client, batch=True
+                    )
+                    for index, name in enumerate(("a", "b", "c"))
+                ]
+            )
+            for task in tasks:
+                await task.ping()
+            await client.close()
+
+        self.serve(test)
+
+        self.assertEqual(1, len(self.requests))
+        method, path, body = self.requests[0]
+        self.assertEqual(("PUT", "/api"), (method, path))
+        self.assertEqual(3, len(json.loads(body)["devices"]))
+
+    def test_heartbeats_piggyback_on_recent_requests(self):
+        client = httpclient.HttpClient()
+        notifier = MimirNotifier("", "uuid-a", "token", client=client)
+        event = ev.Event(cmd.Command("609"), {"zone": "001"}, 1700000000)
+
+        async def test(url):
+            task = self.make_heartbeat(
+                "a", 1, url + "/api", client=client, piggyback=True
+            )
+            notifier.url = url + "/events"
+
+            await task.ping()
+            await task.ping()
+            await notifier.notify(event)
+            await task.ping()
+            await client.close()
+
+            self.assertEqual({"sent": 2, "piggybacked": 1}, task.stats())
+
+        self.serve(test)
+
+        self.assertEqual(
+            ["/api/1", "/api/1", "/events"], [path for _, path, _ in self.requests]
+        )
+
+    def test_heartbeats_only_piggyback_on_their_own_device(self):
+        client = httpclient.HttpClient()
+        notifier = MimirNotifier("", "uuid-a", "token", client=client)
+        event = ev.Event(cmd.Command("609"), {"zone": "001"}, 1700000000)
+
+        async def test(url):
+            tasks = [
+                self.make_heartbeat(
+                    name, index, url + "/api", client=client, piggyback=True
+                )
+                for index, name in enumerate(("a", "b"))
+            ]
+            notifier.url = url + "/events"
+
+            for task in tasks:
+                await task.ping()
+            await notifier.notify(event)
+            for task in tasks:
+                await task.ping()
+            await client.close()
+
+            self.assertEqual({"sent": 1, "piggybacked": 1}, tasks[0].stats())
+            self.assertEqual({"sent": 2, "piggybacked": 0}, tasks[1].stats())
+
+        self.serve(test)
+
+        self.assertEqual(
+            ["/api/0", "/api/1", "/events", "/api/1"],
+            [path for _, path, _ in self.requests],
+        )
+
+    def test_failed_requests_are_not_piggybacked_on(self):
+        client = httpclient.HttpClient()
+        notifier = MimirNotifier("", "uuid-a", "token", client=client)
+        event = ev.Event(cmd.Command("609"), {"zone": "001"}, 1700000000)
+
+        async def test(url):
+            task = self.make_heartbeat(
+                "a", 1, url + "/api", client=client, piggyback=True
+            )
+            await task.ping()
+
+            for notifier.url in (url + "/error", "http://127.0.0.1:1/events"):
+                await notifier.notify(event)
+                await task.ping()
+            await client.close()
+
+            self.assertEqual({"sent": 3, "piggybacked": 0}, task.stats())
+
+        self.serve(test)
+
+        self.assertEqual(
+            ["/api/1", "/error", "/api/1", "/api/1"],
+            [path for _, path, _ in self.requests],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import logging
+import os
+import tempfile
+import unittest
+
+import evl.logs as logs
+
+from evl.config import LoggingConfig, load_logging
+
+
+class Formatted:
+    """Counts how often it's formatted into a log message."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __str__(self):
+        self.count += 1
+        return "formatted"
+
+
+class LogsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "evl.log")
+        self.logger = logging.getLogger("evl.test")
+        self.handlers = list(logging.getLogger(logs.LOGGER).handlers)
+
+    def tearDown(self):
+        logs.stop()
+        evl_logger = logging.getLogger(logs.LOGGER)
+        for handler in list(evl_logger.handlers):
+            evl_logger.removeHandler(handler)
+        for handler in self.handlers:
+            evl_logger.addHandler(handler)
+        evl_logger.setLevel(logging.NOTSET)
+        # dictConfig disables loggers it isn't given, which other tests use.
+        for logger in logging.root.manager.loggerDict.values():
+            if isinstance(logger, logging.Logger):
+                logger.disabled = False
+        self.directory.cleanup()
+
+    def configure(self, level: str) -> None:
+        config = LoggingConfig(
+            name="file", type="file", level=level, path=self.path, format=None
+        )
+        logs.configure(load_logging([config]))
+
+    def read(self) -> str:
+        logs.stop()
+        with open(self.path) as log_file:
+            return log_file.read()
+
+    def test_records_are_written_through_queue(self):
+        self.configure("INFO")
+        handlers = logging.getLogger(logs.LOGGER).handlers
+
+        self.logger.info("Armed partition %s.", 1)
+
+        self.assertEqual(1, len(handlers))
+        self.assertIsInstance(handlers[0], logs.QueueHandler)
+        self.assertIn("INFO evl.test: Armed partition 1.", self.read())
+
+    def test_disabled_levels_are_not_formatted(self):
+        self.configure("INFO")
+        formatted = Formatted()
+
+        self.logger.debug("Skipped %s", formatted)
+        self.logger.info("Logged %s", formatted)
+
+        self.assertEqual(1, formatted.count)
+        self.assertNotIn("Skipped", self.read())
+
+    def test_exceptions_are_logged_with_traceback(self):
+        self.configure("DEBUG")
+
+        try:
+            raise ValueError("bad data")
+        except ValueError:
+            self.logger.exception("Failed")
+
+        contents = self.read()
+        self.assertIn("Traceback", contents)
+        self.assertIn("ValueError: bad data", contents)
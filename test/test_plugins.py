@@ -0,0 +1,39 @@
+import subprocess
+import sys
+import unittest
+
+import evl.config as conf
+import evl.notifiers.consolenotifier as console
+import evl.plugins as plugins
+
+
+class PluginsTest(unittest.TestCase):
+    def test_builtin_backend_is_loaded(self):
+        factory = plugins.load(plugins.NOTIFIERS, "console")
+        self.assertIs(console.from_config, factory)
+
+    def test_registered_backend_is_loaded(self):
+        def factory(config):
+            return config.name
+
+        plugins.register(plugins.NOTIFIERS, "test", factory)
+        self.assertIs(factory, plugins.load(plugins.NOTIFIERS, "test"))
+        self.assertIn("test", plugins.available(plugins.NOTIFIERS))
+
+    def test_unknown_backend_raises(self):
+        with self.assertRaises(plugins.PluginError):
+            plugins.load(plugins.NOTIFIERS, "does-not-exist")
+
+    def test_unknown_notifier_type_is_skipped(self):
+        config = conf.NotifierConfig(
+            name="unknown", type="does-not-exist", priority="low", layout=None
+        )
+        self.assertEqual({}, conf.load_notifiers([config]))
+
+    def test_config_import_does_not_load_backends(self):
+        code = (
+            "import sys, evl.config; "
+            "sys.exit(any(m in sys.modules for m in ('twilio', 'sendgrid', 'aiohttp')))"
+        )
+        completed = subprocess.run([sys.executable, "-c", code])
+        self.assertEqual(0, completed.returncode)
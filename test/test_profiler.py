@@ -0,0 +1,109 @@
+import asyncio
+import time
+import unittest
+
+import evl.event as ev
+import evl.profiler as profiler
+
+
+class BusyNotifier:
+    async def notify(self, event):
+        deadline = time.perf_counter() + 0.005
+        while time.perf_counter() < deadline:
+            pass
+
+
+class ProfilerTest(unittest.TestCase):
+    def profile(self, **kwargs) -> dict:
+        notifier = BusyNotifier()
+
+        async def busy():
+            while True:
+                await notifier.notify(None)
+                await asyncio.sleep(0)
+
+        async def run():
+            task = asyncio.create_task(busy())
+            try:
+                return await profiler.Profiler().profile(
+                    duration=0.3, notifiers=[notifier], **kwargs
+                )
+            finally:
+                task.cancel()
+
+        return asyncio.run(run())
+
+    def test_samples_are_attributed_to_notifiers(self):
+        result = self.profile(mode=profiler.SAMPLE, interval=0.002)
+
+        self.assertGreater(result["samples"], 0)
+        self.assertGreater(result["attribution"]["BusyNotifier.notify"]["percent"], 50)
+        self.assertIn(
+            "test_profiler.py:BusyNotifier.notify", result["stacks"].split("\n")[0]
+        )
+
+    def test_cprofile_reports_stats(self):
+        result = self.profile(mode=profiler.CPROFILE, sort="tottime", limit=5)
+
+        self.assertGreater(result["attribution"]["BusyNotifier.notify"]["seconds"], 0)
+        self.assertIn("notify", result["stats"])
+
+    def test_invalid_profiles_are_rejected(self):
+        async def run(**kwargs):
+            await profiler.Profiler().profile(**kwargs)
+
+        for kwargs in (
+            {"mode": "trace"},
+            {"duration": 0},
+            {"duration": profiler.MAX_DURATION + 1},
+            {"interval": 0},
+            {"sort": "name"},
+        ):
+            with self.assertRaises(ValueError):
+                asyncio.run(run(**kwargs))
+
+    def test_one_profile_runs_at_a_time(self):
+        async def run():
+            running = profiler.Profiler()
+            first = asyncio.create_task(running.profile(duration=0.1))
+            await asyncio.sleep(0)
+            with self.assertRaises(ValueError):
+                await running.profile(duration=0.1)
+            await first
+
+        asyncio.run(run())
+
+
+class ProfileEndpointTest(unittest.TestCase):
+    def post(self, params: dict) -> tuple:
+        # Imported here so that the remaining tests can run without aiohttp.
+        from aiohttp.test_utils import RawTestServer, TestClient
+
+        from evl.listeners.asynchttp import AsyncHttpListener
+
+        async def run():
+            listener = AsyncHttpListener(
+                "http",
+                0,
+                "token",
+                ev.EventManager(asyncio.Queue()),
+                admin_token="admin",
+            )
+            listener.daemon = object()
+            async with TestClient(RawTestServer(listener.handler)) as client:
+                resp = await client.post(
+                    "/admin/profile",
+                    params={"auth_token": "token", "admin_token": "admin", **params},
+                )
+                return resp.status, await resp.text()
+
+        return asyncio.run(run())
+
+    def test_profile_is_returned(self):
+        status, text = self.post(
+            {"mode": "cprofile", "duration": "0.1", "format": "text"}
+        )
+
+        self.assertEqual(200, status)
+        self.assertIn("function calls", text)
+        self.assertEqual(400, self.post({"mode": "trace"})[0])
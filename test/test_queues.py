@@ -0,0 +1,148 @@
+import asyncio
+import unittest
+
+import evl.command as cmd
+import evl.queues as queues
+
+
+def item(command: str, data: str = "") -> tuple:
+    return (cmd.Command(command), data)
+
+
+class EventQueueTest(unittest.TestCase):
+    def drain(self, queue: asyncio.Queue) -> list:
+        items = []
+        while not queue.empty():
+            command, data = queue.get_nowait()
+            items.append(command.number + data)
+        return items
+
+    def test_high_priority_events_jump_the_queue(self):
+        queue = queues.EventQueue()
+        queue.put_nowait(item("510", "81"))
+        queue.put_nowait(item("511", "00"))
+        queue.put_nowait(item("802"))
+
+        self.assertEqual(3, queue.qsize())
+        self.assertEqual(["802", "51081", "51100"], self.drain(queue))
+
+    def test_promoted_events_keep_their_order(self):
+        queue = queues.EventQueue()
+        for zone in ("001", "002"):
+            queue.put_nowait(item("609", zone))
+            queue.put_nowait(item("605", zone))
+
+        self.assertEqual(["609001", "605001", "609002", "605002"], self.drain(queue))
+
+    def test_partition_ordering_is_preserved(self):
+        queue = queues.EventQueue()
+        queue.put_nowait(item("510", "81"))
+        queue.put_nowait(item("650", "2"))
+        queue.put_nowait(item("652", "10"))
+        queue.put_nowait(item("654", "1"))
+
+        self.assertEqual(["65210", "6541", "51081", "6502"], self.drain(queue))
+
+    def test_zone_ordering_is_preserved(self):
+        queue = queues.EventQueue()
+        queue.put_nowait(item("609", "004"))
+        queue.put_nowait(item("609", "005"))
+        queue.put_nowait(item("601", "1004"))
+
+        self.assertEqual(["609004", "6011004", "609005"], self.drain(queue))
+
+
+class BoundedQueueTest(unittest.TestCase):
+    def test_drop_oldest_low_priority_drops_oldest_lowest(self):
+        queue = queues.frame_queue("recv", FrameQueueConfig(3))
+        for frame in ("6100012C", "51081XX", "6090012F", "8020000"):
+            queue.put_nowait(frame)
+
+        self.assertEqual(["6100012C", "6090012F", "8020000"], list(queue._queue))
+        self.assertEqual(1, queue.dropped)
+        self.assertEqual(1, queue.overflows)
+
+    def test_drop_oldest_low_priority_drops_new_lowest(self):
+        queue = queues.frame_queue("recv", FrameQueueConfig(1))
+        queue.put_nowait("802000")
+        queue.put_nowait("51081XX")
+
+        self.assertEqual(["802000"], list(queue._queue))
+        self.assertEqual(1, queue.dropped)
+
+    def test_coalesce_replaces_matching_item(self):
+        queue = queues.frame_queue("recv", FrameQueueConfig(2, queues.COALESCE))
+        for frame in ("51081XX", "609001XX", "51080XX"):
+            queue.put_nowait(frame)
+
+        self.assertEqual(["51080XX", "609001XX"], list(queue._queue))
+        self.assertEqual(1, queue.coalesced)
+        self.assertEqual(0, queue.dropped)
+
+    def test_block_raises_when_full(self):
+        queue = queues.frame_queue("recv", FrameQueueConfig(1, queues.BLOCK))
+        queue.put_nowait("51081XX")
+
+        with self.assertRaises(asyncio.QueueFull):
+            queue.put_nowait("51080XX")
+
+    def test_event_queue_evicts_bulk_events(self):
+        queue = queues.event_queue(FrameQueueConfig(2))
+        queue.put_nowait(item("802"))
+        queue.put_nowait(item("510", "81"))
+        queue.put_nowait(item("601", "1001"))
+
+        self.assertEqual(["802", "6011001"], EventQueueTest().drain(queue))
+        self.assertEqual(1, queue.stats()["dropped"])
+
+    def test_put_drops_instead_of_blocking(self):
+        async def run():
+            queue = queues.event_queue(FrameQueueConfig(2))
+            for event in (item("510", "81"), item("609", "001"), item("802")):
+                await asyncio.wait_for(queue.put(event), 1)
+            return queue
+
+        queue = asyncio.run(run())
+
+        self.assertEqual(["802", "609001"], EventQueueTest().drain(queue))
+        self.assertEqual(1, queue.overflows)
+        self.assertEqual(1, queue.dropped)
+
+    def test_put_coalesces_instead_of_blocking(self):
+        async def run():
+            queue = queues.frame_queue("ack", FrameQueueConfig(2, queues.COALESCE))
+            for frame in ("51081XX", "609001XX", "51080XX"):
+                await asyncio.wait_for(queue.put(frame), 1)
+            return queue
+
+        queue = asyncio.run(run())
+
+        self.assertEqual(["51080XX", "609001XX"], list(queue._queue))
+        self.assertEqual(1, queue.coalesced)
+
+    def test_put_blocks_when_full(self):
+        async def run():
+            queue = queues.frame_queue("send", FrameQueueConfig(1, queues.BLOCK))
+            await queue.put("51081XX")
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(queue.put("51080XX"), 0.05)
+            return queue
+
+        self.assertEqual(1, asyncio.run(run()).overflows)
+
+    def test_dropped_items_are_marked_done(self):
+        async def run():
+            queue = queues.event_queue(FrameQueueConfig(1))
+            queue.put_nowait(item("510", "81"))
+            queue.put_nowait(item("802"))
+            queue.get_nowait()
+            queue.task_done()
+            await asyncio.wait_for(queue.join(), 1)
+
+        asyncio.run(run())
+
+
+class FrameQueueConfig:
+    def __init__(self, maxsize: int, policy: str = queues.DROP_OLDEST_LOW_PRIORITY):
+        self.maxsize = maxsize
+        self.policy = policy
@@ -0,0 +1,69 @@
+import unittest
+
+import evl.command as cmd
+import evl.event as ev
+import evl.rollup as rollup
+
+
+class RingBufferTest(unittest.TestCase):
+    def test_buckets_wrap_around(self):
+        buffer = rollup.RingBuffer(60, 3)
+        buffer.add(0)
+        buffer.add(30)
+        buffer.add(60)
+        buffer.add(150)
+
+        self.assertEqual([(60, 1), (120, 1)], buffer.buckets(150)[1:])
+        self.assertEqual([(0, 2), (60, 1), (120, 1)], buffer.buckets(120))
+
+        # The bucket at 0 is reused once time reaches 180.
+        buffer.add(180)
+        self.assertEqual([(60, 1), (120, 1), (180, 1)], buffer.buckets(180))
+        self.assertEqual(3, buffer.total(180))
+
+    def test_events_older_than_window_are_ignored(self):
+        buffer = rollup.RingBuffer(60, 2)
+        buffer.add(180)
+        buffer.add(0)
+
+        self.assertEqual(1, buffer.total(180))
+
+
+class RollupsTest(unittest.TestCase):
+    def setUp(self):
+        self.rollups = rollup.Rollups()
+        events = [
+            ("609", {"zone": "001"}, 3600),
+            ("610", {"zone": "001"}, 3610),
+            ("609", {"zone": "002"}, 7200),
+            ("652", {"partition": "1", "data": "0"}, 7200),
+        ]
+        for number, data, timestamp in events:
+            self.rollups.add(ev.Event(cmd.Command(number), data, timestamp))
+
+    def test_query(self):
+        counts = self.rollups.query(rollup.ZONE, rollup.HOUR, now=7200)
+
+        self.assertEqual(["001", "002"], list(counts))
+        self.assertEqual(24, len(counts["001"]))
+        self.assertEqual([(3600, 2), (7200, 0)], counts["001"][-2:])
+        self.assertEqual(
+            {"652": [(7200, 1)]},
+            {
+                key: buckets[-1:]
+                for key, buckets in self.rollups.query(
+                    rollup.COMMAND, rollup.HOUR, key="652", now=7200
+                ).items()
+            },
+        )
+
+    def test_top(self):
+        top = self.rollups.top(rollup.COMMAND, rollup.DAY, now=7200)
+
+        self.assertEqual([("609", 2), ("610", 1), ("652", 1)], top)
+
+    def test_invalid_query(self):
+        with self.assertRaises(ValueError):
+            self.rollups.query("sensor")
+        with self.assertRaises(ValueError):
+            self.rollups.top(rollup.ZONE, "week")
@@ -0,0 +1,201 @@
+import asyncio
+import unittest
+
+import evl.command as cmd
+import evl.event as ev
+import evl.rules as rules
+
+from evl.tasks.silentarm import SilentArmTask
+
+
+def make_event(number: str, zone: str = None, partition: str = None) -> ev.Event:
+    return ev.Event(cmd.Command(number), {"zone": zone, "partition": partition})
+
+
+class RecordingNotifier:
+    def __init__(self):
+        self.events = []
+
+    async def notify(self, event: ev.Event) -> None:
+        self.events.append(event)
+
+
+class RuleEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.queue = asyncio.Queue()
+        self.manager = ev.EventManager(self.queue)
+        self.engine = self.manager.rules
+
+    def process(self, *events):
+        async def run():
+            for event in events:
+                await self.engine.process(event)
+
+        asyncio.run(run())
+
+    def test_rules_are_matched_by_command_and_zone(self):
+        open_any = rules.Rule("open-any", [], commands=[cmd.CommandType.ZONE_OPEN])
+        open_one = rules.Rule(
+            "open-one", [], commands=[cmd.CommandType.ZONE_OPEN], zones=["001"]
+        )
+        zone_one = rules.Rule("zone-one", [], zones=["001"])
+        for rule in (open_any, open_one, zone_one):
+            self.engine.add(rule)
+
+        names = [str(rule) for rule in self.engine.match(make_event("609", "001"))]
+        self.assertEqual(["open-any", "open-one", "zone-one"], names)
+
+        names = [str(rule) for rule in self.engine.match(make_event("609", "002"))]
+        self.assertEqual(["open-any"], names)
+        self.assertEqual([], self.engine.match(make_event("650", partition="1")))
+
+    def test_partition_and_priority_conditions(self):
+        self.engine.add(rules.Rule("partition", [], partitions=["1"]))
+        self.engine.add(rules.Rule("critical", [], priority=cmd.Priority.CRITICAL))
+
+        self.assertEqual(["partition"], self.names(make_event("650", partition="1")))
+        self.assertEqual([], self.names(make_event("650", partition="2")))
+        self.assertEqual(
+            ["partition", "critical"], self.names(make_event("605", zone="001"))
+        )
+
+    def names(self, event):
+        return [str(rule) for rule in self.engine.match(event)]
+
+    def test_empty_zones_never_match(self):
+        self.engine.add(rules.Rule("none", [], zones=[]))
+
+        self.assertEqual([], self.engine.match(make_event("609", "001")))
+
+    def test_actions(self):
+        notifier = RecordingNotifier()
+        sent = []
+
+        async def send(command, data=""):
+            sent.append((command, data))
+
+        self.manager.add_notifiers({"recorder": notifier})
+        self.engine.send = send
+        self.engine.add(
+            rules.from_dict(
+                {
+                    "name": "door",
+                    "group": "door",
+                    "commands": ["609"],
+                    "zones": ["001"],
+                    "actions": [
+                        {"type": "zone_alarm"},
+                        {"type": "notify", "notifiers": ["recorder"]},
+                        {"type": "send", "command": "001"},
+                        {"type": "remove"},
+                    ],
+                }
+            )
+        )
+
+        self.process(make_event("609", "001"), make_event("609", "001"))
+
+        command, data = self.queue.get_nowait()
+        self.assertEqual(cmd.CommandType.SOFTWARE_ZONE_ALARM, command.command_type)
+        self.assertEqual("001", data)
+        self.assertTrue(self.queue.empty())
+        self.assertEqual(1, len(notifier.events))
+        self.assertEqual([(cmd.CommandType.STATUS_REPORT, "")], sent)
+        self.assertEqual(0, len(self.engine))
+
+    def test_zone_alarm_ignores_software_zone_alarms(self):
+        self.engine.add(
+            rules.from_dict({"name": "any", "actions": [{"type": "zone_alarm"}]})
+        )
+
+        self.process(make_event("609", "001"))
+        command, data = self.queue.get_nowait()
+        self.process(make_event(command.number, data))
+
+        self.assertEqual(cmd.CommandType.SOFTWARE_ZONE_ALARM, command.command_type)
+        self.assertTrue(self.queue.empty())
+
+    def test_invalid_rules(self):
+        with self.assertRaises(ValueError):
+            rules.from_dict({"actions": []})
+        with self.assertRaises(ValueError):
+            rules.from_dict({"name": "x", "actions": [{"type": "explode"}]})
+        with self.assertRaises(ValueError):
+            rules.from_dict({"name": "x", "actions": [{"type": "send"}]})
+
+
+class RulesEndpointTest(unittest.TestCase):
+    def post(self, rule: dict) -> tuple:
+        # Imported here so that the remaining tests can run without aiohttp.
+        from aiohttp.test_utils import RawTestServer, TestClient
+
+        from evl.listeners.asynchttp import AsyncHttpListener
+
+        async def run():
+            manager = ev.EventManager(asyncio.Queue())
+            listener = AsyncHttpListener("http", 0, "token", manager)
+            async with TestClient(RawTestServer(listener.handler)) as client:
+                resp = await client.post(
+                    "/rules", params={"auth_token": "token"}, json=rule
+                )
+                return resp.status, manager.rules.rules()
+
+        return asyncio.run(run())
+
+    def test_rule_is_added(self):
+        status, added = self.post(
+            {"name": "door", "zones": ["012"], "actions": [{"type": "zone_alarm"}]}
+        )
+
+        self.assertEqual(200, status)
+        self.assertEqual(frozenset({"012"}), added[0].zones)
+
+    def test_rules_are_validated(self):
+        for rule in (
+            {"name": "door", "zones": "12", "actions": [{"type": "zone_alarm"}]},
+            {"name": "door", "commands": ["999"], "actions": []},
+            {"name": "door", "actions": [{"type": "send", "command": "999"}]},
+            {"actions": []},
+        ):
+            self.assertEqual((400, []), self.post(rule))
+
+
+class SilentArmTaskTest(unittest.TestCase):
+    def test_multiple_tasks(self):
+        queue = asyncio.Queue()
+        manager = ev.EventManager(queue)
+        first = SilentArmTask(manager, ["1"], ["001"])
+        second = SilentArmTask(manager, ["2"], ["002"])
+        first.start()
+        second.start()
+
+        async def run():
+            for event in (
+                make_event("609", "001"),
+                make_event("652", partition="1"),
+                make_event("609", "001"),
+                make_event("609", "002"),
+            ):
+                await manager.rules.process(event)
+
+        asyncio.run(run())
+
+        alarms = [queue.get_nowait()[1] for _ in range(queue.qsize())]
+        self.assertEqual(["001", "002"], alarms)
+        self.assertFalse(first.active)
+        self.assertTrue(second.active)
+
+        second.stop()
+        self.assertEqual(0, len(manager.rules))
+
+    def test_timeout(self):
+        manager = ev.EventManager(asyncio.Queue())
+        task = SilentArmTask(manager, ["1"], ["001"], timeout=60)
+        task.start()
+        self.assertTrue(task.active)
+
+        manager.scheduler.advance(manager.scheduler.clock() + 30)
+        self.assertTrue(task.active)
+        manager.scheduler.advance(manager.scheduler.clock() + 61)
+        self.assertFalse(task.active)
+        self.assertEqual(0, len(manager.scheduler))
@@ -0,0 +1,113 @@
+import asyncio
+import unittest
+
+import evl.scheduler as sched
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class SchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scheduler = sched.Scheduler(
+            resolution=1, slots=8, levels=2, clock=self.clock
+        )
+        self.calls = []
+
+    def advance(self, seconds: float) -> int:
+        self.clock.now += seconds
+        return self.scheduler.advance()
+
+    def record(self, name: str) -> None:
+        self.calls.append((name, self.clock.now))
+
+    def test_timers_fire_at_deadline(self):
+        self.scheduler.call_later(3, self.record, "short")
+        # Further out than the inner wheel, and than both wheels.
+        self.scheduler.call_later(20, self.record, "long")
+        self.scheduler.call_later(100, self.record, "overflow")
+        self.assertEqual(3, len(self.scheduler))
+
+        self.assertEqual(0, self.advance(2))
+        for _ in range(100):
+            self.advance(1)
+
+        self.assertEqual(
+            [("short", 1003.0), ("long", 1020.0), ("overflow", 1100.0)], self.calls
+        )
+        self.assertEqual(0, len(self.scheduler))
+
+    def test_cancelled_timers_dont_fire(self):
+        kept = self.scheduler.call_later(5, self.record, "kept")
+        cancelled = self.scheduler.call_later(30, self.record, "cancelled")
+        cancelled.cancel()
+        self.assertFalse(cancelled.active)
+        self.assertTrue(kept.active)
+
+        self.advance(60)
+        self.assertEqual(["kept"], [name for name, _ in self.calls])
+        self.assertFalse(kept.active)
+
+    def test_periodic_timers_dont_drift(self):
+        timer = self.scheduler.call_every(10, self.record, "tick")
+        # Fire late, in uneven steps. Deadlines stay on the nominal schedule.
+        for step in (13, 4, 9, 10, 7):
+            self.advance(step)
+        self.assertEqual([1013.0, 1026.0, 1036.0, 1043.0], [at for _, at in self.calls])
+        self.assertEqual(1050.0, timer.deadline)
+
+        # Calls missed by a whole interval are skipped.
+        self.advance(35)
+        self.assertEqual(5, len(self.calls))
+        self.assertEqual(1080.0, timer.deadline)
+        self.assertEqual(2, self.scheduler.stats()["skipped"])
+
+        timer.cancel()
+        self.advance(100)
+        self.assertEqual(5, len(self.calls))
+
+    def test_jitter(self):
+        timer = self.scheduler.call_every(10, self.record, "tick", jitter=2)
+        for _ in range(20):
+            self.assertLessEqual(timer.nominal, timer.deadline)
+            self.assertLessEqual(timer.deadline, timer.nominal + 2)
+            self.advance(10)
+
+    def test_errors_are_counted(self):
+        def fail():
+            raise RuntimeError("failed")
+
+        self.scheduler.call_every(1, fail)
+        for _ in range(3):
+            self.advance(1)
+        self.assertEqual(3, self.scheduler.stats()["errors"])
+
+    def test_run(self):
+        scheduler = sched.Scheduler(resolution=0.01)
+        calls = []
+
+        async def ping():
+            calls.append(ping)
+            await asyncio.sleep(0.1)
+
+        async def run():
+            timer = scheduler.call_every(0.02, ping, delay=0)
+            await asyncio.sleep(0.15)
+            timer.cancel()
+            await scheduler.close()
+
+        asyncio.run(run())
+
+        # Calls are skipped while the previous one is still running.
+        self.assertEqual(2, len(calls))
+        self.assertGreater(scheduler.stats()["skipped"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import unittest
+
+import aiohttp
+
+import evl.command as cmd
+import evl.event as ev
+import evl.sharedstate as sharedstate
+import evl.storage.memory as memory
+
+from evl.listeners.asynchttp import AsyncHttpListener
+
+
+class SharedStateTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "test.state")
+
+    def test_published_sections_are_read(self):
+        writer = sharedstate.SharedStateWriter(self.path, size=1024)
+        reader = sharedstate.SharedStateReader(self.path)
+
+        self.assertEqual({}, reader.read())
+        writer.write({"status": b'{"ok": true}', "events": b"[]"})
+        self.assertEqual({"status": b'{"ok": true}', "events": b"[]"}, reader.read())
+
+        writer.write({"status": b"{}"})
+        self.assertEqual({"status": b"{}"}, reader.read())
+        self.assertEqual(writer.sequence, reader.sequence)
+
+        reader.close()
+        writer.close()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_reads_during_writes_return_last_complete_state(self):
+        writer = sharedstate.SharedStateWriter(self.path, size=1024)
+        reader = sharedstate.SharedStateReader(self.path)
+        writer.write({"status": b"first"})
+        reader.read()
+
+        # Leave a write half done: odd sequence number and a new payload.
+        writer._map[sharedstate._HEADER.size : sharedstate._HEADER.size + 6] = b"second"
+        sharedstate._SEQUENCE.pack_into(
+            writer._map, sharedstate._SEQUENCE_OFFSET, writer.sequence + 1
+        )
+        self.assertEqual({"status": b"first"}, reader.read())
+
+        reader.close()
+        writer.close()
+
+    def test_state_larger_than_capacity_is_rejected(self):
+        writer = sharedstate.SharedStateWriter(self.path, size=16)
+        with self.assertRaises(sharedstate.SharedStateError):
+            writer.write({"status": bytes(32)})
+        writer.close()
+
+    def test_file_is_only_accessible_by_its_owner(self):
+        with open(self.path, "w"):
+            pass
+        os.chmod(self.path, 0o644)
+
+        writer = sharedstate.SharedStateWriter(self.path, size=16)
+
+        self.assertEqual(0o600, os.stat(self.path).st_mode & 0o777)
+        writer.close()
+
+    def test_invalid_file_is_rejected(self):
+        with open(self.path, "wb") as state_file:
+            state_file.write(bytes(64))
+        with self.assertRaises(sharedstate.SharedStateError):
+            sharedstate.SharedStateReader(self.path)
+
+
+class HttpWorkerTest(unittest.TestCase):
+    def free_port(self) -> int:
+        with socket.socket() as sock:
+            sock.bind(("localhost", 0))
+            return sock.getsockname()[1]
+
+    def test_workers_serve_published_state(self):
+        manager = ev.EventManager(asyncio.Queue())
+        storage = memory.MemoryStorage(size=10)
+        for timestamp in (100, 200, 300):
+            storage.store(ev.Event(cmd.Command("609"), {"zone": "001"}, timestamp))
+        manager.add_storages({"memory": storage})
+
+        port = self.free_port()
+        listener = AsyncHttpListener(
+            "workers", port, "token", manager, "memory", workers=2
+        )
+        base = "http://localhost:{port}".format(port=port)
+
+        async def get(session, path):
+            # Workers take a moment to start in their own processes.
+            for _ in range(100):
+                try:
+                    async with session.get(base + path) as resp:
+                        return resp.status, await resp.text()
+                except aiohttp.ClientConnectionError:
+                    await asyncio.sleep(0.1)
+            self.fail("Workers didn't start.")
+
+        async def run():
+            await listener.listen()
+            try:
+                async with aiohttp.ClientSession() as session:
+                    status, body = await get(session, "/events?auth_token=token")
+                    self.assertEqual(200, status)
+                    self.assertEqual(3, len(json.loads(body)))
+
+                    _, body = await get(
+                        session, "/events?auth_token=token&start=150&end=250"
+                    )
+                    self.assertEqual([200], [e["timestamp"] for e in json.loads(body)])
+
+                    _, body = await get(session, "/status_report?auth_token=token")
+                    self.assertIn("uptime", json.loads(body))
+
+                    status, _ = await get(session, "/rules?auth_token=token")
+                    self.assertEqual(404, status)
+                    status, _ = await get(session, "/state?auth_token=wrong")
+                    self.assertEqual(403, status)
+            finally:
+                await listener.stop()
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+
+import evl.command as cmd
+import evl.event as ev
+import evl.state as state
+
+
+class StateTableTest(unittest.TestCase):
+    def setUp(self):
+        self.table = state.StateTable(state.ZONE_FLAGS)
+
+    def test_set_and_query(self):
+        self.assertTrue(self.table.set(1, state.OPEN, True, 10.0))
+        self.assertFalse(self.table.set(1, state.OPEN, True, 20.0))
+        self.table.set(5, state.FAULT, True, 30.0)
+        self.table.set(5, state.OPEN, True, 40.0)
+
+        self.assertEqual([1, 5], self.table.query(state.OPEN))
+        self.assertEqual([5], self.table.query(state.OPEN, state.FAULT, match_all=True))
+        self.assertEqual(10.0, self.table.snapshot().changed_at(1))
+        self.assertTrue(self.table.get(5)[state.FAULT])
+
+        self.table.set(1, state.OPEN, False, 50.0)
+        self.assertEqual([5], self.table.query(state.OPEN))
+
+    def test_snapshot_is_copy_on_write(self):
+        self.table.set(2, state.OPEN, True, 10.0)
+        snapshot = self.table.snapshot()
+        self.assertIs(snapshot, self.table.snapshot())
+
+        self.table.set(2, state.OPEN, False, 20.0)
+        self.table.set(3, state.TAMPER, True, 20.0)
+
+        self.assertEqual([2], snapshot.query(state.OPEN))
+        self.assertEqual(10.0, snapshot.changed_at(2))
+        self.assertEqual(0.0, snapshot.changed_at(3))
+        self.assertIsNot(snapshot, self.table.snapshot())
+
+    def test_grows_beyond_initial_size(self):
+        self.table.set(100, state.ALARM, True, 10.0)
+
+        self.assertEqual(100, len(self.table))
+        self.assertEqual(["100"], self.table.snapshot().as_dict()[state.ALARM])
+
+    def test_set_mask(self):
+        self.table.set(1, state.BYPASS, True, 10.0)
+        changed = self.table.set_mask(state.BYPASS, 1 << 2 | 1 << 3, 20.0)
+
+        self.assertEqual([1, 2, 3], changed)
+        self.assertEqual([2, 3], self.table.query(state.BYPASS))
+
+
+class StatusStateTest(unittest.TestCase):
+    def test_events_update_state(self):
+        status = ev.Status()
+        events = [
+            ("609", {"zone": "003"}),
+            ("605", {"zone": "004"}),
+            ("652", {"partition": "1", "data": "0"}),
+            ("610", {"zone": "003"}),
+            ("609", {"zone": "004"}),
+            ("616", {"data": "0100000000000000"}),
+        ]
+        for number, data in events:
+            status.update(ev.Event(cmd.Command(number), data, timestamp=100))
+
+        zones = status.describe_state()["zones"]
+        self.assertEqual(["004"], zones[state.OPEN])
+        self.assertEqual(["004"], zones[state.FAULT])
+        self.assertEqual(["001"], zones[state.BYPASS])
+        self.assertEqual(["1"], status.describe_state()["partitions"][state.ARMED])
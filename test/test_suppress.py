@@ -0,0 +1,54 @@
+import unittest
+
+import evl.command as cmd
+import evl.data as dt
+import evl.suppress as suppress
+
+
+class SuppressorTest(unittest.TestCase):
+    def suppress(self, suppressor, command: str, data: str, now: float = 0.0):
+        command = cmd.Command(command)
+        return suppressor.suppress(command, dt.parse(command, data), now)
+
+    def test_repeated_state_is_suppressed(self):
+        suppressor = suppress.Suppressor()
+
+        self.assertFalse(self.suppress(suppressor, "510", "81"))
+        self.assertTrue(self.suppress(suppressor, "510", "81"))
+        self.assertFalse(self.suppress(suppressor, "510", "80"))
+        self.assertEqual({"510": 1}, suppressor.stats()["suppressed"])
+
+    def test_state_change_within_category_is_dispatched(self):
+        suppressor = suppress.Suppressor()
+
+        self.assertFalse(self.suppress(suppressor, "609", "001"))
+        self.assertFalse(self.suppress(suppressor, "610", "001"))
+        self.assertFalse(self.suppress(suppressor, "609", "001"))
+        self.assertTrue(self.suppress(suppressor, "609", "001"))
+
+    def test_zones_are_tracked_separately(self):
+        suppressor = suppress.Suppressor()
+
+        self.assertFalse(self.suppress(suppressor, "609", "001"))
+        self.assertFalse(self.suppress(suppressor, "609", "002"))
+
+    def test_repeat_is_dispatched_after_window(self):
+        windows = {cmd.CommandType.KEYPAD_LED_STATE: 10}
+        suppressor = suppress.Suppressor(windows)
+
+        self.assertFalse(self.suppress(suppressor, "510", "81", now=0))
+        self.assertTrue(self.suppress(suppressor, "510", "81", now=5))
+        self.assertFalse(self.suppress(suppressor, "510", "81", now=11))
+
+    def test_commands_without_window_are_not_suppressed(self):
+        suppressor = suppress.Suppressor({cmd.CommandType.ZONE_OPEN: None})
+
+        self.assertFalse(self.suppress(suppressor, "610", "001"))
+        self.assertFalse(self.suppress(suppressor, "610", "001"))
+
+    def test_count_mode_dispatches_repeats(self):
+        suppressor = suppress.Suppressor(mode=suppress.COUNT)
+
+        self.assertFalse(self.suppress(suppressor, "510", "81"))
+        self.assertFalse(self.suppress(suppressor, "510", "81"))
+        self.assertEqual({"510": 1}, suppressor.stats()["suppressed"])
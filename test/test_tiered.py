@@ -0,0 +1,172 @@
+import os
+import tempfile
+import time
+import unittest
+
+from unittest import mock
+
+import evl.command as cmd
+import evl.event as ev
+import evl.storage.tiered as tiered
+
+
+def make_events(count: int, start: int) -> list:
+    return [
+        ev.Event(cmd.Command("609"), {"zone": "{:03d}".format(i % 8 + 1)}, start + i)
+        for i in range(count)
+    ]
+
+
+class TieredStorageTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = self.directory.name
+        self.now = int(time.time())
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_storage(self, **kwargs):
+        return tiered.TieredStorage(self.path, hot_size=10, segment_size=5, **kwargs)
+
+    def test_old_events_move_to_segments(self):
+        storage = self.make_storage()
+        for event in make_events(22, self.now):
+            storage.store(event)
+
+        self.assertEqual(12, len(storage.all()))
+        self.assertEqual([5, 5], [s.count for s in storage.segments()])
+        self.assertEqual(
+            list(range(self.now, self.now + 22)),
+            [event.timestamp for event in storage.range()],
+        )
+
+    def test_range_reads_both_tiers(self):
+        storage = self.make_storage(compression="lzma")
+        for event in make_events(22, self.now):
+            storage.store(event)
+
+        events = storage.range(self.now + 8, self.now + 12)
+
+        self.assertEqual(
+            list(range(self.now + 8, self.now + 13)),
+            [event.timestamp for event in events],
+        )
+        self.assertEqual("001", events[0].zone)
+        self.assertEqual(cmd.CommandType.ZONE_OPEN, events[0].command.command_type)
+
+    def test_segments_survive_restart(self):
+        storage = self.make_storage()
+        for event in make_events(7, self.now):
+            storage.store(event)
+        storage.close()
+
+        reopened = self.make_storage()
+        self.assertEqual([], reopened.all())
+        self.assertEqual(7, len(reopened.range()))
+
+    def test_expired_segments_are_removed(self):
+        storage = self.make_storage(retention_days=1)
+        for event in make_events(5, self.now - 2 * 86400):
+            storage.store(event)
+        storage.flush()
+        self.assertEqual([], storage.segments())
+
+        for event in make_events(5, self.now):
+            storage.store(event)
+        storage.flush()
+        self.assertEqual(1, len(storage.segments()))
+
+    def test_compact_merges_small_segments(self):
+        storage = self.make_storage()
+        for start in range(0, 30, 3):
+            for event in make_events(3, self.now + start):
+                storage.store(event)
+            storage.flush()
+
+        self.assertLessEqual(len(storage.segments()), 3)
+        storage.compact()
+
+        self.assertEqual(1, len(storage.segments()))
+        self.assertEqual(1, len(os.listdir(self.path)))
+        self.assertEqual(
+            list(range(self.now, self.now + 30)),
+            [event.timestamp for event in storage.range()],
+        )
+
+    def test_interrupted_compaction_keeps_merged_segment(self):
+        storage = self.make_storage()
+        for event in make_events(5, self.now):
+            storage.store(event)
+        storage.flush()
+        original = storage.segments()[0]
+        storage._write(make_events(8, self.now), original.sequence, index=False)
+
+        reopened = self.make_storage()
+
+        self.assertEqual([8], [s.count for s in reopened.segments()])
+        self.assertFalse(os.path.exists(original.path))
+
+    def test_interrupted_compaction_drops_merged_inputs(self):
+        storage = self.make_storage()
+        for start in range(0, 9, 3):
+            for event in make_events(3, self.now + start):
+                storage.store(event)
+            storage.flush()
+
+        # Interrupted after writing the merged segment, before removing inputs.
+        with mock.patch.object(tiered.os, "remove", side_effect=OSError):
+            with self.assertRaises(OSError):
+                storage.compact()
+        self.assertEqual(5, len(os.listdir(self.path)))
+        self.assertIn(tiered.JOURNAL, os.listdir(self.path))
+
+        reopened = self.make_storage()
+
+        self.assertEqual([9], [s.count for s in reopened.segments()])
+        self.assertEqual(
+            list(range(self.now, self.now + 9)),
+            [event.timestamp for event in reopened.range()],
+        )
+        self.assertEqual(1, len(os.listdir(self.path)))
+
+    def test_compaction_interrupted_before_merge_keeps_inputs(self):
+        storage = self.make_storage()
+        for start in range(0, 9, 3):
+            for event in make_events(3, self.now + start):
+                storage.store(event)
+            storage.flush()
+
+        with mock.patch.object(storage, "_write", side_effect=OSError):
+            with self.assertRaises(OSError):
+                storage.compact()
+
+        reopened = self.make_storage()
+
+        self.assertEqual([3, 3, 3], [s.count for s in reopened.segments()])
+        self.assertEqual(9, len(reopened.range()))
+        self.assertNotIn(tiered.JOURNAL, os.listdir(self.path))
+
+    def test_sequences_are_not_reused_by_engines_sharing_a_directory(self):
+        first, second = self.make_storage(), self.make_storage()
+        for storage, start in ((first, 0), (second, 5), (first, 10)):
+            for event in make_events(5, self.now + start):
+                storage.store(event)
+            storage.flush()
+
+        reopened = self.make_storage()
+
+        self.assertEqual([0, 1, 2], [s.sequence for s in reopened.segments()])
+        self.assertEqual(15, len(reopened.range()))
+
+    def test_segments_sharing_a_sequence_are_kept(self):
+        storage = self.make_storage()
+        for event in make_events(5, self.now):
+            storage.store(event)
+        storage.flush()
+        storage._write(make_events(5, self.now + 5), 0, index=False)
+
+        reopened = self.make_storage()
+
+        self.assertEqual([0, 0], [s.sequence for s in reopened.segments()])
+        self.assertEqual(10, len(reopened.range()))
@@ -0,0 +1,165 @@
+import asyncio
+import threading
+import unittest
+
+import evl.command as cmd
+import evl.event as ev
+import evl.storage.memory as memory
+import evl.storage.writebehind as writebehind
+
+
+def make_event(timestamp: int) -> ev.Event:
+    return ev.Event(cmd.Command("609"), {"zone": "001"}, timestamp)
+
+
+class SlowStorage(memory.MemoryStorage):
+    def __init__(self):
+        super().__init__(size=1000)
+        self.writing = threading.Event()
+        self.release = threading.Event()
+
+    def store(self, event: ev.Event) -> None:
+        self.writing.set()
+        self.release.wait(5)
+        super().store(event)
+
+
+class FailingStorage(memory.MemoryStorage):
+    def __init__(self, failures: int):
+        super().__init__(size=1000)
+        self.failures = failures
+
+    def store(self, event: ev.Event) -> None:
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        super().store(event)
+
+
+class RecordingStorage(memory.MemoryStorage):
+    def __init__(self):
+        super().__init__(size=1000)
+        self.threads = set()
+        self.closed = False
+
+    def store(self, event: ev.Event) -> None:
+        self.threads.add(threading.get_ident())
+        super().store(event)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class WriteBehindStorageTest(unittest.TestCase):
+    def test_batches_are_written_off_the_event_loop(self):
+        storage = RecordingStorage()
+        buffered = writebehind.WriteBehindStorage(storage, batch_size=3)
+
+        async def run():
+            for timestamp in range(3):
+                buffered.store(make_event(timestamp))
+            self.assertEqual([], storage.all())
+            self.assertEqual(3, len(buffered.all()))
+
+            # A full batch wakes up the background flush.
+            await asyncio.sleep(0.1)
+            self.assertEqual(3, len(storage.all()))
+            await buffered.close()
+
+        asyncio.run(run())
+
+        self.assertNotIn(threading.get_ident(), storage.threads)
+        self.assertEqual(1, buffered.stats()["batches"])
+
+    def test_partial_batch_is_flushed_after_interval(self):
+        storage = RecordingStorage()
+        buffered = writebehind.WriteBehindStorage(
+            storage, batch_size=100, flush_interval=0.05
+        )
+
+        async def run():
+            buffered.store(make_event(0))
+            await asyncio.sleep(0.2)
+            self.assertEqual(1, len(storage.all()))
+            await buffered.close()
+
+        asyncio.run(run())
+
+    def test_close_writes_buffered_events(self):
+        storage = RecordingStorage()
+        buffered = writebehind.WriteBehindStorage(
+            storage, batch_size=2, flush_interval=60
+        )
+
+        async def run():
+            for timestamp in range(5):
+                buffered.store(make_event(timestamp))
+            self.assertEqual(
+                [1, 2], [event.timestamp for event in await buffered.range(1, 2)]
+            )
+            await ev.EventManager(asyncio.Queue(), storage={"s": buffered}).close()
+
+        asyncio.run(run())
+
+        self.assertEqual(5, len(storage.all()))
+        self.assertTrue(storage.closed)
+        stats = buffered.stats()
+        self.assertEqual(0, stats["depth"])
+        self.assertEqual(5, stats["max_depth"])
+        self.assertEqual(5, stats["written"])
+
+    def test_reads_do_not_wait_for_a_batch_being_written(self):
+        storage = SlowStorage()
+        buffered = writebehind.WriteBehindStorage(storage, batch_size=1)
+
+        async def run():
+            buffered.store(make_event(1))
+            await asyncio.to_thread(storage.writing.wait, 5)
+
+            # The worker thread holds the lock while writing.
+            self.assertEqual([1], [event.timestamp for event in buffered.all()])
+            reading = asyncio.ensure_future(buffered.range(0, 10))
+            await asyncio.sleep(0.05)
+            self.assertFalse(reading.done())
+
+            storage.release.set()
+            events = await reading
+            await buffered.close()
+            return events
+
+        events = asyncio.run(run())
+
+        self.assertEqual([1], [event.timestamp for event in events])
+        self.assertEqual([1], [event.timestamp for event in buffered.all()])
+
+    def test_failed_batch_is_retried(self):
+        storage = FailingStorage(failures=2)
+        buffered = writebehind.WriteBehindStorage(storage, batch_size=2)
+
+        async def run():
+            for timestamp in range(3):
+                buffered.store(make_event(timestamp))
+            self.assertFalse(await buffered.flush())
+            self.assertEqual(3, len(buffered.all()))
+            await buffered.close()
+
+        asyncio.run(run())
+
+        self.assertEqual([0, 1, 2], [event.timestamp for event in storage.all()])
+        stats = buffered.stats()
+        self.assertEqual(2, stats["errors"])
+        self.assertEqual(0, stats["dropped"])
+
+    def test_batch_is_dropped_after_max_retries(self):
+        storage = FailingStorage(failures=3)
+        buffered = writebehind.WriteBehindStorage(storage, batch_size=2, max_retries=2)
+
+        async def run():
+            for timestamp in range(3):
+                buffered.store(make_event(timestamp))
+            await buffered.close()
+
+        asyncio.run(run())
+
+        self.assertEqual([2], [event.timestamp for event in storage.all()])
+        self.assertEqual(2, buffered.stats()["dropped"])